@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import cycle
+import whatsapp_utiles as utiles
+from whatsapp_loader import leer_log_whatsapp
+from whatsapp_palabras import IndicePalabras
+from whatsapp_sesiones import consulta_conversacion
+from whatsapp_store import MensajeStore
+from whatsapp_tokens import cuenta_tokens
+
+# Formatos de exportación que genera genera_chat: iOS (entre corchetes, con
+# segundos) y Android (con guion), cada uno con reloj de 24 y de 12 horas.
+# El Android de 12 horas usa fechas M/D/AA, como las exportaciones de EE. UU.
+FORMATOS = ["ios24", "ios12", "android24", "android12"]
+
+TAMANOS_POR_DEFECTO = [10_000, 100_000, 1_000_000]
+
+# Presupuesto de arranque: segundos que puede tardar en importarse
+# whatsapp_gui antes de crear la ventana. Los módulos de MODULOS_DIFERIDOS
+# no deben cargarse al importarla: se importan después, cuando hacen falta.
+PRESUPUESTO_ARRANQUE = 0.25
+MODULOS_DIFERIDOS = ["matplotlib", "wordcloud", "numpy", "PIL", "whatsapp_cache", "whatsapp_paralelo",
+                     "whatsapp_store", "whatsapp_palabras"]
+
+# Día 13 de enero: con un día mayor que 12 el formato D/M o M/D se detecta
+# desde la primera línea, tenga el fichero el tamaño que tenga.
+FECHA_INICIO = datetime(2020, 1, 13, 8, 0, 0)
+DURACION = timedelta(days=2 * 365)
+
+USUARIOS = ["Laura", "Dani", "Sofía", "Marta", "Pablo", "Lucía", "Jorge", "Ana María", "Carlos", "Irene"]
+PALABRAS = ("hola que tal bien jaja vale mañana clase examen práctica python código error bucle lista "
+            "diccionario función profe nota aprobado suspenso quedamos biblioteca café gracias nada "
+            "genial perfecto ayuda entrega viernes lunes grupo apuntes tema ejercicio duda").split()
+EMOJIS = ["😂", "😊", "👍", "🙏", "😅", "🔥", "❤️", "🎉", "🤔", "💻"]
+
+PROBABILIDAD_MULTILINEA = 0.05
+PROBABILIDAD_EMOJI = 0.2
+PROBABILIDAD_EVENTO = 0.001
+
+# Segundos que mide_refresco espera a que la interfaz cree sus gráficas.
+ESPERA_GRAFICAS = 60
+
+def genera_chat(ruta: str, n_mensajes: int, formato: str = "ios24", semilla: int = 0) -> int:
+    """
+    Escribe un chat sintético con n_mensajes mensajes en uno de los FORMATOS,
+    con mensajes de varias líneas, emojis y algún evento del sistema
+    intercalado. Los mensajes van en orden cronológico a lo largo de DURACION.
+    El fichero se escribe por bloques, así que sirve para millones de mensajes.
+
+    Devuelve:
+    int: Tamaño del fichero en bytes.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}")
+    aleatorio = random.Random(semilla)
+    cabecera = _formateador(formato)
+    hueco_medio = DURACION.total_seconds() / max(n_mensajes, 1)
+    momento = FECHA_INICIO
+    usuarios = USUARIOS[:max(2, min(len(USUARIOS), 2 + n_mensajes // 1000))]
+
+    with open(ruta, "w", encoding="utf-8") as f:
+        bloque = [cabecera(momento, None) + f"{usuarios[0]} creó el grupo \"FP1 benchmark\"\n"]
+        for i in range(n_mensajes):
+            momento += timedelta(seconds=int(aleatorio.expovariate(1 / hueco_medio)))
+            if aleatorio.random() < PROBABILIDAD_EVENTO:
+                bloque.append(cabecera(momento, None) + f"{aleatorio.choice(usuarios)} se unió usando un enlace de invitación\n")
+            texto = " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 15)))
+            if aleatorio.random() < PROBABILIDAD_EMOJI:
+                texto += " " + aleatorio.choice(EMOJIS)
+            if aleatorio.random() < PROBABILIDAD_MULTILINEA:
+                # Las líneas de continuación nunca empiezan por un dígito
+                for _ in range(aleatorio.randint(1, 3)):
+                    texto += "\n" + " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 8)))
+            bloque.append(cabecera(momento, aleatorio.choice(usuarios)) + texto + "\n")
+            if len(bloque) >= 10_000:
+                f.writelines(bloque)
+                bloque = []
+        f.writelines(bloque)
+    return os.path.getsize(ruta)
+
+def _formateador(formato):
+    """Devuelve la función que escribe la cabecera (fecha, hora y usuario) de una línea."""
+    def ios24(m, usuario):
+        return f"[{m.day:02d}/{m.month:02d}/{m.year}, {m.hour:02d}:{m.minute:02d}:{m.second:02d}] " + _usuario(usuario)
+
+    def ios12(m, usuario):
+        return (f"[{m.day}/{m.month}/{m.year % 100:02d}, {(m.hour - 1) % 12 + 1}:{m.minute:02d}:{m.second:02d} "
+                f"{'p.m.' if m.hour >= 12 else 'a.m.'}] " + _usuario(usuario))
+
+    def android24(m, usuario):
+        return f"{m.day:02d}/{m.month:02d}/{m.year % 100:02d}, {m.hour:02d}:{m.minute:02d} - " + _usuario(usuario)
+
+    def android12(m, usuario):
+        return (f"{m.month}/{m.day}/{m.year % 100:02d}, {(m.hour - 1) % 12 + 1}:{m.minute:02d} "
+                f"{'pm' if m.hour >= 12 else 'am'} - " + _usuario(usuario))
+
+    return {"ios24": ios24, "ios12": ios12, "android24": android24, "android12": android12}[formato]
+
+def _usuario(usuario):
+    return "" if usuario is None else usuario + ": "
+
+def mide(funcion, repeticiones: int = 3) -> dict:
+    """
+    Ejecuta una función varias veces y devuelve el tiempo mínimo y medio en
+    segundos. El mínimo es el más estable para comparar versiones.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "media": sum(tiempos) / len(tiempos)}
+
+def mide_arranque(modulo: str = "whatsapp_gui", repeticiones: int = 3) -> dict:
+    """
+    Mide lo que tarda en importarse un módulo en un intérprete nuevo (tiempo
+    acumulado según python -X importtime, el mejor de varias repeticiones) y
+    comprueba que no carga ninguno de MODULOS_DIFERIDOS.
+
+    Devuelve:
+    dict: Segundos, presupuesto (PRESUPUESTO_ARRANQUE), si se cumple y los
+    módulos diferidos que se han cargado; o "omitido" con el motivo si el
+    módulo no se puede importar.
+    """
+    codigo = f"import sys, {modulo}; print(' '.join(sys.modules))"
+    tiempos = []
+    for _ in range(repeticiones):
+        proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proceso.returncode != 0:
+            return {"omitido": proceso.stderr.strip().splitlines()[-1]}
+        # Líneas "import time: propio | acumulado | módulo", en microsegundos
+        for linea in proceso.stderr.splitlines():
+            partes = [p.strip() for p in linea.removeprefix("import time:").split("|")]
+            if len(partes) == 3 and partes[2] == modulo:
+                tiempos.append(int(partes[1]) / 1e6)
+    cargados = set(proceso.stdout.split())
+    diferidos = [m for m in MODULOS_DIFERIDOS if m in cargados]
+    segundos = min(tiempos)
+    return {"modulo": modulo, "segundos": segundos, "presupuesto": PRESUPUESTO_ARRANQUE,
+            "dentro_de_presupuesto": segundos <= PRESUPUESTO_ARRANQUE and not diferidos,
+            "diferidos_cargados": diferidos}
+
+def ejecuta_benchmark(tamanos: list[int]|None=None, formatos: list[str]|None=None, repeticiones: int = 3,
+                      directorio: str|None=None, refresco: bool = True) -> dict:
+    """
+    Genera (o reutiliza) un chat sintético por cada tamaño y formato y mide
+    la lectura, cada función de whatsapp_utiles, sus equivalentes de
+    MensajeStore e IndicePalabras y un refresco completo de las gráficas de
+    la interfaz (actualizar_graficas), si se puede crear la ventana. Mide
+    también el arranque de la interfaz (ver mide_arranque).
+
+    Parámetros:
+    tamanos (list[int]|None): Número de mensajes de cada chat (por defecto TAMANOS_POR_DEFECTO).
+    formatos (list[str]|None): Formatos de FORMATOS (por defecto solo "ios24").
+    repeticiones (int): Veces que se repite cada medida.
+    directorio (str|None): Dónde guardar los chats generados para reutilizarlos.
+    refresco (bool): Si se mide también el refresco de la interfaz.
+
+    Devuelve:
+    dict: Entorno de la ejecución, arranque y tiempos de cada chat.
+    """
+    directorio = directorio or os.path.join(tempfile.gettempdir(), "whatsapp_benchmark")
+    os.makedirs(directorio, exist_ok=True)
+    resultados = []
+    for formato in formatos or ["ios24"]:
+        for n in tamanos or TAMANOS_POR_DEFECTO:
+            ruta = os.path.join(directorio, f"chat_{formato}_{n}.txt")
+            if not os.path.exists(ruta):
+                genera_chat(ruta, n, formato)
+            resultados.append(mide_chat(ruta, repeticiones, refresco) | {"formato": formato})
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticiones": repeticiones,
+        "arranque": mide_arranque(repeticiones=repeticiones),
+        "resultados": resultados,
+    }
+
+def mide_chat(ruta: str, repeticiones: int = 3, refresco: bool = True) -> dict:
+    """Mide todas las operaciones sobre un chat ya generado."""
+    tiempos = {"leer_log_whatsapp": mide(lambda: leer_log_whatsapp(ruta), repeticiones)}
+    mensajes = leer_log_whatsapp(ruta)
+    primero, ultimo = utiles.calcula_rango_fechas(mensajes)
+    # Rango de consulta: la mitad central del chat
+    cuarto = (ultimo - primero) / 4
+    inicio, fin = primero + cuarto, ultimo - cuarto
+    usuario = mensajes[0].usuario
+    agregados = utiles.precalcula_agregados(mensajes)
+
+    operaciones = {
+        "calcula_rango_fechas": lambda: utiles.calcula_rango_fechas(mensajes),
+        "filtra_mensajes_por_fechas": lambda: utiles.filtra_mensajes_por_fechas(mensajes, inicio, fin),
+        "cuenta_mensajes_por_usuario": lambda: utiles.cuenta_mensajes_por_usuario(mensajes),
+        "cuenta_mensajes_por_hora": lambda: utiles.cuenta_mensajes_por_hora(mensajes),
+        "cuenta_mensajes_por_dia_semana": lambda: utiles.cuenta_mensajes_por_dia_semana(mensajes),
+        "calcula_longitud_media_por_usuario": lambda: utiles.calcula_longitud_media_por_usuario(mensajes),
+        "detecta_dia_mas_activo": lambda: utiles.detecta_dia_mas_activo(mensajes),
+        "analiza_palabras_caracteristicas": lambda: utiles.analiza_palabras_caracteristicas(mensajes, usuario),
+        "analiza_todo": lambda: utiles.analiza_todo(mensajes),
+        "precalcula_agregados": lambda: utiles.precalcula_agregados(mensajes),
+        "consulta_agregados": lambda: utiles.consulta_agregados(agregados, inicio, fin),
+    }
+    for nombre, operacion in operaciones.items():
+        tiempos["utiles." + nombre] = mide(operacion, repeticiones)
+    # El tokenizador frente a la referencia que sustituye (lower().split() mensaje a mensaje)
+    textos = [m.texto for m in mensajes]
+    tiempos["tokens.lower_split"] = mide(lambda: cuenta_split(textos), repeticiones)
+    tiempos["tokens.cuenta_tokens"] = mide(lambda: cuenta_tokens(textos), repeticiones)
+    del textos
+
+    store = MensajeStore.desde_mensajes(mensajes)
+    indice = IndicePalabras.desde_store(store)
+    conversacion = store.indexa_conversacion()
+    operaciones = {
+        "store.desde_mensajes": lambda: MensajeStore.desde_mensajes(mensajes),
+        "store.filtra_por_fechas": lambda: store.filtra_por_fechas(inicio, fin),
+        "store.analiza_todo": lambda: store.analiza_todo(palabras=False),
+        "store.precalcula_agregados": lambda: store.precalcula_agregados(),
+        "palabras.desde_store": lambda: IndicePalabras.desde_store(store),
+        # Con el rango cambiado en cada repetición, para no medir la caché del último rango
+        "palabras.palabras_caracteristicas": lambda: indice.palabras_caracteristicas(
+            usuario, 100, inicio, fin - timedelta(days=random.randint(0, 30))),
+        "store.indexa_conversacion": lambda: store.indexa_conversacion(),
+        "sesiones.consulta_conversacion": lambda: consulta_conversacion(conversacion, inicio, fin),
+    }
+    for nombre, operacion in operaciones.items():
+        tiempos[nombre] = mide(operacion, repeticiones)
+    del mensajes
+
+    if refresco:
+        tiempos["gui.actualizar_graficas"] = mide_refresco(store, agregados, indice, inicio, fin, repeticiones)
+    return {"ruta": ruta, "mensajes": len(store), "bytes": os.path.getsize(ruta), "tiempos": tiempos}
+
+def cuenta_split(textos: list[str]) -> Counter:
+    """Recuento de referencia: texto.lower().split() mensaje a mensaje, sin limpiar."""
+    conteo = Counter()
+    for texto in textos:
+        conteo.update(texto.lower().split())
+    return conteo
+
+def mide_refresco(store, agregados, indice, inicio: date, fin: date, repeticiones: int = 3) -> dict:
+    """
+    Mide un refresco completo de las gráficas de la interfaz: calcular las
+    estadísticas del rango y redibujar todas las gráficas. Las repeticiones
+    alternan entre el rango pedido y el chat completo, para que cada una
+    redibuje todo en vez de reutilizar el dibujo anterior. Necesita tkinter,
+    matplotlib, wordcloud y una pantalla; si falta algo, devuelve el motivo
+    en "omitido".
+    """
+    try:
+        import tkinter as tk
+        import matplotlib, wordcloud
+        import whatsapp_gui
+        root = tk.Tk()
+    except Exception as e:
+        return {"omitido": f"{type(e).__name__}: {e}"}
+    try:
+        root.withdraw()
+        app = whatsapp_gui.WhatsAppAnalyzerApp(root)
+        # Las gráficas se crean en segundo plano (esperar_graficas) y hasta
+        # entonces no se dibuja nada: se espera a que estén listas
+        limite = time.perf_counter() + ESPERA_GRAFICAS
+        while not app.graficas_listas:
+            if time.perf_counter() > limite:
+                return {"omitido": f"las gráficas no se han creado en {ESPERA_GRAFICAS} s"}
+            root.update()
+            time.sleep(0.01)
+        app.mensajes_todos, app.agregados, app.indice_palabras = store, agregados, indice
+        rangos = cycle([(inicio, fin), store.calcula_rango_fechas()])
+
+        def refresca():
+            f_ini, f_fin = next(rangos)
+            estadisticas = utiles.consulta_agregados(agregados, f_ini, f_fin)
+            app.mostrar_rango(f_ini, f_fin, estadisticas)
+            root.update()
+
+        return mide(refresca, repeticiones)
+    finally:
+        root.destroy()
+
+def compara_resultados(anterior: dict, actual: dict, umbral: float = 1.2) -> list[tuple[str, int, str, float]]:
+    """
+    Compara dos ejecuciones de ejecuta_benchmark y devuelve las medidas que
+    han empeorado más de `umbral` veces (tiempo mínimo): una tupla (formato,
+    mensajes, operación, cociente) por cada una. El arranque aparece con
+    formato "" y 0 mensajes.
+    """
+    previos = {(r["formato"], r["mensajes"]): r["tiempos"] for r in anterior["resultados"]}
+    empeoradas = []
+    arranque_previo, arranque = anterior.get("arranque", {}), actual.get("arranque", {})
+    if arranque_previo.get("segundos") and "segundos" in arranque:
+        cociente = arranque["segundos"] / arranque_previo["segundos"]
+        if cociente > umbral:
+            empeoradas.append(("", 0, "arranque", cociente))
+    for r in actual["resultados"]:
+        tiempos_previos = previos.get((r["formato"], r["mensajes"]), {})
+        for operacion, tiempo in r["tiempos"].items():
+            previo = tiempos_previos.get(operacion)
+            if previo is None or "min" not in previo or "min" not in tiempo or not previo["min"]:
+                continue
+            cociente = tiempo["min"] / previo["min"]
+            if cociente > umbral:
+                empeoradas.append((r["formato"], r["mensajes"], operacion, cociente))
+    return empeoradas
+
+def main(argumentos: list[str]|None=None) -> None:
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de la lectura y el análisis de chats.")
+    parser.add_argument("-n", "--tamanos", type=int, nargs="+", default=TAMANOS_POR_DEFECTO,
+                        help="Número de mensajes de cada chat sintético (de 10000 a 10000000).")
+    parser.add_argument("-f", "--formatos", nargs="+", choices=FORMATOS, default=["ios24"])
+    parser.add_argument("-r", "--repeticiones", type=int, default=3)
+    parser.add_argument("-d", "--directorio", help="Directorio donde guardar y reutilizar los chats generados.")
+    parser.add_argument("-o", "--salida", default="benchmark.json", help="Fichero JSON con los resultados.")
+    parser.add_argument("--sin-refresco", action="store_true", help="No medir el refresco de la interfaz.")
+    parser.add_argument("-c", "--comparar", help="JSON de una ejecución anterior con el que comparar.")
+    args = parser.parse_args(argumentos)
+
+    resultado = ejecuta_benchmark(args.tamanos, args.formatos, args.repeticiones, args.directorio,
+                                  refresco=not args.sin_refresco)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    for r in resultado["resultados"]:
+        print(f"{r['formato']}, {r['mensajes']} mensajes ({r['bytes'] / 1e6:.1f} MB):")
+        for operacion, tiempo in r["tiempos"].items():
+            if "min" in tiempo:
+                print(f"  {operacion:40s} {tiempo['min'] * 1000:10.2f} ms")
+            else:
+                print(f"  {operacion:40s} omitido ({tiempo['omitido']})")
+    arranque = resultado["arranque"]
+    if "segundos" in arranque:
+        print(f"Arranque de {arranque['modulo']}: {arranque['segundos'] * 1000:.1f} ms "
+              f"(presupuesto {arranque['presupuesto'] * 1000:.0f} ms)")
+        if arranque["diferidos_cargados"]:
+            print(f"  Carga al arrancar: {', '.join(arranque['diferidos_cargados'])}")
+    else:
+        print(f"Arranque: omitido ({arranque['omitido']})")
+    print(f"Resultados guardados en {args.salida}")
+
+    fallos = not arranque.get("dentro_de_presupuesto", True)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            empeoradas = compara_resultados(json.load(f), resultado)
+        for formato, n, operacion, cociente in empeoradas:
+            print(f"Empeora: {formato}, {n} mensajes, {operacion}: {cociente:.2f}x")
+        fallos = fallos or bool(empeoradas)
+    if fallos:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
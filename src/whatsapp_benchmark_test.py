@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from whatsapp_benchmark import *
+from whatsapp_loader import leer_log_whatsapp
+
+def test_genera_chat():
+    print("Probando genera_chat...")
+    with tempfile.TemporaryDirectory() as directorio:
+        leidos = {}
+        for formato in FORMATOS:
+            ruta = os.path.join(directorio, formato + ".txt")
+            assert genera_chat(ruta, 3000, formato) == os.path.getsize(ruta)
+            mensajes = leer_log_whatsapp(ruta)
+            assert len(mensajes) == 3000
+            leidos[formato] = mensajes
+        # Mismos mensajes en todos los formatos (sin segundos en Android)
+        for formato in FORMATOS:
+            assert [(m.fecha, m.hora.hour, m.hora.minute, m.usuario, m.texto) for m in leidos[formato]] == \
+                   [(m.fecha, m.hora.hour, m.hora.minute, m.usuario, m.texto) for m in leidos["ios24"]]
+        mensajes = leidos["ios24"]
+        assert mensajes[0].fecha == FECHA_INICIO.date()
+        assert all(a.fecha <= b.fecha for a, b in zip(mensajes, mensajes[1:]))
+        assert any("\n" in m.texto for m in mensajes)
+        assert any(e in m.texto for m in mensajes for e in EMOJIS)
+        try:
+            genera_chat(os.path.join(directorio, "x.txt"), 10, "blackberry")
+            assert False
+        except ValueError:
+            pass
+
+def test_ejecuta_benchmark():
+    print("Probando ejecuta_benchmark...")
+    with tempfile.TemporaryDirectory() as directorio:
+        resultado = ejecuta_benchmark([500], ["android12"], repeticiones=1, directorio=directorio, refresco=False)
+        assert len(resultado["resultados"]) == 1
+        r = resultado["resultados"][0]
+        assert r["formato"] == "android12" and r["mensajes"] == 500
+        assert {"leer_log_whatsapp", "utiles.analiza_todo", "utiles.consulta_agregados",
+                "store.analiza_todo", "palabras.palabras_caracteristicas"} <= set(r["tiempos"])
+        assert all(t["min"] <= t["media"] for t in r["tiempos"].values())
+        # Se puede guardar como JSON y el chat generado se reutiliza
+        json.dumps(resultado)
+        assert os.listdir(directorio) == ["chat_android12_500.txt"]
+
+def test_compara_resultados():
+    print("Probando compara_resultados...")
+    anterior = {"resultados": [{"formato": "ios24", "mensajes": 10, "tiempos": {
+        "a": {"min": 1.0, "media": 1.0}, "b": {"min": 1.0, "media": 1.0}, "c": {"omitido": "sin pantalla"}}}]}
+    actual = {"resultados": [{"formato": "ios24", "mensajes": 10, "tiempos": {
+        "a": {"min": 1.1, "media": 1.1}, "b": {"min": 2.0, "media": 2.0}, "c": {"min": 1.0, "media": 1.0}}},
+        {"formato": "ios24", "mensajes": 20, "tiempos": {"a": {"min": 5.0, "media": 5.0}}}]}
+    assert compara_resultados(anterior, actual) == [("ios24", 10, "b", 2.0)]
+    assert compara_resultados(anterior, actual, umbral=1.05)[0][2] == "a"
+    anterior["arranque"], actual["arranque"] = {"segundos": 0.1}, {"segundos": 0.3}
+    assert ("", 0, "arranque", 3.0) in [(f, n, o, round(c, 6)) for f, n, o, c in compara_resultados(anterior, actual)]
+
+def test_mide_arranque():
+    print("Probando mide_arranque...")
+    arranque = mide_arranque(repeticiones=1)
+    if "omitido" in arranque:  # Sin tkinter
+        return
+    assert arranque["diferidos_cargados"] == []
+    assert arranque["segundos"] <= PRESUPUESTO_ARRANQUE
+    assert arranque["dentro_de_presupuesto"]
+    # Importar whatsapp_utiles no ejecuta ni escribe nada
+    resultado = subprocess.run([sys.executable, "-c", "import whatsapp_utiles"], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert resultado.returncode == 0 and resultado.stdout == ""
+
+
+test_genera_chat()
+test_ejecuta_benchmark()
+test_compara_resultados()
+test_mide_arranque()
+print("Todos los tests pasaron correctamente.")
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Callable
+from itertools import chain
+from whatsapp_loader import busca_inicio_ultimo_mensaje, detecta_formato_fichero, iter_log_whatsapp
+from whatsapp_paralelo import carga_paralela
+from whatsapp_store import MensajeStore
+
+# Directorio de la caché: se puede cambiar con la variable de entorno
+# WHATSAPP_CACHE_DIR.
+DIRECTORIO_CACHE = os.environ.get("WHATSAPP_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "whatsapp_analytics")
+
+# Tamaño máximo de la caché (2 GiB). Al guardar un chat nuevo se borran los
+# menos usados hasta quedar por debajo.
+TAM_MAX_CACHE = 1 << 31
+
+EXTENSION = ".chat"
+
+# Cabecera de un fichero de caché: firma, versión y longitud en bytes de los
+# metadatos JSON que la siguen. Después vienen las columnas del MensajeStore
+# en binario (fechas, segundos, usuarios, longitudes, offsets) y su texto en
+# UTF-8, que se copian tal cual.
+FIRMA = b"WACH"
+VERSION = 4
+CABECERA = struct.Struct("<4sII")
+
+# Bytes del principio y del final de la parte ya leída de un fichero con que
+# se comprueba que una nueva exportación más larga es la misma conversación.
+TAM_HUELLA = 1 << 16
+
+registro = logging.getLogger(__name__)
+
+def carga_con_cache(ruta_archivo: str, directorio: str|None=None,
+                    progreso: Callable[[float], None]|None=None) -> MensajeStore:
+    """
+    Devuelve el MensajeStore de un chat, leyéndolo de la caché si el fichero
+    no ha cambiado desde la última vez. Si el fichero ha crecido por el final
+    (una nueva exportación del mismo chat), solo se lee la parte nueva; si no
+    está en la caché (o ya no es válido), se lee completo con
+    carga_paralela. En ambos casos se guarda el resultado.
+
+    Parámetros:
+    ruta_archivo (str): Ruta del fichero exportado de WhatsApp.
+    directorio (str|None): Directorio de la caché (por defecto DIRECTORIO_CACHE).
+    progreso (Callable[[float], None]|None): Igual que en iter_log_whatsapp.
+
+    Devuelve:
+    MensajeStore: Mensajes del chat.
+    """
+    return carga_incremental(ruta_archivo, directorio, progreso)[0]
+
+def carga_incremental(ruta_archivo: str, directorio: str|None=None,
+                      progreso: Callable[[float], None]|None=None) -> tuple[MensajeStore, int]:
+    """
+    Igual que carga_con_cache, pero devuelve también cuántos mensajes del
+    principio del store coinciden con los que había en la caché (0 si se ha
+    leído el fichero completo). Quien tenga agregados de la versión anterior
+    solo necesita actualizarlos con los mensajes a partir de esa posición.
+
+    Al crecer el fichero se vuelve a leer desde el comienzo del último mensaje
+    guardado, por si el nuevo fichero lo completa; si ese mensaje no coincide
+    (fecha, hora y usuario) con el de la caché, se lee el fichero completo.
+    """
+    ruta_cache = _ruta_cache(ruta_archivo, directorio)
+    entrada = _lee_entrada(ruta_cache)
+    # El estado del fichero se toma antes de leerlo: es el que se guarda con
+    # los mensajes (ver guarda_en_cache)
+    try:
+        info = os.stat(ruta_archivo)
+    except FileNotFoundError:
+        entrada = info = None
+    if entrada is not None:
+        metadatos, store = entrada
+        if _sin_cambios(ruta_archivo, info, metadatos):
+            # La fecha de modificación de la entrada marca su último uso (para limita_cache)
+            os.utime(ruta_cache)
+            if progreso is not None:
+                progreso(1.0)
+            return store, len(store)
+        if info.st_size > metadatos["tamano"] and _huella(ruta_archivo, metadatos["tamano"]) == metadatos["huella"]:
+            conservados = _anade_cola(ruta_archivo, store, metadatos, progreso)
+            if conservados is not None:
+                _guarda_sin_fallar(ruta_archivo, store, directorio, info)
+                return store, conservados
+
+    store = carga_paralela(ruta_archivo, progreso=progreso)
+    if store and info is not None:
+        _guarda_sin_fallar(ruta_archivo, store, directorio, info)
+    return store, 0
+
+def busca_en_cache(ruta_archivo: str, directorio: str|None=None) -> MensajeStore|None:
+    """
+    Devuelve el MensajeStore guardado en la caché para un fichero, o None si
+    no está o si el fichero ha cambiado. Se considera que no ha cambiado si
+    coinciden tamaño y fecha de modificación o, si solo coincide el tamaño,
+    el hash de su contenido.
+    """
+    ruta_cache = _ruta_cache(ruta_archivo, directorio)
+    entrada = _lee_entrada(ruta_cache)
+    if entrada is None:
+        return None
+    metadatos, store = entrada
+    try:
+        if not _sin_cambios(ruta_archivo, os.stat(ruta_archivo), metadatos):
+            return None
+    except FileNotFoundError:
+        return None
+    os.utime(ruta_cache)
+    return store
+
+def guarda_en_cache(ruta_archivo: str, store: MensajeStore, directorio: str|None=None,
+                    info: os.stat_result|None=None) -> bool:
+    """
+    Guarda en la caché el MensajeStore de un fichero, junto con su tamaño,
+    fecha de modificación y hash, y aplica el límite TAM_MAX_CACHE. También
+    guarda lo necesario para leer más adelante solo lo que se añada al
+    fichero: dónde empieza su último mensaje, su formato de fecha y una
+    huella de su contenido.
+
+    `info` es el os.stat del fichero tomado antes de leer los mensajes (por
+    defecto, el actual). Si el fichero ha cambiado desde entonces, el store
+    ya no corresponde a su contenido y no se guarda. La entrada se escribe en
+    un temporal propio y se renombra, así que dos procesos que guardan a la
+    vez no se pisan.
+
+    Devuelve:
+    bool: True si se ha guardado, False si el fichero había cambiado.
+    """
+    directorio = directorio or DIRECTORIO_CACHE
+    os.makedirs(directorio, exist_ok=True)
+    if info is None:
+        info = os.stat(ruta_archivo)
+    texto = store.texto
+    metadatos = {
+        "ruta": os.path.abspath(ruta_archivo),
+        "tamano": info.st_size,
+        "mtime_ns": info.st_mtime_ns,
+        "hash": calcula_hash(ruta_archivo),
+        "huella": _huella(ruta_archivo, info.st_size),
+        "inicio_cola": busca_inicio_ultimo_mensaje(ruta_archivo, info.st_size),
+        "formato_fecha": detecta_formato_fichero(ruta_archivo),
+        "n": len(store),
+        "bytes_texto": len(texto),
+        "nombres": store.nombres,
+        "orden_bytes": sys.byteorder,
+        "tam_int": array('i').itemsize,
+    }
+    # El hash y la huella se calculan ahora: solo valen si el fichero sigue
+    # como estaba antes de leerlo
+    actual = os.stat(ruta_archivo)
+    if (actual.st_size, actual.st_mtime_ns) != (info.st_size, info.st_mtime_ns):
+        return False
+    cabecera_json = json.dumps(metadatos, ensure_ascii=False).encode("utf-8")
+
+    ruta_cache = _ruta_cache(ruta_archivo, directorio)
+    descriptor, temporal = tempfile.mkstemp(suffix=".tmp", dir=directorio)
+    try:
+        with open(descriptor, "wb") as f:
+            f.write(CABECERA.pack(FIRMA, VERSION, len(cabecera_json)))
+            f.write(cabecera_json)
+            for columna in (store.fechas, store.segundos, store.usuarios, store.longitudes, store.offsets):
+                f.write(columna)
+            f.write(texto)
+        os.replace(temporal, ruta_cache)
+    except BaseException:
+        _borra(temporal)
+        raise
+    limita_cache(TAM_MAX_CACHE, directorio)
+    return True
+
+def limpia_cache(directorio: str|None=None) -> int:
+    """Borra todas las entradas de la caché y devuelve cuántas había."""
+    entradas = _entradas(directorio or DIRECTORIO_CACHE)
+    for ruta, _, _ in entradas:
+        _borra(ruta)
+    return len(entradas)
+
+def limita_cache(tam_max: int, directorio: str|None=None) -> int:
+    """
+    Borra las entradas de la caché usadas hace más tiempo hasta que el total
+    ocupe como mucho tam_max bytes. Devuelve el número de entradas borradas.
+    """
+    entradas = sorted(_entradas(directorio or DIRECTORIO_CACHE), key=lambda e: e[2])
+    total = sum(tam for _, tam, _ in entradas)
+    borradas = 0
+    for ruta, tam, _ in entradas:
+        if total <= tam_max:
+            break
+        _borra(ruta)
+        total -= tam
+        borradas += 1
+    return borradas
+
+def calcula_hash(ruta_archivo: str) -> str:
+    """Devuelve el hash BLAKE2b del contenido de un fichero."""
+    with open(ruta_archivo, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()
+
+def _ruta_cache(ruta_archivo: str, directorio: str|None) -> str:
+    clave = hashlib.blake2b(os.path.abspath(ruta_archivo).encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(directorio or DIRECTORIO_CACHE, clave + EXTENSION)
+
+def _lee_entrada(ruta_cache: str) -> tuple[dict, MensajeStore]|None:
+    """Lee una entrada de la caché; si está dañada o es de otra versión, la borra."""
+    try:
+        with open(ruta_cache, "rb") as f:
+            metadatos = _lee_metadatos(f)
+            return metadatos, _lee_columnas(f, metadatos)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, EOFError, struct.error):
+        _borra(ruta_cache)
+        return None
+
+def _sin_cambios(ruta_archivo: str, info: os.stat_result, metadatos: dict) -> bool:
+    if metadatos["tamano"] != info.st_size:
+        return False
+    return metadatos["mtime_ns"] == info.st_mtime_ns or metadatos["hash"] == calcula_hash(ruta_archivo)
+
+def _huella(ruta_archivo: str, tamano: int) -> str:
+    """
+    Hash de los primeros y los últimos TAM_HUELLA bytes de los `tamano`
+    primeros bytes del fichero. Permite comprobar que un fichero que ha
+    crecido empieza igual que antes sin leerlo entero.
+    """
+    h = hashlib.blake2b(str(tamano).encode("ascii"))
+    with open(ruta_archivo, "rb") as f:
+        h.update(f.read(min(TAM_HUELLA, tamano)))
+        inicio_final = max(tamano - TAM_HUELLA, 0)
+        f.seek(inicio_final)
+        h.update(f.read(tamano - inicio_final))
+    return h.hexdigest()
+
+def _anade_cola(ruta_archivo: str, store: MensajeStore, metadatos: dict,
+                progreso: Callable[[float], None]|None) -> int|None:
+    """
+    Lee el fichero desde el comienzo del último mensaje guardado y añade al
+    store los mensajes leídos en lugar de ese último. Devuelve cuántos
+    mensajes del store se han conservado, o None si el primer mensaje leído
+    no es el último guardado (y el store no se ha tocado).
+    """
+    mensajes = iter_log_whatsapp(ruta_archivo, progreso=progreso, desde_byte=metadatos["inicio_cola"],
+                                 formato_fecha=tuple(metadatos["formato_fecha"]))
+    primero = next(mensajes, None)
+    ultimo = store[len(store) - 1]
+    if primero is None or primero[:3] != ultimo[:3]:
+        mensajes.close()
+        return None
+    conservados = len(store) - 1
+    store.anade(chain([primero], mensajes), desde=conservados)
+    return conservados
+
+def _guarda_sin_fallar(ruta_archivo: str, store: MensajeStore, directorio: str|None,
+                       info: os.stat_result) -> None:
+    try:
+        if not guarda_en_cache(ruta_archivo, store, directorio, info):
+            registro.info("No se guarda la caché de %s: el fichero ha cambiado durante la lectura", ruta_archivo)
+    except OSError as e:
+        # Sin caché se puede seguir trabajando: solo se avisa
+        registro.warning("No se pudo guardar la caché de %s: %s", ruta_archivo, e)
+
+def _lee_metadatos(f) -> dict:
+    firma, version, longitud = CABECERA.unpack(f.read(CABECERA.size))
+    if firma != FIRMA or version != VERSION:
+        raise ValueError("Fichero de caché no reconocido")
+    metadatos = json.loads(f.read(longitud).decode("utf-8"))
+    if metadatos["tam_int"] != array('i').itemsize:
+        raise ValueError("Fichero de caché de otra plataforma")
+    return metadatos
+
+def _lee_columnas(f, metadatos: dict) -> MensajeStore:
+    n = metadatos["n"]
+    columnas = []
+    for tipo, cantidad in (('i', n), ('i', n), ('i', n), ('i', n), ('q', n + 1)):
+        columna = array(tipo)
+        columna.fromfile(f, cantidad)
+        if metadatos["orden_bytes"] != sys.byteorder:
+            columna.byteswap()
+        columnas.append(columna)
+    texto = f.read(metadatos["bytes_texto"])
+    fechas, segundos, usuarios, longitudes, offsets = columnas
+    if len(texto) != metadatos["bytes_texto"] or offsets[-1] != len(texto):
+        raise ValueError("Fichero de caché truncado")
+    return MensajeStore(fechas, segundos, usuarios, longitudes, offsets, texto, metadatos["nombres"])
+
+def _entradas(directorio: str) -> list[tuple[str, int, float]]:
+    """Devuelve (ruta, tamaño, último uso) de cada entrada de la caché."""
+    try:
+        nombres = os.listdir(directorio)
+    except FileNotFoundError:
+        return []
+    entradas = []
+    for nombre in nombres:
+        if nombre.endswith(EXTENSION):
+            ruta = os.path.join(directorio, nombre)
+            info = os.stat(ruta)
+            entradas.append((ruta, info.st_size, info.st_mtime))
+    return entradas
+
+def _borra(ruta: str) -> None:
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
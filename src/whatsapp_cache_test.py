@@ -0,0 +1,123 @@
+import os
+import tempfile
+from whatsapp_cache import *
+from whatsapp_cache import _ruta_cache
+from whatsapp_loader import leer_log_whatsapp
+from whatsapp_store import MensajeStore
+
+LOG_PRUEBA = """[15/09/2025, 09:16:05] Laura: Hola chicos! 💻
+[16/09/2025, 10:05:00] Dani: gente, alguien ha ido a la clase de hoy?
+[18/09/2025, 18:30:15] Sofía: CHICOS AYUDA!!!
+"""
+
+def _crea_log(directorio, nombre, contenido):
+    ruta = os.path.join(directorio, nombre)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    return ruta
+
+def test_carga_con_cache():
+    print("Probando carga_con_cache...")
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = os.path.join(directorio, "cache")
+        ruta = _crea_log(directorio, "chat.txt", LOG_PRUEBA)
+        assert busca_en_cache(ruta, cache) is None
+        store = carga_con_cache(ruta, cache)
+        assert list(store) == leer_log_whatsapp(ruta)
+        # Segunda carga: sale de la caché
+        en_cache = busca_en_cache(ruta, cache)
+        assert en_cache is not None
+        assert list(en_cache) == list(store)
+        assert en_cache.nombres == store.nombres
+        # Mismo contenido con otra fecha de modificación: sigue siendo válida
+        os.utime(ruta, ns=(0, 0))
+        assert busca_en_cache(ruta, cache) is not None
+        # Contenido distinto: se invalida
+        _crea_log(directorio, "chat.txt", LOG_PRUEBA.replace("Laura", "Lucía"))
+        assert busca_en_cache(ruta, cache) is None
+        assert carga_con_cache(ruta, cache).nombres[0] == "Lucía"
+
+def test_cache_danada():
+    print("Probando una entrada de caché dañada...")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = _crea_log(directorio, "chat.txt", LOG_PRUEBA)
+        carga_con_cache(ruta, directorio)
+        (entrada,) = [n for n in os.listdir(directorio) if n.endswith(EXTENSION)]
+        with open(os.path.join(directorio, entrada), "r+b") as f:
+            f.truncate(20)
+        assert busca_en_cache(ruta, directorio) is None
+        assert not os.path.exists(os.path.join(directorio, entrada))
+        # Solo falta el final del texto: las columnas se leen enteras, pero no vale
+        carga_con_cache(ruta, directorio)
+        with open(os.path.join(directorio, entrada), "r+b") as f:
+            f.truncate(os.path.getsize(os.path.join(directorio, entrada)) - 5)
+        assert busca_en_cache(ruta, directorio) is None
+        assert list(carga_con_cache(ruta, directorio)) == leer_log_whatsapp(ruta)
+
+def test_guarda_en_cache():
+    print("Probando guarda_en_cache...")
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = os.path.join(directorio, "cache")
+        ruta = _crea_log(directorio, "chat.txt", LOG_PRUEBA)
+        info = os.stat(ruta)
+        store = MensajeStore.desde_mensajes(leer_log_whatsapp(ruta))
+        # El fichero cambia entre la lectura y el guardado: no se guarda
+        _crea_log(directorio, "chat.txt", LOG_PRUEBA + "[19/09/2025, 08:00:00] Laura: Buenos días\n")
+        assert not guarda_en_cache(ruta, store, cache, info)
+        assert busca_en_cache(ruta, cache) is None
+        store = MensajeStore.desde_mensajes(leer_log_whatsapp(ruta))
+        assert guarda_en_cache(ruta, store, cache, os.stat(ruta))
+        assert list(busca_en_cache(ruta, cache)) == list(store)
+        # Si la escritura falla, no queda el temporal
+        store.texto = "no son bytes"
+        try:
+            guarda_en_cache(ruta, store, cache)
+            assert False, "Debería lanzar TypeError"
+        except TypeError:
+            pass
+        assert os.listdir(cache) == [os.path.basename(_ruta_cache(ruta, cache))]
+
+def test_limpia_y_limita_cache():
+    print("Probando limpia_cache y limita_cache...")
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = os.path.join(directorio, "cache")
+        rutas = [_crea_log(directorio, f"chat{i}.txt", LOG_PRUEBA) for i in range(3)]
+        for i, ruta in enumerate(rutas):
+            carga_con_cache(ruta, cache)
+            os.utime(_ruta_cache(ruta, cache), (i, i))
+        tam = os.path.getsize(_ruta_cache(rutas[0], cache))
+        assert limita_cache(2 * tam, cache) == 1
+        assert busca_en_cache(rutas[0], cache) is None
+        assert busca_en_cache(rutas[2], cache) is not None
+        assert limpia_cache(cache) == 2
+        assert limpia_cache(cache) == 0
+
+def test_carga_incremental():
+    print("Probando carga_incremental...")
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = os.path.join(directorio, "cache")
+        ruta = _crea_log(directorio, "chat.txt", LOG_PRUEBA)
+        store, conservados = carga_incremental(ruta, cache)
+        assert (len(store), conservados) == (3, 0)
+        # Nueva exportación: el mismo chat con mensajes añadidos al final
+        nuevo = LOG_PRUEBA + "[19/09/2025, 08:00:00] Laura: Buenos días\n[19/09/2025, 08:01:00] Marta: hola!\n"
+        _crea_log(directorio, "chat.txt", nuevo)
+        store, conservados = carga_incremental(ruta, cache)
+        assert conservados == 2
+        assert list(store) == leer_log_whatsapp(ruta)
+        assert store.nombres == ["Laura", "Dani", "Sofía", "Marta"]
+        # Lo guardado en la caché incluye ya los mensajes nuevos
+        assert list(busca_en_cache(ruta, cache)) == list(store)
+        # Si cambia el principio no es el mismo chat: se lee completo
+        _crea_log(directorio, "chat.txt", nuevo.replace("Hola chicos", "Hola chicas") + nuevo)
+        store, conservados = carga_incremental(ruta, cache)
+        assert conservados == 0
+        assert list(store) == leer_log_whatsapp(ruta)
+
+
+test_carga_con_cache()
+test_cache_danada()
+test_guarda_en_cache()
+test_limpia_y_limita_cache()
+test_carga_incremental()
+print("Todos los tests pasaron correctamente.")
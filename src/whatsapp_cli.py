@@ -0,0 +1,83 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date, datetime
+from whatsapp_informe import COLUMNAS_CSV, escribe_csv, escribe_json, filas_csv, informe_de_store
+from whatsapp_loader import iter_log_whatsapp
+from whatsapp_store import MensajeStore
+from whatsapp_utiles import MODOS_PALABRAS
+
+def analiza_fichero(ruta: str, fecha_inicio: date|None=None, fecha_fin: date|None=None, n_palabras: int = 0,
+                    modo: str = "diferencia") -> dict:
+    """
+    Lee un chat y devuelve el informe de sus mensajes entre dos fechas
+    (inclusive; None para no limitar), como informe_de_store, con el número
+    total de mensajes del chat y el rango pedido.
+
+    Parámetros:
+    ruta (str): Ruta del fichero exportado de WhatsApp.
+    fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
+    fecha_fin (date|None): Fecha de fin (inclusive) o None.
+    n_palabras (int): Palabras características por usuario (0 para no calcularlas).
+    modo (str): Cómo se puntúan las palabras (uno de MODOS_PALABRAS).
+
+    Devuelve:
+    dict: Informe del rango.
+    """
+    store = MensajeStore.desde_mensajes(iter_log_whatsapp(ruta))
+    informe = informe_de_store(store.filtra_por_fechas(fecha_inicio, fecha_fin), n_palabras, modo)
+    informe["filtro"] = {
+        "desde": None if fecha_inicio is None else fecha_inicio.isoformat(),
+        "hasta": None if fecha_fin is None else fecha_fin.isoformat(),
+        "mensajes_chat": len(store),
+    }
+    return informe
+
+def _fecha(texto):
+    """Convierte una fecha AAAA-MM-DD o DD/MM/AAAA de la línea de comandos."""
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(texto, "%d/%m/%Y").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha no válida: {texto} (usa AAAA-MM-DD o DD/MM/AAAA)")
+
+def main(argumentos: list[str]|None=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m whatsapp_cli",
+                                     description="Analiza un chat exportado de WhatsApp sin interfaz gráfica.")
+    parser.add_argument("fichero", help="Fichero .txt exportado de WhatsApp.")
+    parser.add_argument("--desde", type=_fecha, help="Primera fecha a analizar (AAAA-MM-DD o DD/MM/AAAA).")
+    parser.add_argument("--hasta", type=_fecha, help="Última fecha a analizar (AAAA-MM-DD o DD/MM/AAAA).")
+    parser.add_argument("-f", "--formato", choices=["json", "csv"], default="json", help="Formato del informe.")
+    parser.add_argument("-o", "--salida", help="Fichero donde escribir el informe (por defecto, la salida estándar).")
+    parser.add_argument("--palabras", type=int, default=0,
+                        help="Palabras características por usuario (0 para no calcularlas).")
+    parser.add_argument("--puntuacion", choices=MODOS_PALABRAS, default="diferencia",
+                        help="Cómo se puntúan las palabras características.")
+    args = parser.parse_args(argumentos)
+    if not os.path.isfile(args.fichero):
+        parser.error(f"no existe el fichero {args.fichero}")
+    if args.desde and args.hasta and args.desde > args.hasta:
+        parser.error("--desde es posterior a --hasta")
+
+    informe = analiza_fichero(args.fichero, args.desde, args.hasta, args.palabras, args.puntuacion)
+    chat = os.path.splitext(os.path.basename(args.fichero))[0]
+    if args.salida is None:
+        if args.formato == "json":
+            json.dump(informe, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            escritor = csv.writer(sys.stdout)
+            escritor.writerow(COLUMNAS_CSV)
+            escritor.writerows(filas_csv(chat, informe))
+    elif args.formato == "json":
+        escribe_json(informe, args.salida)
+    else:
+        escribe_csv({chat: informe}, args.salida)
+
+if __name__ == "__main__":
+    main()
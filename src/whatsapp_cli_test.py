@@ -0,0 +1,67 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from whatsapp_cli import *
+from whatsapp_informe import estadisticas_a_dict
+from whatsapp_loader import leer_log_whatsapp
+from whatsapp_utiles import *
+
+CHAT = """[15/09/2025, 09:16:05] Laura: Hola chicos!
+[16/09/2025, 10:05:00] Dani: gente, alguien ha ido a la clase de hoy?
+[16/09/2025, 18:30:15] Laura: yo sí, la clase de hoy genial
+[17/09/2025, 12:00:00] Sofía: mañana más
+"""
+
+def _crea_chat(directorio):
+    ruta = os.path.join(directorio, "chat.txt")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(CHAT)
+    return ruta
+
+def test_analiza_fichero():
+    print("Probando analiza_fichero...")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = _crea_chat(directorio)
+        informe = analiza_fichero(ruta, date(2025, 9, 16), date(2025, 9, 16), n_palabras=2)
+        mensajes = filtra_mensajes_por_fechas(leer_log_whatsapp(ruta), date(2025, 9, 16), date(2025, 9, 16))
+        esperado = estadisticas_a_dict(analiza_todo(mensajes))
+        assert {k: informe[k] for k in esperado} == esperado
+        assert informe["total"] == 2
+        assert informe["filtro"] == {"desde": "2025-09-16", "hasta": "2025-09-16", "mensajes_chat": 4}
+        assert set(informe["palabras"]) == {"Laura", "Dani"}
+        informe = analiza_fichero(ruta, n_palabras=2, modo="log_odds")
+        assert all(puntuacion > 0 for palabras in informe["palabras"].values() for _, puntuacion in palabras)
+        assert analiza_fichero(ruta)["total"] == 4
+
+def test_main():
+    print("Probando main...")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = _crea_chat(directorio)
+        salida = os.path.join(directorio, "informe.json")
+        main([ruta, "--desde", "16/09/2025", "-o", salida])
+        with open(salida, encoding="utf-8") as f:
+            assert json.load(f)["total"] == 3
+
+        salida = os.path.join(directorio, "informe.csv")
+        main([ruta, "--hasta", "2025-09-15", "-f", "csv", "-o", salida])
+        with open(salida, encoding="utf-8", newline="") as f:
+            filas = list(csv.reader(f))
+        assert filas[0] == COLUMNAS_CSV
+        assert ["chat", "total", "", "1"] in filas
+
+        # Sin interfaz: no se cargan tkinter, matplotlib ni wordcloud
+        codigo = ("import sys, whatsapp_cli; sys.argv[1:] = [sys.argv[1]]; whatsapp_cli.main(); "
+                  "assert not {'tkinter', 'matplotlib', 'wordcloud'} & set(sys.modules)")
+        resultado = subprocess.run([sys.executable, "-c", codigo, ruta], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert resultado.returncode == 0, resultado.stderr
+        assert json.loads(resultado.stdout)["total"] == 4
+
+
+test_analiza_fichero()
+test_main()
+print("Todos los tests pasaron correctamente.")
@@ -1,16 +1,87 @@
+import argparse
+import math
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from wordcloud import WordCloud
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+import whatsapp_loader
+import whatsapp_perfil as perfil
 import whatsapp_utiles as utiles
-from whatsapp_loader import leer_log_whatsapp
+from whatsapp_nubes import CacheNubes, clave_nube, genera_nube
+
+# matplotlib, wordcloud y los módulos de lectura y análisis (whatsapp_cache,
+# whatsapp_store, whatsapp_palabras) se importan cuando hacen falta, para que
+# la ventana aparezca enseguida: matplotlib en segundo plano nada más
+# arrancar, wordcloud con la primera nube y el resto con el primer chat.
+
+# Milisegundos entre comprobaciones del estado de la tarea en segundo plano
+INTERVALO_SONDEO = 50
+
+# Milisegundos entre actualizaciones del panel de tiempos (con la instrumentación activa)
+INTERVALO_PERFIL = 1000
+
+# Milisegundos mínimos entre dos previsualizaciones mientras se arrastra el
+# deslizador (unas 15 por segundo); los movimientos intermedios se agrupan.
+INTERVALO_PREVISTA = 66
+
+# Escalas de la pestaña de evolución y usuarios que se dibujan, además del total
+ESCALAS_EVOLUCION = {"Día": "dia", "Semana": "semana", "Mes": "mes"}
+MAX_USUARIOS_EVOLUCION = 5
+
+# Formas de puntuar las palabras de la nube (ver utiles.MODOS_PALABRAS)
+PUNTUACIONES_PALABRAS = {"Diferencia": "diferencia", "TF-IDF": "tfidf", "Log-odds": "log_odds"}
+
+def importa_graficas():
+    """Importa matplotlib y su integración con Tk (en el hilo de trabajo, al arrancar)."""
+    import matplotlib.figure
+    import matplotlib.backends.backend_tkagg
+
+class TareaCancelada(Exception):
+    """Se lanza en el hilo de trabajo cuando la tarea ha quedado obsoleta."""
+
+def cargar_chat(ruta, comprobar, anterior=None):
+    """
+    Lee un chat (o lo recupera de la caché) y precalcula los agregados y el índice de palabras. Se ejecuta
+    en el hilo de trabajo, así que no toca la interfaz: solo informa del
+    progreso a través de `comprobar`.
+
+    `anterior` es el resultado de una carga previa del mismo fichero: si el
+    fichero solo ha crecido, sus agregados e índice se actualizan con los
+    mensajes nuevos en lugar de recalcularse.
+    """
+    from whatsapp_cache import carga_incremental
+    from whatsapp_palabras import IndicePalabras
+    with perfil.mide("carga.lectura") as medida:
+        store, conservados = carga_incremental(ruta, progreso=lambda f: comprobar(0.8 * f))
+        medida.mensajes = len(store) - conservados
+    comprobar(0.8)
+    if anterior is not None and 0 < conservados <= len(anterior[0]):
+        store_anterior, agregados, indice = anterior
+        # Lo que cambia: los mensajes anteriores a partir de `conservados` se
+        # sustituyen por los nuevos. Los agregados y el índice anteriores no se
+        # tocan (la interfaz los sigue usando hasta fichero_cargado): se
+        # construyen otros nuevos a partir de ellos.
+        with perfil.mide("carga.actualiza_agregados", len(store) - conservados):
+            agregados = utiles.actualiza_agregados(agregados, store.filas_agregados(conservados),
+                                                   store_anterior.filas_agregados(conservados))
+        comprobar(0.9)
+        with perfil.mide("carga.actualiza_indice", len(store) - conservados):
+            indice = indice.actualizado(store.filas_palabras(conservados), store_anterior.filas_palabras(conservados))
+        comprobar(1.0)
+        return store, agregados, indice
+    with perfil.mide("carga.agregados", len(store)):
+        agregados = store.precalcula_agregados()
+    comprobar(0.9)
+    with perfil.mide("carga.indice_palabras", len(store)):
+        indice = IndicePalabras.desde_store(store)
+    comprobar(1.0)
+    return store, agregados, indice
 
 class RangeSlider(tk.Canvas):
     def __init__(self, master, min_val, max_val, width=400, height=40, 
                  line_color="#cccccc", active_color="#075E54", handle_color="#128C7E",
-                 command_update=None, command_drag=None, **kwargs):
+                 command_update=None, command_drag=None, command_preview=None,
+                 preview_interval=INTERVALO_PREVISTA, **kwargs):
         super().__init__(master, width=width, height=height, highlightthickness=0, **kwargs)
         
         self.min_val = min_val
@@ -25,6 +96,12 @@ class RangeSlider(tk.Canvas):
         
         self.command_update = command_update 
         self.command_drag = command_drag
+        # Previsualización durante el arrastre: como mucho una cada
+        # preview_interval ms, siempre con la última posición
+        self.command_preview = command_preview
+        self.preview_interval = preview_interval
+        self.preview_job = None
+        self.last_preview = None
 
         # Geometría inicial
         self.width_canvas = width
@@ -98,6 +175,7 @@ class RangeSlider(tk.Canvas):
         self.pos_left = new_x
         self.update_graphics()
         if self.command_drag: self.command_drag(*self.get_values())
+        self.schedule_preview()
 
     def on_drag_right(self, event):
         if not self.enabled: return
@@ -105,11 +183,31 @@ class RangeSlider(tk.Canvas):
         self.pos_right = new_x
         self.update_graphics()
         if self.command_drag: self.command_drag(*self.get_values())
+        self.schedule_preview()
         
     def on_release(self, event):
         if not self.enabled: return
+        self.cancel_preview()
         if self.command_update: self.command_update(*self.get_values())
 
+    def schedule_preview(self):
+        """Programa una previsualización si no hay ya una pendiente (los movimientos se agrupan)."""
+        if self.command_preview is None or self.preview_job is not None: return
+        self.preview_job = self.after(self.preview_interval, self.run_preview)
+
+    def run_preview(self):
+        self.preview_job = None
+        valores = tuple(self.get_values())
+        if valores == self.last_preview: return
+        self.last_preview = valores
+        self.command_preview(*valores)
+
+    def cancel_preview(self):
+        if self.preview_job is not None:
+            self.after_cancel(self.preview_job)
+            self.preview_job = None
+        self.last_preview = None
+
     def update_graphics(self):
         r = 8
         self.coords(self.handle_left, self.pos_left-r, self.line_y-r, self.pos_left+r, self.line_y+r)
@@ -129,16 +227,77 @@ class RangeSlider(tk.Canvas):
         self.update_graphics()
 
 
+class GestorBlit:
+    """
+    Redibuja solo los artistas animados de una figura (blitting). Tras cada
+    dibujado completo de la figura se guarda el resto como fondo; después,
+    para cambiar los datos basta con restaurar el fondo y dibujar encima los
+    artistas animados.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.fondo = None
+        self.artistas = []
+        canvas.mpl_connect("draw_event", self.al_dibujar)
+
+    def fija_artistas(self, artistas):
+        """Marca como animados los artistas que cambian con los datos."""
+        self.artistas = list(artistas)
+        for artista in self.artistas:
+            artista.set_animated(True)
+
+    def al_dibujar(self, event):
+        self.fondo = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.dibujar_artistas()
+
+    def dibujar_artistas(self):
+        for artista in self.artistas:
+            self.canvas.figure.draw_artist(artista)
+
+    def actualiza(self, completo=False):
+        """Muestra los artistas con sus datos nuevos; con completo=True (p. ej. si cambian los ejes) redibuja todo."""
+        if completo or self.fondo is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.fondo)
+        self.dibujar_artistas()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+def ajusta_limite_y(ax, maximo):
+    """
+    Ajusta el límite superior del eje y solo cuando las barras no caben o
+    ocupan menos de la mitad, para no tener que redibujar los ejes en cada
+    cambio. Devuelve si el límite ha cambiado.
+    """
+    superior = ax.get_ylim()[1]
+    if (0 < maximo <= superior and maximo >= superior / 2) or (maximo == 0 and superior == 1):
+        return False
+    ax.set_ylim(0, maximo * 1.1 if maximo > 0 else 1)
+    return True
+
 class WhatsAppAnalyzerApp:
     def __init__(self, root):
         self.root = root
         self.root.title("WhatsApp Analytics")
         self.root.geometry("1000x900")
         
-        self.mensajes_todos = [] 
-        self.mensajes = []      
+        self.mensajes_todos = []
+        self.agregados = None
+        self.estadisticas = utiles.consulta_agregados(None)
+        self.indice_palabras = None
+        self.nubes = CacheNubes()
+        self.rango_actual = (None, None)
+        self.usuarios_dibujados = None
+        self.ruta = None
         self.filename = None
 
+        # Trabajo pesado (carga, análisis, nubes de palabras) en un hilo aparte
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.tarea = None
+        self.generacion = 0
+        self.progreso = None
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
+
         style = ttk.Style()
         style.theme_use('clam')
         
@@ -151,6 +310,8 @@ class WhatsAppAnalyzerApp:
         
         self.lbl_status = ttk.Label(frame_top, text="Ningún archivo cargado", font=("Arial", 10, "italic"))
         self.lbl_status.pack(side=tk.LEFT, padx=10)
+
+        self.barra_progreso = ttk.Progressbar(frame_top, mode="determinate", length=150, maximum=1.0)
         
         self.lbl_stats = ttk.Label(frame_top, text="", font=("Arial", 10, "bold"), foreground="#075E54")
         self.lbl_stats.pack(side=tk.RIGHT, padx=10)
@@ -171,12 +332,29 @@ class WhatsAppAnalyzerApp:
         self.tab_words = ttk.Frame(self.notebook)
         self.notebook.add(self.tab_words, text="💬 Nube de Palabras")
 
-        self.crear_panel_usuarios()
-        self.crear_panel_tiempo()
+        self.tab_timeline = ttk.Frame(self.notebook)
+        self.notebook.add(self.tab_timeline, text="📈 Evolución")
+
+        # Los controles se crean ya; las gráficas, en cuanto matplotlib termina
+        # de importarse en segundo plano
         self.crear_panel_palabras()
+        self.crear_panel_evolucion()
+        self.lbl_dia_top = ttk.Label(self.tab_time, text="", font=("Arial", 12, "bold"))
+        self.lbl_dia_top.pack(side=tk.BOTTOM, pady=5)
+        self.graficas_listas = False
+        self.root.after(INTERVALO_SONDEO, self.esperar_graficas, self.executor.submit(importa_graficas))
+
+        # Las pestañas ocultas no se dibujan al cambiar los datos, sino al seleccionarlas
+        self.dibujos = {str(self.tab_users): self.dibujar_usuarios, str(self.tab_time): self.dibujar_tiempo,
+                        str(self.tab_words): self.actualizar_palabras, str(self.tab_timeline): self.dibujar_evolucion}
+        self.pestanas_pendientes = set()
+        self.notebook.bind("<<NotebookTabChanged>>", self.dibujar_pestana_visible)
 
         self.toggle_interface(enable=False)
 
+        if perfil.ACTIVO:
+            self.crear_panel_perfil()
+
     def toggle_interface(self, enable=True):
         """Habilita o deshabilita los controles de la interfaz (excepto cargar)."""
         state_val = "normal" if enable else "disabled"
@@ -188,11 +366,12 @@ class WhatsAppAnalyzerApp:
         for tab_id in self.notebook.tabs():
             self.notebook.tab(tab_id, state=state_val)
             
-        # 3. Combo box de usuarios
-        if enable:
-            self.combo_users.config(state="readonly")
-        else:
-            self.combo_users.config(state="disabled")
+        # 3. Combo boxes de usuario, puntuación y escala
+        for combo in (self.combo_users, self.combo_puntuacion, self.combo_escala):
+            if enable:
+                combo.config(state="readonly")
+            else:
+                combo.config(state="disabled")
 
     def crear_panel_filtro(self):
         self.frame_filtro = ttk.LabelFrame(self.root, text="📅 Filtrar por rango de fechas", padding="10")
@@ -209,37 +388,149 @@ class WhatsAppAnalyzerApp:
 
         self.range_slider = RangeSlider(self.frame_filtro, min_val=0, max_val=100, height=40, width=900,
                                         command_drag=self.actualizar_etiquetas_drag,
-                                        command_update=self.ejecutar_filtro_release)
+                                        command_update=self.ejecutar_filtro_release,
+                                        command_preview=self.previsualizar_rango)
         self.range_slider.pack(fill=tk.X, padx=10, pady=5)
 
+    def esperar_graficas(self, importacion):
+        if not importacion.done():
+            self.root.after(INTERVALO_SONDEO, self.esperar_graficas, importacion)
+            return
+        error = importacion.exception()
+        if error is not None:
+            messagebox.showerror("Error", f"No se han podido cargar las gráficas:\n{error}")
+            return
+        self.crear_graficas()
+
+    def crear_graficas(self):
+        self.crear_panel_usuarios()
+        self.crear_panel_tiempo()
+        self.crear_grafica_palabras()
+        self.crear_grafica_evolucion()
+        if perfil.ACTIVO:
+            perfil.instrumenta_metodo(self.canvas_users, "draw", "gui.draw.usuarios")
+            perfil.instrumenta_metodo(self.canvas_time, "draw", "gui.draw.tiempo")
+            perfil.instrumenta_metodo(self.canvas_words, "draw", "gui.draw.palabras")
+            perfil.instrumenta_metodo(self.canvas_timeline, "draw", "gui.draw.evolucion")
+            perfil.instrumenta_metodo(self.blit_usuarios, "actualiza", "gui.blit.usuarios")
+            perfil.instrumenta_metodo(self.blit_tiempo, "actualiza", "gui.blit.tiempo")
+        self.graficas_listas = True
+        # Lo que se haya pedido dibujar mientras tanto
+        self.dibujar_pestana_visible()
+
+    def crear_panel_perfil(self):
+        """Muestra en la ventana los tiempos de cada etapa."""
+        self.lbl_perfil = ttk.Label(self.root, text="", font=("Courier", 8), justify=tk.LEFT)
+        self.lbl_perfil.pack(side=tk.BOTTOM, fill=tk.X, padx=10, before=self.notebook)
+        self.actualizar_panel_perfil()
+
+    def actualizar_panel_perfil(self):
+        self.lbl_perfil.config(text=perfil.texto_resumen(8))
+        self.root.after(INTERVALO_PERFIL, self.actualizar_panel_perfil)
+
+    def lanzar_tarea(self, funcion, al_terminar, al_fallar=None):
+        """
+        Ejecuta funcion(comprobar) en el hilo de trabajo y, cuando termina,
+        llama a al_terminar(resultado) desde el hilo de la interfaz (mediante
+        root.after). Cada tarea nueva deja obsoletas las anteriores: si no han
+        empezado se cancelan y, si están en marcha, su resultado se descarta.
+        La tarea debe llamar de vez en cuando a comprobar(fraccion), que
+        actualiza la barra de progreso y lanza TareaCancelada si ha quedado
+        obsoleta.
+        """
+        self.generacion += 1
+        generacion = self.generacion
+        if self.tarea is not None:
+            self.tarea.cancel()
+
+        def comprobar(fraccion=None):
+            if generacion != self.generacion:
+                raise TareaCancelada()
+            self.progreso = fraccion
+
+        self.progreso = None
+        self.tarea = self.executor.submit(funcion, comprobar)
+        self.barra_progreso.pack(side=tk.LEFT, padx=10)
+        self.root.after(INTERVALO_SONDEO, self.sondear_tarea, self.tarea, generacion, al_terminar, al_fallar)
+
+    def sondear_tarea(self, tarea, generacion, al_terminar, al_fallar):
+        if generacion != self.generacion:
+            return
+        if not tarea.done():
+            if self.progreso is None:
+                self.barra_progreso.config(mode="indeterminate")
+                self.barra_progreso.step(0.05)
+            else:
+                self.barra_progreso.config(mode="determinate", value=self.progreso)
+            self.root.after(INTERVALO_SONDEO, self.sondear_tarea, tarea, generacion, al_terminar, al_fallar)
+            return
+
+        self.barra_progreso.pack_forget()
+        error = tarea.exception()
+        if error is None:
+            al_terminar(tarea.result())
+        elif al_fallar:
+            al_fallar(error)
+        else:
+            messagebox.showerror("Error", f"Error en el análisis:\n{error}")
+            print(error)
+
+    def cerrar(self):
+        # Deja obsoleta la tarea en curso para que termine cuanto antes
+        self.generacion += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        perfil.termina()
+        self.root.destroy()
+
     def cargar_fichero(self):
         filepath = filedialog.askopenfilename(filetypes=[("Archivos de texto", "*.txt"), ("Todos", "*.*")])
         if not filepath: return
-        
-        try:
-            self.mensajes_todos = leer_log_whatsapp(filepath)
-            if not self.mensajes_todos:
-                messagebox.showwarning("Aviso", "No se han encontrado mensajes válidos.")
-                return
-                
-            self.filename = filepath.split("/")[-1]
-            self.lbl_status.config(text=f"Archivo: {self.filename}")
 
-            self.toggle_interface(enable=True)
+        self.toggle_interface(enable=False)
+        self.lbl_status.config(text=f"Cargando {filepath.split('/')[-1]}...")
+        # Si se vuelve a abrir el mismo chat (p. ej. una exportación más reciente),
+        # se aprovecha lo ya calculado
+        anterior = None
+        if filepath == self.ruta:
+            anterior = (self.mensajes_todos, self.agregados, self.indice_palabras)
+        self.lanzar_tarea(lambda comprobar: cargar_chat(filepath, comprobar, anterior),
+                          lambda resultado: self.fichero_cargado(filepath, resultado),
+                          al_fallar=self.error_carga)
+
+    def fichero_cargado(self, filepath, resultado):
+        store, agregados, indice = resultado
+        if not store:
+            messagebox.showwarning("Aviso", "No se han encontrado mensajes válidos.")
+            self.restaurar_estado()
+            return
+        self.mensajes_todos, self.agregados, self.indice_palabras = store, agregados, indice
 
-            fecha_min, fecha_max = utiles.calcula_rango_fechas(self.mensajes_todos)
-            min_ord = fecha_min.toordinal()
-            max_ord = fecha_max.toordinal()
-            
-            self.range_slider.set_range(min_ord, max_ord)
-            self.actualizar_etiquetas_drag(min_ord, max_ord)
-            self.ejecutar_filtro_release(min_ord, max_ord)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al procesar el archivo:\n{e}")
-            print(e)
-            if not self.mensajes_todos:
-                self.toggle_interface(enable=False)
+        self.ruta = filepath
+        self.filename = filepath.split("/")[-1]
+        self.lbl_status.config(text=f"Archivo: {self.filename}")
+
+        self.toggle_interface(enable=True)
+
+        fecha_min, fecha_max = self.mensajes_todos.calcula_rango_fechas()
+        min_ord = fecha_min.toordinal()
+        max_ord = fecha_max.toordinal()
+
+        self.range_slider.set_range(min_ord, max_ord)
+        self.actualizar_etiquetas_drag(min_ord, max_ord)
+        self.ejecutar_filtro_release(min_ord, max_ord)
+
+    def error_carga(self, e):
+        messagebox.showerror("Error", f"Error al procesar el archivo:\n{e}")
+        print(e)
+        self.restaurar_estado()
+
+    def restaurar_estado(self):
+        """Vuelve a mostrar el chat que hubiera cargado antes de un intento fallido."""
+        if self.filename:
+            self.lbl_status.config(text=f"Archivo: {self.filename}")
+        else:
+            self.lbl_status.config(text="Ningún archivo cargado")
+        self.toggle_interface(enable=bool(self.mensajes_todos))
 
     def actualizar_etiquetas_drag(self, val_min, val_max):
         f_ini = date.fromordinal(int(val_min))
@@ -247,33 +538,83 @@ class WhatsAppAnalyzerApp:
         self.str_fecha_inicio.set(f_ini.strftime("%d/%m/%Y"))
         self.str_fecha_fin.set(f_fin.strftime("%d/%m/%Y"))
 
+    def previsualizar_rango(self, val_min, val_max):
+        """
+        Redibuja las gráficas de usuarios y de tiempo mientras se arrastra el
+        deslizador. Usa solo los agregados precalculados (milisegundos por
+        consulta) y deja obsoleta cualquier tarea en curso, cuyo resultado ya
+        no corresponde al rango elegido; al soltar se recalcula todo de forma
+        exacta con ejecutar_filtro_release.
+        """
+        if not self.mensajes_todos: return
+        self.generacion += 1
+        self.barra_progreso.pack_forget()
+        f_ini = date.fromordinal(int(val_min))
+        f_fin = date.fromordinal(int(val_max))
+        self.rango_actual = (f_ini, f_fin)
+        with perfil.mide("gui.previsualizacion"):
+            self.estadisticas = utiles.consulta_agregados(self.agregados, fecha_inicio=f_ini, fecha_fin=f_fin)
+            self.lbl_stats.config(text=f"Mostrando: {self.estadisticas.total} / {len(self.mensajes_todos)} msgs")
+            self.dibujar_graficas()
+
     def ejecutar_filtro_release(self, val_min, val_max):
         if not self.mensajes_todos: return
         f_ini = date.fromordinal(int(val_min))
         f_fin = date.fromordinal(int(val_max))
-        
-        self.mensajes = utiles.filtra_mensajes_por_fechas(self.mensajes_todos, fecha_inicio=f_ini, fecha_fin=f_fin)
-        
-        self.lbl_stats.config(text=f"Mostrando: {len(self.mensajes)} / {len(self.mensajes_todos)} msgs")
-        self.actualizar_graficas()
+        agregados = self.agregados
+
+        # El número de mensajes del rango sale de los agregados: no hace falta
+        # filtrar el almacén
+        def analizar(comprobar):
+            return utiles.consulta_agregados(agregados, fecha_inicio=f_ini, fecha_fin=f_fin)
+
+        self.lanzar_tarea(analizar, lambda estadisticas: self.mostrar_rango(f_ini, f_fin, estadisticas))
+
+    def mostrar_rango(self, f_ini, f_fin, estadisticas):
+        self.estadisticas = estadisticas
+        self.rango_actual = (f_ini, f_fin)
+
+        self.lbl_stats.config(text=f"Mostrando: {self.estadisticas.total} / {len(self.mensajes_todos)} msgs")
+        with perfil.mide("gui.actualizar_graficas", self.estadisticas.total):
+            self.actualizar_graficas()
 
     def crear_panel_usuarios(self):
-        self.fig_users = plt.Figure(figsize=(10, 5), dpi=100)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig_users = Figure(figsize=(10, 5), dpi=100)
         self.ax_pie = self.fig_users.add_subplot(121)
         self.ax_len = self.fig_users.add_subplot(122)
         self.fig_users.tight_layout(pad=4.0)
         self.canvas_users = FigureCanvasTkAgg(self.fig_users, master=self.tab_users)
         self.canvas_users.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.blit_usuarios = GestorBlit(self.canvas_users)
 
     def crear_panel_tiempo(self):
-        self.fig_time = plt.Figure(figsize=(10, 8), dpi=100)
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig_time = Figure(figsize=(10, 8), dpi=100)
         self.ax_hour = self.fig_time.add_subplot(211)
         self.ax_week = self.fig_time.add_subplot(212)
         self.fig_time.subplots_adjust(hspace=0.5)
+
+        # Las barras se crean una vez y al cambiar el rango solo cambia su altura
+        self.barras_hora = self.ax_hour.bar(range(24), [0] * 24, color='skyblue', edgecolor='black')
+        self.ax_hour.set_xticks(range(0, 24))
+        self.ax_hour.set_xlabel("Hora")
+        self.ax_hour.set_ylabel("Mensajes")
+        self.ax_hour.set_title("Actividad por hora")
+        self.ax_hour.grid(axis='y', linestyle='--', alpha=0.7)
+
+        self.barras_semana = self.ax_week.bar(utiles.DIAS_SEMANA, [0] * 7, color='salmon', edgecolor='black')
+        self.ax_week.set_title("Actividad por Día de la Semana")
+        self.ax_week.set_xlabel("Día")
+        self.ax_week.set_ylabel("Mensajes")
+        self.ax_week.grid(axis='y', linestyle='--', alpha=0.6)
+
         self.canvas_time = FigureCanvasTkAgg(self.fig_time, master=self.tab_time)
         self.canvas_time.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        self.lbl_dia_top = ttk.Label(self.tab_time, text="", font=("Arial", 12, "bold"))
-        self.lbl_dia_top.pack(side=tk.BOTTOM, pady=5)
+        self.blit_tiempo = GestorBlit(self.canvas_time)
+        self.blit_tiempo.fija_artistas([*self.barras_hora, *self.barras_semana])
 
     def crear_panel_palabras(self):
         frame_ctrl = ttk.Frame(self.tab_words)
@@ -282,72 +623,46 @@ class WhatsAppAnalyzerApp:
         self.combo_users = ttk.Combobox(frame_ctrl, state="disabled") 
         self.combo_users.pack(side=tk.LEFT, padx=5)
         self.combo_users.bind("<<ComboboxSelected>>", self.actualizar_palabras)
-        self.fig_words = plt.Figure(figsize=(10, 5), dpi=100)
+        ttk.Label(frame_ctrl, text="Puntuación:").pack(side=tk.LEFT, padx=5)
+        self.combo_puntuacion = ttk.Combobox(frame_ctrl, state="readonly", values=list(PUNTUACIONES_PALABRAS))
+        self.combo_puntuacion.set("Diferencia")
+        self.combo_puntuacion.pack(side=tk.LEFT, padx=5)
+        self.combo_puntuacion.bind("<<ComboboxSelected>>", self.actualizar_palabras)
+
+    def crear_grafica_palabras(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig_words = Figure(figsize=(10, 5), dpi=100)
         self.ax_words = self.fig_words.add_subplot(111)
         self.ax_words.axis("off")
         self.fig_words.tight_layout(pad=1.0)
         self.canvas_words = FigureCanvasTkAgg(self.fig_words, master=self.tab_words)
         self.canvas_words.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+    def crear_panel_evolucion(self):
+        frame_ctrl = ttk.Frame(self.tab_timeline)
+        frame_ctrl.pack(fill=tk.X, pady=5)
+        ttk.Label(frame_ctrl, text="Mensajes por:").pack(side=tk.LEFT, padx=5)
+        self.combo_escala = ttk.Combobox(frame_ctrl, state="readonly", values=list(ESCALAS_EVOLUCION))
+        self.combo_escala.set("Semana")
+        self.combo_escala.pack(side=tk.LEFT, padx=5)
+        self.combo_escala.bind("<<ComboboxSelected>>", lambda event: self.dibujar_evolucion())
+
+    def crear_grafica_evolucion(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig_timeline = Figure(figsize=(10, 5), dpi=100)
+        self.ax_timeline = self.fig_timeline.add_subplot(111)
+        self.canvas_timeline = FigureCanvasTkAgg(self.fig_timeline, master=self.tab_timeline)
+        self.canvas_timeline.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
     def actualizar_graficas(self):
-        if not self.mensajes:
-            self.ax_pie.clear()
-            self.ax_len.clear()
-            self.ax_hour.clear()
-            self.ax_week.clear()
-            self.canvas_users.draw()
-            self.canvas_time.draw()
-            self.lbl_dia_top.config(text="Sin mensajes en este rango")
+        self.dibujar_graficas()
+        if not self.estadisticas.total:
             return
 
-        dict_msgs = utiles.cuenta_mensajes_por_usuario(self.mensajes)
-        self.ax_pie.clear()
-        if dict_msgs:
-            self.ax_pie.pie(dict_msgs.values(), labels=dict_msgs.keys(), autopct='%1.1f%%', startangle=90)
-            self.ax_pie.set_title("Mensajes por Usuario")
-        
-        dict_len = utiles.calcula_longitud_media_por_usuario(self.mensajes)
-        self.ax_len.clear()
-        if dict_len:
-            usuarios = list(dict_len.keys())
-            longitudes = list(dict_len.values())
-            colores = plt.cm.Paired(range(len(usuarios)))
-            self.ax_len.bar(usuarios, longitudes, color=colores)
-            self.ax_len.set_title("Longitud Media (caracteres)")
-            self.ax_len.tick_params(axis='x', rotation=45)
-        self.canvas_users.draw()
-
-        dict_horas = utiles.cuenta_mensajes_por_hora(self.mensajes)
-        self.ax_hour.clear()
-        self.ax_hour.bar(dict_horas.keys(), dict_horas.values(), color='skyblue', edgecolor='black')
-        self.ax_hour.set_xticks(range(0, 24))
-        self.ax_hour.set_xlabel("Hora")
-        self.ax_hour.set_ylabel("Mensajes")
-        self.ax_hour.set_title("Actividad por hora")
-        self.ax_hour.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        dict_dias = utiles.cuenta_mensajes_por_dia_semana(self.mensajes)
-        self.ax_week.clear()
-        if dict_dias:
-            dias = list(dict_dias.keys())
-            conteos = list(dict_dias.values())
-            self.ax_week.bar(dias, conteos, color='salmon', edgecolor='black')
-            self.ax_week.set_title("Actividad por Día de la Semana")
-            self.ax_week.set_xlabel("Día")
-            self.ax_week.set_ylabel("Mensajes")
-            self.ax_week.grid(axis='y', linestyle='--', alpha=0.6)
-        self.canvas_time.draw()
-
-        dia_top = utiles.detecta_dia_mas_activo(self.mensajes)
-        if dia_top:
-            fecha_obj = dia_top[0]
-            fecha_str = fecha_obj.strftime("%d/%m/%Y")
-            self.lbl_dia_top.config(text=f"📅 Día más activo: {fecha_str} ({dia_top[1]} msgs)")
-        else:
-            self.lbl_dia_top.config(text="")
-
         seleccion_actual = self.combo_users.get()
-        usuarios_disponibles = list(dict_msgs.keys())
+        usuarios_disponibles = list(self.estadisticas.por_usuario.keys())
         self.combo_users['values'] = usuarios_disponibles
         if usuarios_disponibles:
             if seleccion_actual in usuarios_disponibles:
@@ -357,27 +672,198 @@ class WhatsAppAnalyzerApp:
             self.actualizar_palabras()
         else:
             self.combo_users.set('')
-            self.ax_words.clear()
-            self.ax_words.axis("off")
-            self.canvas_words.draw()
+            if self.graficas_listas:
+                self.ax_words.clear()
+                self.ax_words.axis("off")
+                self.canvas_words.draw()
+
+    def dibujar_graficas(self):
+        """
+        Actualiza las gráficas de usuarios y de tiempo con self.estadisticas.
+        Solo se dibuja la pestaña visible; las demás quedan pendientes hasta
+        que se seleccionan.
+        """
+        self.pestanas_pendientes.update((str(self.tab_users), str(self.tab_time), str(self.tab_timeline)))
+        self.dibujar_pestana_visible()
+
+        dia_top = self.estadisticas.dia_mas_activo
+        if not self.estadisticas.total:
+            self.lbl_dia_top.config(text="Sin mensajes en este rango")
+        elif dia_top:
+            fecha_obj = dia_top[0]
+            fecha_str = fecha_obj.strftime("%d/%m/%Y")
+            self.lbl_dia_top.config(text=f"📅 Día más activo: {fecha_str} ({dia_top[1]} msgs)")
+        else:
+            self.lbl_dia_top.config(text="")
+
+    def dibujar_pestana_visible(self, event=None):
+        if not self.graficas_listas: return
+        pestana = self.notebook.select()
+        if pestana in self.pestanas_pendientes:
+            self.pestanas_pendientes.discard(pestana)
+            self.dibujos[pestana]()
+
+    def dibujar_usuarios(self):
+        """
+        Gráficas de mensajes y longitud media por usuario. Si los usuarios del
+        rango son los mismos que en el último dibujo, se reutilizan la tarta y
+        las barras y solo se redibujan ellas; si no, se crean de nuevo.
+        """
+        dict_msgs = self.estadisticas.por_usuario
+        dict_len = self.estadisticas.longitud_media
+        usuarios = list(dict_msgs.keys())
+        if usuarios != self.usuarios_dibujados:
+            from matplotlib import colormaps
+            self.usuarios_dibujados = usuarios
+            self.ax_pie.clear()
+            self.ax_len.clear()
+            artistas = []
+            if usuarios:
+                self.tarta = self.ax_pie.pie(dict_msgs.values(), labels=usuarios, autopct='%1.1f%%', startangle=90)
+                self.ax_pie.set_title("Mensajes por Usuario")
+                colores = colormaps["Paired"](range(len(usuarios)))
+                self.barras_longitud = self.ax_len.bar(usuarios, [dict_len[u] for u in usuarios], color=colores)
+                self.ax_len.set_title("Longitud Media (caracteres)")
+                self.ax_len.tick_params(axis='x', rotation=45)
+                artistas = [*self.tarta[0], *self.tarta[1], *self.tarta[2], *self.barras_longitud]
+            self.blit_usuarios.fija_artistas(artistas)
+            self.blit_usuarios.actualiza(completo=True)
+            return
+        if not usuarios:
+            return
+
+        self.mover_tarta(list(dict_msgs.values()))
+        for usuario, barra in zip(usuarios, self.barras_longitud):
+            barra.set_height(dict_len[usuario])
+        self.blit_usuarios.actualiza(completo=ajusta_limite_y(self.ax_len, max(dict_len.values())))
+
+    def dibujar_evolucion(self):
+        """
+        Mensajes por día, semana o mes en el rango actual: el total y los
+        MAX_USUARIOS_EVOLUCION usuarios que más escriben. Cada línea se reduce
+        para no tener más puntos que píxeles de ancho la gráfica.
+        """
+        if not self.graficas_listas: return
+        f_ini, f_fin = self.rango_actual
+        serie = utiles.series_temporales(self.agregados, ESCALAS_EVOLUCION[self.combo_escala.get()], f_ini, f_fin)
+        self.ax_timeline.clear()
+        if serie is not None:
+            max_puntos = max(self.canvas_timeline.get_tk_widget().winfo_width(), 2)
+            principales = sorted(serie.por_usuario, key=lambda u: -sum(serie.por_usuario[u]))[:MAX_USUARIOS_EVOLUCION]
+            lineas = [("Total", serie.total)] + [(u, serie.por_usuario[u]) for u in principales]
+            for k, (nombre, valores) in enumerate(lineas):
+                posiciones = utiles.reduce_serie(valores, max_puntos)
+                self.ax_timeline.plot([serie.inicios[p] for p in posiciones], [valores[p] for p in posiciones],
+                                      label=nombre, color="black" if k == 0 else None, linewidth=2 if k == 0 else 1)
+            self.ax_timeline.set_title(f"Mensajes por {self.combo_escala.get().lower()}")
+            self.ax_timeline.set_ylabel("Mensajes")
+            self.ax_timeline.grid(axis='y', linestyle='--', alpha=0.6)
+            self.ax_timeline.legend(loc="upper left")
+            self.fig_timeline.autofmt_xdate()
+        self.canvas_timeline.draw()
+
+    def mover_tarta(self, conteos):
+        """Cambia los ángulos de las cuñas de la tarta y mueve sus etiquetas como lo haría pie()."""
+        total = sum(conteos)
+        angulo = 90
+        for cuna, texto, autotexto, n in zip(*self.tarta, conteos):
+            fin = angulo + 360 * n / total
+            cuna.set_theta1(angulo)
+            cuna.set_theta2(fin)
+            medio = math.radians((angulo + fin) / 2)
+            x, y = math.cos(medio), math.sin(medio)
+            texto.set_position((1.1 * x, 1.1 * y))
+            texto.set_horizontalalignment('left' if x > 0 else 'right')
+            autotexto.set_position((0.6 * x, 0.6 * y))
+            autotexto.set_text(f"{100 * n / total:.1f}%")
+            angulo = fin
+
+    def dibujar_tiempo(self):
+        """Gráficas de actividad por hora y por día de la semana: solo cambian las alturas de las barras."""
+        por_hora = self.estadisticas.por_hora
+        por_dia = self.estadisticas.por_dia_semana
+        for hora, barra in enumerate(self.barras_hora):
+            barra.set_height(por_hora.get(hora, 0))
+        for dia, barra in zip(utiles.DIAS_SEMANA, self.barras_semana):
+            barra.set_height(por_dia.get(dia, 0))
+        cambia_hora = ajusta_limite_y(self.ax_hour, max(por_hora.values(), default=0))
+        cambia_semana = ajusta_limite_y(self.ax_week, max(por_dia.values(), default=0))
+        self.blit_tiempo.actualiza(completo=cambia_hora or cambia_semana)
 
     def actualizar_palabras(self, event=None):
-        if not self.mensajes: return
+        """
+        Muestra la nube de palabras del usuario elegido en el rango actual.
+        Solo se genera con la pestaña de palabras visible (si no, queda
+        pendiente hasta que se selecciona). Si la nube está en la caché se
+        muestra directamente; si no, primero se muestra una versión reducida y
+        la completa se genera después en segundo plano. Con TF-IDF o log-odds,
+        las puntuaciones de todos los usuarios se calculan juntas una vez por
+        rango, así que cambiar de usuario es inmediato.
+        """
+        if not self.estadisticas.total: return
         user_sel = self.combo_users.get()
         if not user_sel: return
-        frecuencias = dict(utiles.analiza_palabras_caracteristicas(self.mensajes, user_sel, n=100))
-        
+        if not self.graficas_listas or self.notebook.select() != str(self.tab_words):
+            self.pestanas_pendientes.add(str(self.tab_words))
+            return
+        self.pestanas_pendientes.discard(str(self.tab_words))
+        f_ini, f_fin = self.rango_actual
+        indice, nubes = self.indice_palabras, self.nubes
+        modo = PUNTUACIONES_PALABRAS[self.combo_puntuacion.get()]
+
+        def generar(comprobar):
+            with perfil.mide("nube.palabras_caracteristicas"):
+                frecuencias = dict(indice.palabras_caracteristicas(user_sel, n=100, fecha_inicio=f_ini, fecha_fin=f_fin,
+                                                                   modo=modo))
+            comprobar()
+            if not frecuencias:
+                return None, None, None
+            clave = clave_nube(user_sel, f_ini, f_fin, frecuencias)
+            imagen = nubes.busca(clave)
+            if imagen is not None:
+                return imagen, None, None
+            with perfil.mide("nube.prevista"):
+                return genera_nube(frecuencias, prevista=True), clave, frecuencias
+
+        self.lanzar_tarea(generar, lambda resultado: self.mostrar_prevista(user_sel, *resultado))
+
+    def mostrar_prevista(self, user_sel, imagen, clave, frecuencias):
+        """Muestra la nube (reducida o ya definitiva) y, si hace falta, lanza la generación de la completa."""
+        self.mostrar_nube(user_sel, imagen)
+        if frecuencias is None: return
+        nubes = self.nubes
+
+        def generar(comprobar):
+            with perfil.mide("nube.wordcloud"):
+                imagen = genera_nube(frecuencias)
+            nubes.guarda(clave, imagen)
+            return imagen
+
+        self.lanzar_tarea(generar, lambda imagen: self.mostrar_nube(user_sel, imagen))
+
+    def mostrar_nube(self, user_sel, imagen):
         self.ax_words.clear()
         self.ax_words.axis("off") 
-        if not frecuencias:
+        if imagen is None:
             self.ax_words.text(0.5, 0.5, "Sin datos suficientes", ha='center', va='center', fontsize=14)
         else:
-            wc = WordCloud(background_color="white", width=800, height=400, colormap="viridis", max_words=100).generate_from_frequencies(frecuencias)
-            self.ax_words.imshow(wc, interpolation='bilinear')
+            self.ax_words.imshow(imagen, interpolation='bilinear')
             self.ax_words.set_title(f"Nube de palabras: {user_sel}", fontsize=14)
         self.canvas_words.draw()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analizador de chats de WhatsApp.")
+    parser.add_argument("--perfil", nargs="?", const="", metavar="JSON",
+                        help="Mide el tiempo de cada etapa, lo muestra en la ventana y, si se indica, "
+                             f"lo guarda en JSON al cerrar (también con {perfil.VARIABLE_ENTORNO}=1|JSON).")
+    parser.add_argument("--cprofile", metavar="RUTA",
+                        help=f"Captura un perfil de cProfile del hilo de la interfaz (también con {perfil.VARIABLE_CPROFILE}).")
+    args = parser.parse_args()
+    if args.perfil is not None or args.cprofile:
+        perfil.activa(args.perfil or None, args.cprofile, modulos=(utiles, whatsapp_loader))
+    else:
+        perfil.activa_desde_entorno(modulos=(utiles, whatsapp_loader))
+
     root = tk.Tk()
     app = WhatsAppAnalyzerApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
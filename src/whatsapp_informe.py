@@ -0,0 +1,95 @@
+import csv
+import json
+from collections.abc import Iterator
+from whatsapp_utiles import Estadisticas, extrae_palabras_caracteristicas, puntua_palabras
+
+# Columnas de los informes CSV: una fila por valor, en formato largo, para que
+# todos los chats (y el informe combinado) compartan las mismas columnas.
+COLUMNAS_CSV = ["chat", "metrica", "clave", "valor"]
+
+def estadisticas_a_dict(estadisticas: Estadisticas) -> dict:
+    """
+    Convierte unas Estadisticas en un diccionario que se puede guardar como
+    JSON: las fechas pasan a texto ISO (AAAA-MM-DD) y las claves de los
+    recuentos a texto.
+
+    Parámetros:
+    estadisticas (Estadisticas): Resultado de analiza_todo o consulta_agregados.
+
+    Devuelve:
+    dict: Estadísticas con tipos de JSON.
+    """
+    dia_mas_activo = None
+    if estadisticas.dia_mas_activo is not None:
+        fecha, mensajes = estadisticas.dia_mas_activo
+        dia_mas_activo = {"fecha": fecha.isoformat(), "mensajes": mensajes}
+    rango_fechas = None
+    if estadisticas.rango_fechas is not None:
+        rango_fechas = [f.isoformat() for f in estadisticas.rango_fechas]
+    return {
+        "total": estadisticas.total,
+        "por_usuario": dict(estadisticas.por_usuario),
+        "longitud_media": dict(estadisticas.longitud_media),
+        "por_hora": {str(h): c for h, c in sorted(estadisticas.por_hora.items())},
+        "por_dia_semana": dict(estadisticas.por_dia_semana),
+        "dia_mas_activo": dia_mas_activo,
+        "rango_fechas": rango_fechas,
+    }
+
+def informe_de_store(store, n_palabras: int = 0, modo: str = "diferencia") -> dict:
+    """
+    Calcula las estadísticas de los mensajes de un MensajeStore y las
+    devuelve como informe (ver estadisticas_a_dict). Con n_palabras > 0
+    incluye también, en "palabras", las n_palabras palabras más
+    características de cada usuario, puntuadas según `modo` (uno de
+    MODOS_PALABRAS).
+    """
+    estadisticas = store.analiza_todo(palabras=n_palabras > 0)
+    informe = estadisticas_a_dict(estadisticas)
+    if n_palabras > 0 and modo == "diferencia":
+        informe["palabras"] = {u: extrae_palabras_caracteristicas(estadisticas, u, n_palabras)
+                               for u in estadisticas.por_usuario}
+    elif n_palabras > 0:
+        puntuaciones = puntua_palabras(estadisticas.palabras_usuario, modo)
+        informe["palabras"] = {u: puntuaciones.get(u, [])[:n_palabras] for u in estadisticas.por_usuario}
+    return informe
+
+def filas_csv(chat: str, informe: dict) -> Iterator[list]:
+    """
+    Devuelve las filas CSV (chat, métrica, clave, valor) de un informe. Los
+    valores simples van con la clave vacía; los anidados usan como métrica el
+    camino hasta ellos separado por puntos (p. ej. "palabras.Laura") y como
+    clave la última parte. Las listas de pares (palabra, apariciones) usan la
+    palabra como clave y el resto de listas, la posición.
+    """
+    for camino, valor in _aplana(informe, []):
+        if len(camino) == 1:
+            yield [chat, camino[0], "", valor]
+        else:
+            yield [chat, ".".join(camino[:-1]), camino[-1], valor]
+
+def _aplana(valor, camino):
+    if isinstance(valor, dict):
+        for clave, v in valor.items():
+            yield from _aplana(v, camino + [str(clave)])
+    elif isinstance(valor, (list, tuple)):
+        for i, v in enumerate(valor):
+            if isinstance(v, (list, tuple)) and len(v) == 2 and isinstance(v[0], str):
+                yield camino + [v[0]], v[1]
+            else:
+                yield from _aplana(v, camino + [str(i)])
+    elif valor is not None:
+        yield camino, valor
+
+def escribe_json(informe: dict, ruta: str) -> None:
+    """Guarda un informe en un fichero JSON (UTF-8, legible)."""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+
+def escribe_csv(informes: dict[str, dict], ruta: str) -> None:
+    """Guarda uno o varios informes (por nombre de chat) en un fichero CSV."""
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUMNAS_CSV)
+        for chat, informe in informes.items():
+            escritor.writerows(filas_csv(chat, informe))
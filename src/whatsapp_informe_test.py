@@ -0,0 +1,51 @@
+import json
+from collections import Counter
+from whatsapp_informe import *
+from whatsapp_store import MensajeStore
+from whatsapp_utiles import *
+from datetime import date, time
+
+MENSAJES = [
+    Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola mundo hola"),
+    Mensaje(date(2024, 1, 2), time(11, 0), "Usuario2", "Hola adios"),
+    Mensaje(date(2024, 1, 2), time(12, 0), "Usuario1", "mundo python"),
+]
+
+def test_estadisticas_a_dict():
+    print("Probando estadisticas_a_dict...")
+    informe = estadisticas_a_dict(analiza_todo(MENSAJES))
+    assert informe["total"] == 3
+    assert informe["por_usuario"] == {"Usuario1": 2, "Usuario2": 1}
+    assert informe["por_hora"] == {"10": 1, "11": 1, "12": 1}
+    assert informe["dia_mas_activo"] == {"fecha": "2024-01-02", "mensajes": 2}
+    assert informe["rango_fechas"] == ["2024-01-01", "2024-01-02"]
+    # Se puede guardar como JSON tal cual
+    assert json.loads(json.dumps(informe)) == informe
+    vacio = estadisticas_a_dict(Estadisticas(0, Counter(), {}, Counter(), Counter(), None))
+    assert vacio["dia_mas_activo"] is None and vacio["rango_fechas"] is None
+
+def test_filas_csv():
+    print("Probando filas_csv...")
+    informe = estadisticas_a_dict(analiza_todo(MENSAJES))
+    informe["palabras"] = {"Usuario1": analiza_palabras_caracteristicas(MENSAJES, "Usuario1", 2)}
+    filas = list(filas_csv("chat", informe))
+    assert ["chat", "total", "", 3] in filas
+    assert ["chat", "por_usuario", "Usuario2", 1] in filas
+    assert ["chat", "dia_mas_activo", "fecha", "2024-01-02"] in filas
+    assert ["chat", "rango_fechas", "1", "2024-01-02"] in filas
+    assert ["chat", "palabras.Usuario1", "mundo", 2] in filas
+    assert all(len(fila) == len(COLUMNAS_CSV) for fila in filas)
+
+def test_informe_de_store():
+    print("Probando informe_de_store...")
+    store = MensajeStore.desde_mensajes(MENSAJES)
+    assert informe_de_store(store) == estadisticas_a_dict(analiza_todo(MENSAJES))
+    informe = informe_de_store(store, n_palabras=2)
+    assert informe["palabras"]["Usuario1"] == analiza_palabras_caracteristicas(MENSAJES, "Usuario1", 2)
+    assert set(informe["palabras"]) == {"Usuario1", "Usuario2"}
+
+
+test_estadisticas_a_dict()
+test_filas_csv()
+test_informe_de_store()
+print("Todos los tests pasaron correctamente.")
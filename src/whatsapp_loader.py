@@ -1,52 +1,345 @@
+import os
 import re
-from datetime import datetime
+from collections import namedtuple
+from collections.abc import Callable, Iterable, Iterator
+from datetime import date, datetime, time
+from functools import lru_cache
+from itertools import chain, islice
 from whatsapp_utiles import Mensaje
 
+# Tamaño del buffer de lectura (1 MiB): el fichero se lee por bloques y nunca
+# se carga completo en memoria.
+TAM_BUFFER = 1 << 20
+
+# Número de líneas de mensaje que se examinan al principio del fichero para
+# deducir el formato de fecha (D/M/A, M/D/A o A-M-D).
+LINEAS_MUESTRA = 1000
+
+# Tamaño de las cachés de conversión. Un chat tiene pocos miles de fechas
+# distintas, y como mucho 86400 horas distintas (con segundos).
+TAM_CACHE_FECHAS = 1 << 14
+TAM_CACHE_HORAS = 1 << 17
+
+# Cada cuántos mensajes se informa del progreso de la lectura
+MENSAJES_PROGRESO = 1 << 13
+
+# Tamaño de los bloques con que se lee el final del fichero al buscar el
+# último mensaje (64 KiB).
+TAM_BLOQUE_FINAL = 1 << 16
+
+# Patrón Regex Explicado:
+# 1. ^\[?                  -> Puede empezar con corchete (iOS)
+# 2. (\d{1,4}[/-]\d{1,2}[/-]\d{1,4}) -> Grupo 1: La Fecha (acepta / o -)
+# 3. [,\s]+                -> Separador fecha-hora (coma o espacio)
+# 4. (\d{1,2}:\d{2}(?::\d{2})?(?:\s?[apAP]\.?m\.?)?) -> Grupo 2: La Hora (HH:MM, con seg opcionales, AM/PM opcional)
+# 5. \]?:?[\s-]* -> Cierre corchete opcional, dos puntos opcionales, guión opcional
+# 6. (.*?):                -> Grupo 3: Usuario (captura todo hasta los dos puntos del mensaje)
+# 7. \s(.*)$               -> Grupo 4: El texto del mensaje
+PATRON_MENSAJE = re.compile(
+    r'^\[?(\d{1,4}[/-]\d{1,2}[/-]\d{1,4})[,\s]+(\d{1,2}:\d{2}(?::\d{2})?(?:\s?[apAP]\.?m\.?)?)\]?:?[\s-]*'
+    r'(.*?):\s(.*)$'
+)
+
+# Líneas de sistema ("Laura creó el grupo...", "Dani se unió..."): fecha y hora
+# como en PATRON_MENSAJE, seguidas de un texto sin "usuario: ".
+PATRON_EVENTO = re.compile(
+    r'^\[?(\d{1,4}[/-]\d{1,2}[/-]\d{1,4})[,\s]+(\d{1,2}:\d{2}(?::\d{2})?(?:\s?[apAP]\.?m\.?)?)\]?:?[\s-]*'
+    r'(.+)$'
+)
+
+# Evento del sistema del chat (creación del grupo, altas, bajas...), que no es
+# un mensaje de ningún usuario.
+Evento = namedtuple('Evento', ['fecha', 'hora', 'texto'])
+
 def leer_log_whatsapp(ruta_archivo: str) -> list[Mensaje]:
     """
     Lee un archivo de log de WhatsApp y devuelve una lista de objetos Mensaje.
     """
-    mensajes = []
-    
-    # Patrón Regex Explicado:
-    # 1. ^\[?                  -> Puede empezar con corchete (iOS)
-    # 2. (\d{1,4}[/-]\d{1,2}[/-]\d{1,4}) -> Grupo 1: La Fecha (acepta / o -)
-    # 3. [,\s]+                -> Separador fecha-hora (coma o espacio)
-    # 4. (\d{1,2}:\d{2}(?::\d{2})?(?:\s?[apAP]\.?m\.?)?) -> Grupo 2: La Hora (HH:MM, con seg opcionales, AM/PM opcional)
-    # 5. \]?:?[\s-]* -> Cierre corchete opcional, dos puntos opcionales, guión opcional
-    # 6. (.*?):                -> Grupo 3: Usuario (captura todo hasta los dos puntos del mensaje)
-    # 7. \s(.*)$               -> Grupo 4: El texto del mensaje
-    
-    patron = re.compile(
-        r'^\[?(\d{1,4}[/-]\d{1,2}[/-]\d{1,4})[,\s]+(\d{1,2}:\d{2}(?::\d{2})?(?:\s?[apAP]\.?m\.?)?)\]?:?[\s-]*'
-        r'(.*?):\s(.*)$'
-    )
+    return list(iter_log_whatsapp(ruta_archivo))
+
+def iter_log_whatsapp(ruta_archivo: str, progreso: Callable[[float], None] | None = None,
+                      desde_byte: int = 0, formato_fecha: tuple[str, int, int, int] | None = None,
+                      eventos: list[Evento] | None = None) -> Iterator[Mensaje]:
+    """
+    Lee un archivo de log de WhatsApp por bloques y va devolviendo los objetos
+    Mensaje de uno en uno, de modo que el consumo de memoria no depende del
+    tamaño del fichero.
+
+    Las líneas que no empiezan por fecha y hora continúan el mensaje anterior
+    y se añaden a su texto separadas por saltos de línea. Las líneas de
+    sistema (con fecha y hora pero sin usuario) no son mensajes: si se pasa
+    la lista `eventos`, se añaden a ella como objetos Evento.
 
+    Si se indica `progreso`, se llama periódicamente con la fracción del
+    fichero leída (de 0 a 1). La función puede lanzar una excepción para
+    interrumpir la lectura.
+
+    Con `desde_byte` la lectura empieza en esa posición del fichero, que debe
+    ser el comienzo de una línea (por ejemplo, la que devuelve
+    busca_inicio_ultimo_mensaje). `formato_fecha` fija el formato de fecha en
+    lugar de deducirlo de las primeras líneas leídas, lo que conviene al leer
+    solo el final de un fichero, donde la muestra puede ser ambigua.
+    """
     try:
-        with open(ruta_archivo, 'r', encoding='utf-8') as f:
-            lineas = f.readlines()
+        f = open(ruta_archivo, 'r', encoding='utf-8', buffering=TAM_BUFFER)
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo en {ruta_archivo}")
-        return []
+        return
+
+    with f:
+        if desde_byte:
+            # Todavía no se ha leído nada, así que basta con mover el buffer binario
+            f.buffer.seek(desde_byte)
+        coincidencias = _itera_coincidencias(f)
+        muestra = []
+        if formato_fecha is None:
+            muestra = list(islice(coincidencias, LINEAS_MUESTRA))
+            formato_fecha = _detecta_formato_fecha(c[0] for c in muestra)
+        coincidencias = chain(muestra, coincidencias)
+        if progreso is not None:
+            pendiente = max(os.fstat(f.fileno()).st_size - desde_byte, 1)
+            coincidencias = _informa_progreso(coincidencias, progreso,
+                                              lambda: min((f.buffer.tell() - desde_byte) / pendiente, 1.0))
+        yield from _convierte_coincidencias(coincidencias, _crea_conversor_fecha(formato_fecha), eventos)
+
+    if progreso is not None:
+        progreso(1.0)
 
+def mensajes_de_texto(texto: str, formato_fecha: tuple[str, int, int, int],
+                      eventos: list[Evento] | None = None) -> Iterator[Mensaje]:
+    """
+    Devuelve los mensajes de un trozo de log ya leído en memoria, con un
+    formato de fecha conocido. Lo usa la lectura en paralelo, en la que cada
+    proceso recibe un tramo del fichero que empieza en una línea de mensaje.
+    """
+    return _convierte_coincidencias(_itera_coincidencias(texto.split('\n')), _crea_conversor_fecha(formato_fecha),
+                                    eventos)
+
+def _convierte_coincidencias(coincidencias: Iterable[tuple[str, str, str | None, str]],
+                             convertir_fecha: Callable[[str], date | None],
+                             eventos: list[Evento] | None = None) -> Iterator[Mensaje]:
+    """
+    Convierte los grupos de cada mensaje en objetos Mensaje. Los eventos (sin
+    usuario) se añaden a `eventos` si se indica y, si no, se descartan.
+
+    Todos los mensajes de un mismo usuario comparten el mismo str de nombre,
+    igual que las fechas y horas repetidas comparten objeto gracias a las
+    cachés de conversión.
+    """
+    nombres = {}
+    for fecha_str, hora_str, usuario, texto in coincidencias:
+        if usuario is None and eventos is None:
+            continue
+
+        fecha_obj = convertir_fecha(fecha_str)
+        hora_obj = _convertir_hora(hora_str)
+        if fecha_obj is None or hora_obj is None:
+            # Línea que no encaja con el formato detectado: se prueba
+            # con todos los formatos conocidos.
+            fecha_obj, hora_obj = _convertir_fechahora(fecha_str, hora_str)
+
+        if fecha_obj and hora_obj:
+            if usuario is None:
+                eventos.append(Evento(fecha_obj, hora_obj, texto))
+            else:
+                yield Mensaje(fecha_obj, hora_obj, nombres.setdefault(usuario, usuario), texto)
+
+def _informa_progreso(elementos: Iterable, progreso: Callable[[float], None],
+                      fraccion: Callable[[], float]) -> Iterator:
+    """Devuelve los elementos llamando a progreso(fraccion()) cada MENSAJES_PROGRESO."""
+    for leidos, elemento in enumerate(elementos, 1):
+        if leidos % MENSAJES_PROGRESO == 0:
+            progreso(fraccion())
+        yield elemento
+
+def detecta_formato_fichero(ruta_archivo: str) -> tuple[str, int, int, int]:
+    """
+    Devuelve el formato de fecha de un fichero (ver _detecta_formato_fecha)
+    examinando sus primeras LINEAS_MUESTRA líneas de mensaje.
+    """
+    with open(ruta_archivo, 'r', encoding='utf-8', buffering=TAM_BUFFER) as f:
+        return _detecta_formato_fecha(c[0] for c in islice(_itera_coincidencias(f), LINEAS_MUESTRA))
+
+def busca_inicio_ultimo_mensaje(ruta_archivo: str, hasta: int | None = None) -> int:
+    """
+    Devuelve la posición en bytes del comienzo de la última línea de mensaje
+    del fichero (o de sus primeros `hasta` bytes), o 0 si no hay ninguna. El
+    fichero se lee hacia atrás por bloques, así que el coste no depende de su
+    tamaño sino de lo que ocupe el último mensaje.
+    """
+    with open(ruta_archivo, 'rb') as f:
+        pos = os.fstat(f.fileno()).st_size if hasta is None else hasta
+        resto = b''
+        while pos > 0:
+            inicio = max(pos - TAM_BLOQUE_FINAL, 0)
+            f.seek(inicio)
+            datos = f.read(pos - inicio) + resto
+            lineas = datos.split(b'\n')
+            # Si no se ha llegado al principio, la primera línea puede estar
+            # cortada: se completa con el bloque anterior.
+            resto = lineas.pop(0) if inicio else b''
+            fin_linea = inicio + len(datos)
+            for linea in reversed(lineas):
+                comienzo = fin_linea - len(linea)
+                if _es_linea_mensaje(linea.decode('utf-8', errors='replace')):
+                    return comienzo
+                fin_linea = comienzo - 1
+            pos = inicio
+        return 0
+
+def _es_linea_mensaje(linea: str) -> bool:
+    """Indica si una línea es el comienzo de un mensaje que leería iter_log_whatsapp."""
+    cabecera = analiza_cabecera(linea.strip())
+    return cabecera is not None and cabecera[2] is not None
+
+def _itera_coincidencias(lineas: Iterable[str]) -> Iterator[tuple[str, str, str | None, str]]:
+    """
+    Recorre las líneas de un log y devuelve los grupos (fecha, hora, usuario,
+    texto) de cada mensaje, con las líneas que lo continúan ya unidas al
+    texto. Los eventos del sistema se devuelven con usuario None.
+
+    Es una pequeña máquina de estados: el mensaje en curso se entrega al
+    aparecer la cabecera del siguiente (o al acabar el fichero). Las líneas se
+    clasifican como en analiza_cabecera, con el caso habitual (una cabecera de
+    mensaje) escrito aquí mismo para no añadir llamadas por línea.
+    """
+    casa_mensaje = PATRON_MENSAJE.match
+    actual = None
+    continuacion = None
+    blancos = 0
     for linea in lineas:
         linea = linea.strip()
         if not linea:
+            # Las líneas en blanco solo cuentan si las sigue más texto del mensaje
+            blancos += 1
             continue
 
-        match = patron.match(linea)
-        
-        if match:
-            fecha_str, hora_str, usuario, texto = match.groups()
-            fecha_obj, hora_obj = _convertir_fechahora(fecha_str, hora_str)
-            
-            if len(usuario) > 50: 
-                continue
-
-            if fecha_obj and hora_obj:
-                mensajes.append(Mensaje(fecha_obj, hora_obj, usuario, texto))
-                
-    return mensajes
+        cabecera = None
+        primero = linea[1:2] if linea[0] == '[' else linea[0]
+        if primero.isdigit():
+            match = casa_mensaje(linea)
+            if match is not None:
+                cabecera = match.groups()
+                if len(cabecera[2]) > 50:
+                    cabecera = None
+            if cabecera is None:
+                cabecera = analiza_cabecera(linea)
+
+        if cabecera is not None:
+            if actual is not None:
+                yield actual if continuacion is None else (*actual[:3], '\n'.join(continuacion))
+            actual = cabecera
+            continuacion = None
+        elif actual is not None:
+            if continuacion is None:
+                continuacion = [actual[3]]
+            continuacion.extend([''] * blancos)
+            continuacion.append(linea)
+        blancos = 0
+
+    if actual is not None:
+        yield actual if continuacion is None else (*actual[:3], '\n'.join(continuacion))
+
+def analiza_cabecera(linea: str) -> tuple | None:
+    """
+    Si una línea (sin espacios al principio ni al final) empieza un mensaje,
+    devuelve (fecha, hora, usuario, texto); si es un evento del sistema,
+    (fecha, hora, None, texto); y si no, None (la línea continúa el mensaje
+    anterior).
+
+    Antes de probar ninguna expresión regular se mira si la línea empieza por
+    un dígito (o por corchete y dígito), así que las líneas de texto normales
+    cuestan una comparación.
+    """
+    primero = linea[1:2] if linea[:1] == '[' else linea[:1]
+    if not primero.isdigit():
+        return None
+    match = PATRON_MENSAJE.match(linea)
+    if match is not None and len(match.group(3)) <= 50:
+        return match.groups()
+    # Con un "usuario" muy largo no es un mensaje sino, por ejemplo,
+    # "X cambió el asunto a: ...", que también es un evento
+    match = PATRON_EVENTO.match(linea)
+    if match is not None:
+        return (match.group(1), match.group(2), None, match.group(3))
+    return None
+
+def _detecta_formato_fecha(fechas: Iterable[str]) -> tuple[str, int, int, int]:
+    """
+    Deduce el formato de fecha de un fichero a partir de una muestra de
+    fechas en texto. Devuelve una tupla (separador, índice del día, índice
+    del mes, índice del año) con las posiciones de cada campo.
+
+    Si el primer campo tiene cuatro dígitos el formato es A-M-D. En otro caso
+    el año va al final y se decide entre D/M y M/D: si algún primer campo
+    supera 12 es D/M, si lo supera algún segundo campo es M/D y, si la
+    muestra es ambigua, se asume D/M.
+    """
+    separador = '/'
+    max_primero = max_segundo = 0
+    for fecha_str in fechas:
+        separador = '-' if '-' in fecha_str else '/'
+        partes = fecha_str.split(separador)
+        if len(partes[0]) == 4:
+            return (separador, 2, 1, 0)
+        max_primero = max(max_primero, int(partes[0]))
+        max_segundo = max(max_segundo, int(partes[1]))
+
+    if max_primero <= 12 and max_segundo > 12:
+        return (separador, 1, 0, 2)
+    return (separador, 0, 1, 2)
+
+def _crea_conversor_fecha(formato: tuple[str, int, int, int]) -> Callable[[str], date | None]:
+    """
+    Crea una función que convierte fechas en texto con el formato indicado
+    a objetos date, sin strptime y con caché LRU: las fechas repetidas
+    devuelven el mismo objeto date. Devuelve None si la fecha no encaja.
+    """
+    separador, i_dia, i_mes, i_anio = formato
+
+    @lru_cache(maxsize=TAM_CACHE_FECHAS)
+    def convertir(fecha_str: str) -> date | None:
+        partes = fecha_str.split(separador)
+        if len(partes) != 3:
+            return None
+        anio_str = partes[i_anio]
+        anio = int(anio_str)
+        if len(anio_str) <= 2:
+            # Misma regla que %y: 69-99 -> 19xx, 00-68 -> 20xx
+            anio += 1900 if anio >= 69 else 2000
+        try:
+            return date(anio, int(partes[i_mes]), int(partes[i_dia]))
+        except ValueError:
+            return None
+
+    return convertir
+
+@lru_cache(maxsize=TAM_CACHE_HORAS)
+def _convertir_hora(hora_str: str) -> time | None:
+    """
+    Convierte una hora en texto (HH:MM, HH:MM:SS, con AM/PM opcional) a un
+    objeto time sin strptime. Devuelve None si la hora no es válida.
+    """
+    hora_str_clean = ''.join(hora_str.replace('.', '').upper().split())
+    meridiano = None
+    if hora_str_clean.endswith('M'):
+        meridiano = hora_str_clean[-2]
+        hora_str_clean = hora_str_clean[:-2]
+
+    partes = hora_str_clean.split(':')
+    horas = int(partes[0])
+    minutos = int(partes[1])
+    segundos = int(partes[2]) if len(partes) == 3 else 0
+
+    # Con AM/PM las horas 1-12 son de reloj de 12h (12 AM -> 0, 12 PM -> 12).
+    # Una hora mayor que 12 con AM/PM se toma tal cual, como hace '%H:%M %p'.
+    if meridiano and horas <= 12:
+        horas = horas % 12 + (12 if meridiano == 'P' else 0)
+
+    try:
+        return time(horas, minutos, segundos)
+    except ValueError:
+        return None
 
 def _convertir_fechahora(fecha_str, hora_str):
     """
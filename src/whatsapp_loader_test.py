@@ -0,0 +1,146 @@
+import os
+import tempfile
+from whatsapp_loader import *
+from whatsapp_loader import _convertir_fechahora, _convertir_hora, _crea_conversor_fecha
+from datetime import date, time
+
+LOG_PRUEBA = """[15/09/2025, 09:15:22] Laura creó el grupo "Grupo Fundamentos"
+[15/09/2025, 09:16:05] Laura: Hola chicos!
+[16/09/2025, 10:05:00] Dani: gente, alguien ha ido a la clase de hoy?
+
+[18/09/2025, 18:30:15] Sofía: CHICOS AYUDA!!!
+"""
+
+def _crea_log(contenido):
+    fd, ruta = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    return ruta
+
+def test_iter_log_whatsapp():
+    print("Probando iter_log_whatsapp...")
+    ruta = _crea_log(LOG_PRUEBA)
+    try:
+        mensajes = iter_log_whatsapp(ruta)
+        primero = next(mensajes)
+        assert primero == Mensaje(date(2025, 9, 15), time(9, 16, 5), "Laura", "Hola chicos!")
+        resto = list(mensajes)
+        assert [m.usuario for m in resto] == ["Dani", "Sofía"]
+        assert leer_log_whatsapp(ruta) == [primero] + resto
+    finally:
+        os.remove(ruta)
+
+def test_iter_log_whatsapp_fichero_inexistente():
+    print("Probando iter_log_whatsapp con un fichero inexistente...")
+    assert list(iter_log_whatsapp("no_existe.txt")) == []
+    assert leer_log_whatsapp("no_existe.txt") == []
+
+def test_detecta_formato_fecha():
+    print("Probando la detección del formato de fecha...")
+    # D/M/A: algún primer campo mayor que 12
+    ruta = _crea_log("05/01/24, 21:00 - Ana: hola\n25/01/24, 9:05 - Luis: adiós\n")
+    try:
+        fechas = [m.fecha for m in leer_log_whatsapp(ruta)]
+        assert fechas == [date(2024, 1, 5), date(2024, 1, 25)]
+    finally:
+        os.remove(ruta)
+    # M/D/A: algún segundo campo mayor que 12, horas de 12h
+    ruta = _crea_log("1/5/24, 9:00 pm - Ana: hola\n1/25/24, 12:05 a.m. - Luis: adiós\n")
+    try:
+        mensajes = leer_log_whatsapp(ruta)
+        assert [m.fecha for m in mensajes] == [date(2024, 1, 5), date(2024, 1, 25)]
+        assert [m.hora for m in mensajes] == [time(21, 0), time(0, 5)]
+    finally:
+        os.remove(ruta)
+    # A-M-D
+    ruta = _crea_log("2024-01-05 21:00 - Ana: hola\n")
+    try:
+        assert leer_log_whatsapp(ruta)[0].fecha == date(2024, 1, 5)
+    finally:
+        os.remove(ruta)
+
+def test_conversores_equivalentes_a_strptime():
+    print("Probando los conversores rápidos de fecha y hora...")
+    convertir_fecha = _crea_conversor_fecha(("/", 0, 1, 2))
+    for fecha_str in ["15/09/2025", "15/09/25", "1/2/99", "31/12/68"]:
+        assert convertir_fecha(fecha_str) == _convertir_fechahora(fecha_str, "10:00")[0]
+    assert convertir_fecha("31/02/2025") is None
+    for hora_str in ["9:05", "09:05:59", "12:00 AM", "12:30 PM", "1:15 p.m.", "11:59 a.m.", "14:30 PM"]:
+        assert _convertir_hora(hora_str) == _convertir_fechahora("15/09/2025", hora_str)[1]
+
+def test_iter_log_whatsapp_progreso():
+    print("Probando el progreso de iter_log_whatsapp...")
+    ruta = _crea_log(LOG_PRUEBA * 10000)
+    try:
+        fracciones = []
+        assert len(list(iter_log_whatsapp(ruta, progreso=fracciones.append))) == 30000
+        assert len(fracciones) > 1 and fracciones == sorted(fracciones) and fracciones[-1] == 1.0
+        # El callback puede interrumpir la lectura
+        def cancelar(fraccion):
+            raise InterruptedError()
+        try:
+            list(iter_log_whatsapp(ruta, progreso=cancelar))
+            assert False
+        except InterruptedError:
+            pass
+    finally:
+        os.remove(ruta)
+
+def test_lectura_desde_ultimo_mensaje():
+    print("Probando busca_inicio_ultimo_mensaje y la lectura desde una posición...")
+    ruta = _crea_log(LOG_PRUEBA + "[19/09/2025, 08:00:00] Laura: línea sin\nsalto final")
+    try:
+        inicio = busca_inicio_ultimo_mensaje(ruta)
+        with open(ruta, "rb") as f:
+            assert f.read()[inicio:].startswith("[19/09/2025".encode("utf-8"))
+        formato = detecta_formato_fichero(ruta)
+        assert formato == ("/", 0, 1, 2)
+        assert list(iter_log_whatsapp(ruta, desde_byte=inicio, formato_fecha=formato)) == leer_log_whatsapp(ruta)[-1:]
+        # Limitado a los bytes anteriores, el último mensaje es el de Sofía
+        anterior = busca_inicio_ultimo_mensaje(ruta, hasta=inicio)
+        assert [m.usuario for m in iter_log_whatsapp(ruta, desde_byte=anterior)] == ["Sofía", "Laura"]
+    finally:
+        os.remove(ruta)
+    vacio = _crea_log("")
+    assert busca_inicio_ultimo_mensaje(vacio) == 0
+    os.remove(vacio)
+
+def test_mensajes_multilinea_y_eventos():
+    print("Probando mensajes de varias líneas y eventos del sistema...")
+    ruta = _crea_log(LOG_PRUEBA.replace("Hola chicos!", "Hola chicos!\n\n3 cosas:\n  - la práctica\n") +
+                     "18/09/2025, 19:00 - Dani cambió el asunto del grupo \"Grupo Fundamentos\" a: \"FP1: prácticas\"\n"
+                     "[18/09/2025, 19:05:00] Laura: ok\n\n")
+    try:
+        eventos = []
+        mensajes = list(iter_log_whatsapp(ruta, eventos=eventos))
+        assert [m.usuario for m in mensajes] == ["Laura", "Dani", "Sofía", "Laura"]
+        # Las líneas de continuación (y las líneas en blanco entre ellas) son parte del texto
+        assert mensajes[0].texto == "Hola chicos!\n\n3 cosas:\n- la práctica"
+        assert mensajes[-1].texto == "ok"
+        # Los mensajes de un mismo usuario comparten el nombre
+        assert mensajes[0].usuario is mensajes[-1].usuario
+        assert eventos == [Evento(date(2025, 9, 15), time(9, 15, 22), 'Laura creó el grupo "Grupo Fundamentos"'),
+                           Evento(date(2025, 9, 18), time(19, 0),
+                                  'Dani cambió el asunto del grupo "Grupo Fundamentos" a: "FP1: prácticas"')]
+        # Sin lista de eventos, simplemente no se devuelven
+        assert leer_log_whatsapp(ruta) == mensajes
+    finally:
+        os.remove(ruta)
+
+def test_analiza_cabecera():
+    print("Probando analiza_cabecera...")
+    assert analiza_cabecera("[15/09/2025, 09:16:05] Laura: Hola") == ("15/09/2025", "09:16:05", "Laura", "Hola")
+    assert analiza_cabecera("15/09/2025, 09:15 - Laura te añadió") == ("15/09/2025", "09:15", None, "Laura te añadió")
+    for continuacion in ["hola", "3 cosas: una", "[nota] algo", "15/09/2025", ""]:
+        assert analiza_cabecera(continuacion) is None
+
+
+test_iter_log_whatsapp()
+test_iter_log_whatsapp_fichero_inexistente()
+test_detecta_formato_fecha()
+test_conversores_equivalentes_a_strptime()
+test_iter_log_whatsapp_progreso()
+test_lectura_desde_ultimo_mensaje()
+test_mensajes_multilinea_y_eventos()
+test_analiza_cabecera()
+print("Todos los tests pasaron correctamente.")
@@ -0,0 +1,230 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from whatsapp_informe import estadisticas_a_dict, escribe_csv, escribe_json, informe_de_store
+from whatsapp_loader import iter_log_whatsapp
+from whatsapp_store import MensajeStore
+from whatsapp_utiles import Estadisticas
+
+# Nombre (sin extensión) del informe con todos los chats juntos
+NOMBRE_COMBINADO = "combinado"
+
+# Chats en curso por proceso: limita cuántos resultados esperan a ser
+# escritos, de modo que la memoria no crece con el número de ficheros.
+PENDIENTES_POR_PROCESO = 2
+
+def busca_ficheros(entrada: str) -> list[str]:
+    """
+    Devuelve los ficheros a analizar: los .txt de un directorio o los que
+    encajan con un patrón glob (admite ** para subdirectorios), ordenados.
+    """
+    if os.path.isdir(entrada):
+        entrada = os.path.join(entrada, "*.txt")
+    return sorted(r for r in glob.glob(entrada, recursive=True) if os.path.isfile(r))
+
+def analiza_chat(ruta: str, n_palabras: int = 0) -> tuple[dict, dict[int, int], dict[str, int]]:
+    """
+    Lee un chat y calcula sus estadísticas. Devuelve el informe del chat
+    (ver estadisticas_a_dict; con n_palabras > 0 incluye también las
+    n_palabras palabras más características de cada usuario), el número de
+    mensajes de cada día (por ordinal) y el total de caracteres de cada
+    usuario; estos dos últimos sirven para combinar varios chats sin perder
+    exactitud.
+    """
+    store = MensajeStore.desde_mensajes(iter_log_whatsapp(ruta))
+    return informe_de_store(store, n_palabras), dict(Counter(store.fechas)), store.cuenta_caracteres_por_usuario()
+
+def analiza_lote(entrada: str, salida: str|None=None, formato: str = "json", procesos: int|None=None,
+                 n_palabras: int = 0) -> dict:
+    """
+    Analiza todos los chats de un directorio o patrón glob repartiéndolos
+    entre varios procesos. Cada chat se lee y se resume en su proceso y solo
+    vuelve el informe, que se escribe en cuanto llega; un fichero que falla no
+    detiene a los demás y queda anotado con su error.
+
+    Parámetros:
+    entrada (str): Directorio (se toman sus .txt) o patrón glob.
+    salida (str|None): Directorio donde escribir un informe por chat y el
+        informe combinado (NOMBRE_COMBINADO). Si es None no se escribe nada.
+    formato (str): "json" o "csv".
+    procesos (int|None): Número de procesos (por defecto, uno por núcleo). Con
+        1 se analiza todo en el proceso actual.
+    n_palabras (int): Palabras características por usuario en cada informe.
+
+    Devuelve:
+    dict: Informe combinado, con la lista de chats (mensajes o error), las
+    estadísticas de todos los chats juntos y el rendimiento (ficheros/s y
+    mensajes/s).
+    """
+    if formato not in ("json", "csv"):
+        raise ValueError(f"Formato desconocido: {formato}")
+    rutas = busca_ficheros(entrada)
+    procesos = procesos or os.cpu_count() or 1
+    if salida is not None:
+        os.makedirs(salida, exist_ok=True)
+
+    inicio = time.perf_counter()
+    combinado = _Combinado()
+    chats = {}
+    for ruta, resultado, error in _analiza_rutas(rutas, procesos, n_palabras):
+        nombre = _nombre_informe(ruta, chats)
+        if error is not None:
+            chats[nombre] = {"ruta": ruta, "error": error}
+            continue
+        informe, por_dia, caracteres = resultado
+        chats[nombre] = {"ruta": ruta, "mensajes": informe["total"]}
+        combinado.anade(informe, por_dia, caracteres)
+        if salida is not None:
+            if formato == "json":
+                escribe_json(informe, os.path.join(salida, nombre + ".json"))
+            else:
+                escribe_csv({nombre: informe}, os.path.join(salida, nombre + ".csv"))
+    segundos = time.perf_counter() - inicio
+
+    correctos = sum("error" not in c for c in chats.values())
+    resultado = {
+        "chats": dict(sorted(chats.items(), key=lambda c: c[1]["ruta"])),
+        "estadisticas": estadisticas_a_dict(combinado.estadisticas()),
+        "rendimiento": {
+            "ficheros": len(rutas),
+            "errores": len(rutas) - correctos,
+            "mensajes": combinado.total,
+            "segundos": segundos,
+            "ficheros_por_segundo": len(rutas) / segundos if segundos else 0.0,
+            "mensajes_por_segundo": combinado.total / segundos if segundos else 0.0,
+        },
+    }
+    if salida is not None:
+        if formato == "json":
+            escribe_json(resultado, os.path.join(salida, NOMBRE_COMBINADO + ".json"))
+        else:
+            escribe_csv({NOMBRE_COMBINADO: resultado}, os.path.join(salida, NOMBRE_COMBINADO + ".csv"))
+    return resultado
+
+def _analiza_rutas(rutas, procesos, n_palabras, analiza=None):
+    """
+    Devuelve (ruta, resultado, error) de cada chat en el orden en que terminan,
+    con como mucho PENDIENTES_POR_PROCESO chats por proceso en curso.
+
+    Si un proceso muere (p. ej. por falta de memoria), el executor falla con
+    BrokenProcessPool en todos los chats en curso. Esos chats se repiten uno
+    a uno en un proceso aparte, de modo que solo queda con error el que
+    vuelve a tirar su proceso, y el resto sigue en un executor nuevo.
+    `analiza` sustituye a _analiza_seguro (debe poder enviarse a otro proceso).
+    """
+    analiza = analiza or _analiza_seguro
+    if procesos == 1:
+        for ruta in rutas:
+            yield ruta, *analiza(ruta, n_palabras)
+        return
+
+    contexto = multiprocessing.get_context("spawn")
+    restantes = iter(rutas)
+    roto = True
+    while roto:
+        roto = False
+        afectadas = []
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as executor:
+            en_curso = {}
+            while not roto:
+                while len(en_curso) < procesos * PENDIENTES_POR_PROCESO:
+                    ruta = next(restantes, None)
+                    if ruta is None:
+                        break
+                    en_curso[executor.submit(analiza, ruta, n_palabras)] = ruta
+                if not en_curso:
+                    break
+                terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    ruta = en_curso.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except BrokenProcessPool:
+                        afectadas.append(ruta)
+                        roto = True
+                    else:
+                        yield ruta, *resultado
+            afectadas.extend(en_curso.values())
+        for ruta in afectadas:
+            yield ruta, *_analiza_aislado(analiza, ruta, n_palabras, contexto)
+
+def _analiza_aislado(analiza, ruta, n_palabras, contexto):
+    """Analiza un chat en un proceso propio; si el proceso muere, devuelve el error."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+        try:
+            return executor.submit(analiza, ruta, n_palabras).result()
+        except BrokenProcessPool as e:
+            return None, f"{type(e).__name__}: {e}"
+
+def _analiza_seguro(ruta, n_palabras):
+    """Ejecuta analiza_chat devolviendo (resultado, None) o (None, error) si falla."""
+    try:
+        return analiza_chat(ruta, n_palabras), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _nombre_informe(ruta, usados):
+    """Nombre del informe de un chat: el del fichero, sin repetir."""
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    nombre = base
+    i = 2
+    while nombre in usados or nombre == NOMBRE_COMBINADO:
+        nombre = f"{base}_{i}"
+        i += 1
+    return nombre
+
+class _Combinado:
+    """Suma de los informes de varios chats."""
+
+    def __init__(self):
+        self.total = 0
+        self.por_usuario = Counter()
+        self.caracteres = Counter()
+        self.por_hora = Counter()
+        self.por_dia_semana = Counter()
+        self.por_dia = Counter()
+
+    def anade(self, informe: dict, por_dia: dict[int, int], caracteres: dict[str, int]) -> None:
+        self.total += informe["total"]
+        self.por_usuario.update(informe["por_usuario"])
+        self.caracteres.update(caracteres)
+        self.por_hora.update({int(h): c for h, c in informe["por_hora"].items()})
+        self.por_dia_semana.update(informe["por_dia_semana"])
+        self.por_dia.update(por_dia)
+
+    def estadisticas(self) -> Estadisticas:
+        if not self.total:
+            return Estadisticas(0, Counter(), {}, Counter(), Counter(), None)
+        # Día más activo: en caso de empate, el más antiguo
+        dia = min(self.por_dia, key=lambda d: (-self.por_dia[d], d))
+        longitud_media = {u: self.caracteres[u] / n for u, n in self.por_usuario.items()}
+        return Estadisticas(self.total, self.por_usuario, longitud_media, self.por_hora, self.por_dia_semana,
+                            (date.fromordinal(dia), self.por_dia[dia]),
+                            (date.fromordinal(min(self.por_dia)), date.fromordinal(max(self.por_dia))))
+
+def main(argumentos: list[str]|None=None) -> None:
+    parser = argparse.ArgumentParser(description="Analiza a la vez muchos chats exportados de WhatsApp.")
+    parser.add_argument("entrada", help="Directorio con ficheros .txt o patrón glob (p. ej. 'chats/**/*.txt').")
+    parser.add_argument("-o", "--salida", help="Directorio donde escribir los informes.")
+    parser.add_argument("-f", "--formato", choices=["json", "csv"], default="json", help="Formato de los informes.")
+    parser.add_argument("-p", "--procesos", type=int, help="Número de procesos (por defecto, uno por núcleo).")
+    parser.add_argument("--palabras", type=int, default=0,
+                        help="Palabras características por usuario en cada informe (0 para no calcularlas).")
+    args = parser.parse_args(argumentos)
+
+    resultado = analiza_lote(args.entrada, args.salida, args.formato, args.procesos, args.palabras)
+    for chat in resultado["chats"].values():
+        if "error" in chat:
+            print(f"Error en {chat['ruta']}: {chat['error']}")
+    r = resultado["rendimiento"]
+    print(f"{r['ficheros']} ficheros ({r['errores']} con errores), {r['mensajes']} mensajes en {r['segundos']:.2f} s: "
+          f"{r['ficheros_por_segundo']:.1f} ficheros/s, {r['mensajes_por_segundo']:.0f} mensajes/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import csv
+import json
+import os
+import tempfile
+from whatsapp_lote import *
+from whatsapp_lote import _analiza_rutas, _analiza_seguro
+from whatsapp_loader import leer_log_whatsapp
+from whatsapp_utiles import *
+
+CHAT_1 = """[15/09/2025, 09:16:05] Laura: Hola chicos!
+[16/09/2025, 10:05:00] Dani: gente, alguien ha ido a la clase de hoy?
+[16/09/2025, 18:30:15] Laura: yo sí
+"""
+
+CHAT_2 = """16/09/2025, 11:00 - Sofía: Buenos días
+16/09/2025, 11:05 - Laura: Hola!
+"""
+
+def _crea_chats(directorio):
+    for nombre, contenido in [("chat1.txt", CHAT_1.encode("utf-8")), ("chat2.txt", CHAT_2.encode("utf-8")),
+                              ("roto.txt", b"\xff\xfe no es UTF-8\n")]:
+        with open(os.path.join(directorio, nombre), "wb") as f:
+            f.write(contenido)
+
+def test_analiza_lote():
+    print("Probando analiza_lote...")
+    with tempfile.TemporaryDirectory() as directorio:
+        _crea_chats(directorio)
+        salida = os.path.join(directorio, "informes")
+        resultado = analiza_lote(directorio, salida, procesos=1, n_palabras=3)
+        # El fichero dañado no impide analizar los demás
+        assert resultado["chats"]["chat1"]["mensajes"] == 3
+        assert "UnicodeDecodeError" in resultado["chats"]["roto"]["error"]
+        assert resultado["rendimiento"]["ficheros"] == 3 and resultado["rendimiento"]["errores"] == 1
+        assert resultado["rendimiento"]["mensajes"] == 5
+
+        # El informe combinado es el de todos los mensajes juntos
+        todos = leer_log_whatsapp(os.path.join(directorio, "chat1.txt")) + leer_log_whatsapp(os.path.join(directorio, "chat2.txt"))
+        esperado = json.loads(json.dumps(estadisticas_a_dict(analiza_todo(todos))))
+        assert resultado["estadisticas"] == esperado
+
+        with open(os.path.join(salida, "chat2.json"), encoding="utf-8") as f:
+            informe = json.load(f)
+        assert informe["por_usuario"] == {"Sofía": 1, "Laura": 1}
+        assert "palabras" in informe
+        with open(os.path.join(salida, "combinado.json"), encoding="utf-8") as f:
+            assert json.load(f)["estadisticas"]["total"] == 5
+        assert not os.path.exists(os.path.join(salida, "roto.json"))
+
+def test_analiza_lote_csv_en_paralelo():
+    print("Probando analiza_lote con CSV y varios procesos...")
+    with tempfile.TemporaryDirectory() as directorio:
+        _crea_chats(directorio)
+        salida = os.path.join(directorio, "informes")
+        resultado = analiza_lote(os.path.join(directorio, "chat*.txt"), salida, formato="csv", procesos=2)
+        assert list(resultado["chats"]) == ["chat1", "chat2"]
+        with open(os.path.join(salida, "chat1.csv"), encoding="utf-8", newline="") as f:
+            filas = list(csv.reader(f))
+        assert filas[0] == ["chat", "metrica", "clave", "valor"]
+        assert ["chat1", "por_usuario", "Laura", "2"] in filas
+        with open(os.path.join(salida, "combinado.csv"), encoding="utf-8", newline="") as f:
+            assert ["combinado", "estadisticas", "total", "5"] in list(csv.reader(f))
+
+def _analiza_o_revienta(ruta, n_palabras):
+    """Como _analiza_seguro, pero el proceso muere con los ficheros "revienta*"."""
+    if os.path.basename(ruta).startswith("revienta"):
+        os._exit(1)
+    return _analiza_seguro(ruta, n_palabras)
+
+def test_analiza_rutas_proceso_muerto():
+    print("Probando _analiza_rutas con un proceso que muere...")
+    with tempfile.TemporaryDirectory() as directorio:
+        _crea_chats(directorio)
+        rutas = [os.path.join(directorio, n) for n in ["chat1.txt", "revienta.txt", "chat2.txt", "roto.txt"]]
+        rutas += [os.path.join(directorio, "chat1.txt")] * 4
+        resultados = {}
+        for ruta, resultado, error in _analiza_rutas(rutas, 2, 0, _analiza_o_revienta):
+            resultados.setdefault(os.path.basename(ruta), []).append(error)
+        # Solo falla el fichero que tira su proceso (y el que no es UTF-8)
+        assert "BrokenProcessPool" in resultados["revienta.txt"][0]
+        assert "UnicodeDecodeError" in resultados["roto.txt"][0]
+        assert resultados["chat1.txt"] == [None] * 5 and resultados["chat2.txt"] == [None]
+
+def test_combinado_exacto():
+    print("Probando la longitud media del informe combinado...")
+    with tempfile.TemporaryDirectory() as directorio:
+        # Longitudes cuya media no es exacta en coma flotante
+        for i, textos in enumerate([["abcd"] * 6 + ["x" * 34], ["a", "bc"]]):
+            with open(os.path.join(directorio, f"chat{i}.txt"), "w", encoding="utf-8") as f:
+                for j, texto in enumerate(textos):
+                    f.write(f"[15/09/2025, 09:1{j}:00] Laura: {texto}\n")
+        resultado = analiza_lote(directorio, procesos=1)
+        assert resultado["estadisticas"]["longitud_media"] == {"Laura": (6 * 4 + 34 + 1 + 2) / 9}
+
+def test_busca_ficheros():
+    print("Probando busca_ficheros...")
+    with tempfile.TemporaryDirectory() as directorio:
+        _crea_chats(directorio)
+        os.mkdir(os.path.join(directorio, "sub"))
+        with open(os.path.join(directorio, "sub", "chat3.txt"), "w", encoding="utf-8") as f:
+            f.write(CHAT_2)
+        assert [os.path.basename(r) for r in busca_ficheros(directorio)] == ["chat1.txt", "chat2.txt", "roto.txt"]
+        assert len(busca_ficheros(os.path.join(directorio, "**", "chat*.txt"))) == 3
+
+
+# analiza_lote usa procesos "spawn", que vuelven a importar este fichero:
+# las pruebas solo se lanzan desde el proceso principal.
+if __name__ == "__main__":
+    test_analiza_lote()
+    test_analiza_lote_csv_en_paralelo()
+    test_analiza_rutas_proceso_muerto()
+    test_combinado_exacto()
+    test_busca_ficheros()
+    print("Todos los tests pasaron correctamente.")
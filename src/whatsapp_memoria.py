@@ -0,0 +1,54 @@
+import gc
+import sys
+import tracemalloc
+from whatsapp_loader import iter_log_whatsapp, leer_log_whatsapp
+from whatsapp_store import MensajeStore
+
+def mide_memoria(ruta_archivo: str) -> dict:
+    """
+    Mide cuánta memoria ocupan los mensajes de un chat en las dos
+    representaciones: la lista de Mensaje de leer_log_whatsapp y el
+    MensajeStore. Se mide con tracemalloc la memoria que sigue reservada
+    después de construir cada una (no el pico durante la lectura).
+
+    Parámetros:
+    ruta_archivo (str): Ruta del fichero exportado de WhatsApp.
+
+    Devuelve:
+    dict: Número de mensajes, bytes de cada representación, bytes por
+    mensaje y cuántas veces ocupa menos el MensajeStore.
+    """
+    lista, bytes_lista = _mide(lambda: leer_log_whatsapp(ruta_archivo))
+    del lista
+    store, bytes_store = _mide(lambda: MensajeStore.desde_mensajes(iter_log_whatsapp(ruta_archivo)))
+    n = len(store)
+    return {
+        "mensajes": n,
+        "bytes_lista": bytes_lista,
+        "bytes_store": bytes_store,
+        "bytes_por_mensaje_lista": bytes_lista / n if n else 0.0,
+        "bytes_por_mensaje_store": bytes_store / n if n else 0.0,
+        "reduccion": bytes_lista / bytes_store if bytes_store else 0.0,
+    }
+
+def _mide(construye):
+    """Devuelve el objeto construido y los bytes que siguen reservados."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        objeto = construye()
+        gc.collect()
+        reservados, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return objeto, reservados
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python whatsapp_memoria.py FICHERO")
+        sys.exit(1)
+    r = mide_memoria(sys.argv[1])
+    print(f"{r['mensajes']} mensajes")
+    print(f"Lista de Mensaje: {r['bytes_lista'] / 1e6:.1f} MB ({r['bytes_por_mensaje_lista']:.0f} bytes/mensaje)")
+    print(f"MensajeStore:     {r['bytes_store'] / 1e6:.1f} MB ({r['bytes_por_mensaje_store']:.0f} bytes/mensaje)")
+    print(f"Reducción: {r['reduccion']:.1f}x")
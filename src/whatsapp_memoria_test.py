@@ -0,0 +1,21 @@
+import os
+import tempfile
+from whatsapp_memoria import *
+
+def test_mide_memoria():
+    print("Probando mide_memoria...")
+    fd, ruta = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for i in range(2000):
+            f.write(f"[{i % 28 + 1:02d}/09/2025, {i % 24:02d}:{i % 60:02d}:00] Usuario{i % 5}: mensaje {i} 😊\n")
+    try:
+        resultado = mide_memoria(ruta)
+        assert resultado["mensajes"] == 2000
+        assert resultado["bytes_store"] < resultado["bytes_lista"]
+        assert resultado["reduccion"] == resultado["bytes_lista"] / resultado["bytes_store"]
+    finally:
+        os.remove(ruta)
+
+
+test_mide_memoria()
+print("Todos los tests pasaron correctamente.")
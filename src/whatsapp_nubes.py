@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+
+# Nubes de palabras guardadas en memoria. Cada imagen completa (800x400 RGB)
+# ocupa casi 1 MB.
+TAM_CACHE_NUBES = 16
+
+ANCHO_NUBE = 800
+ALTO_NUBE = 400
+
+# La previsualización se genera con un cuarto del ancho y del alto: 16 veces
+# menos píxeles, lo que la hace mucho más rápida que la imagen completa.
+REDUCCION_PREVISTA = 4
+
+def clave_nube(usuario: str, fecha_inicio: date|None, fecha_fin: date|None, frecuencias: dict[str, int]) -> tuple:
+    """
+    Clave de una nube en CacheNubes: el usuario, el rango de fechas y un hash
+    de la tabla de frecuencias, de modo que si el chat cambia (p. ej. al
+    volver a cargarlo) no se reutiliza una imagen que ya no corresponde. El
+    hash no depende del orden de las palabras en la tabla.
+    """
+    return usuario, fecha_inicio, fecha_fin, hash(frozenset(frecuencias.items()))
+
+class CacheNubes:
+    """
+    Caché LRU de imágenes de nubes de palabras. Se consulta desde el hilo de
+    trabajo y desde el de la interfaz, así que los accesos van con un cerrojo.
+    """
+
+    def __init__(self, capacidad: int = TAM_CACHE_NUBES):
+        self.capacidad = capacidad
+        self._imagenes = OrderedDict()
+        self._cerrojo = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._imagenes)
+
+    def busca(self, clave: tuple):
+        """Devuelve la imagen guardada con esa clave (y la marca como recién usada) o None."""
+        with self._cerrojo:
+            imagen = self._imagenes.get(clave)
+            if imagen is not None:
+                self._imagenes.move_to_end(clave)
+            return imagen
+
+    def guarda(self, clave: tuple, imagen) -> None:
+        """Guarda una imagen, descartando la usada hace más tiempo si no cabe."""
+        with self._cerrojo:
+            self._imagenes[clave] = imagen
+            self._imagenes.move_to_end(clave)
+            while len(self._imagenes) > self.capacidad:
+                self._imagenes.popitem(last=False)
+
+def genera_nube(frecuencias: dict[str, int], prevista: bool = False):
+    """
+    Genera la imagen (array RGB) de la nube de palabras de unas frecuencias.
+    Con prevista=True se genera a tamaño reducido (REDUCCION_PREVISTA) para
+    mostrarla enseguida mientras se genera la completa. La disposición es
+    siempre la misma para las mismas frecuencias y el mismo tamaño, pero la
+    previsualización no comparte la de la imagen completa: al ser otro
+    tamaño, las palabras pueden quedar en otro sitio.
+    """
+    from wordcloud import WordCloud
+    reduccion = REDUCCION_PREVISTA if prevista else 1
+    nube = WordCloud(background_color="white", width=ANCHO_NUBE // reduccion, height=ALTO_NUBE // reduccion,
+                     colormap="viridis", max_words=100, random_state=0)
+    return nube.generate_from_frequencies(frecuencias).to_array()
@@ -0,0 +1,31 @@
+from datetime import date
+from whatsapp_nubes import *
+
+def test_clave_nube():
+    print("Probando clave_nube...")
+    frecuencias = {"hola": 3, "mundo": 1}
+    clave = clave_nube("Laura", date(2024, 1, 1), date(2024, 1, 31), frecuencias)
+    assert clave == clave_nube("Laura", date(2024, 1, 1), date(2024, 1, 31), dict(frecuencias))
+    assert clave == clave_nube("Laura", date(2024, 1, 1), date(2024, 1, 31), {"mundo": 1, "hola": 3})
+    assert clave != clave_nube("Dani", date(2024, 1, 1), date(2024, 1, 31), frecuencias)
+    assert clave != clave_nube("Laura", None, date(2024, 1, 31), frecuencias)
+    assert clave != clave_nube("Laura", date(2024, 1, 1), date(2024, 1, 31), {"hola": 3, "mundo": 2})
+
+def test_cache_nubes():
+    print("Probando CacheNubes...")
+    nubes = CacheNubes(capacidad=2)
+    assert nubes.busca("a") is None
+    nubes.guarda("a", [1])
+    nubes.guarda("b", [2])
+    assert nubes.busca("a") == [1]  # "a" pasa a ser la más reciente
+    nubes.guarda("c", [3])
+    assert len(nubes) == 2
+    assert nubes.busca("b") is None
+    assert nubes.busca("a") == [1] and nubes.busca("c") == [3]
+    nubes.guarda("a", [4])
+    assert nubes.busca("a") == [4] and len(nubes) == 2
+
+
+test_clave_nube()
+test_cache_nubes()
+print("Todos los tests pasaron correctamente.")
@@ -0,0 +1,226 @@
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from copy import copy
+from datetime import date
+from whatsapp_tokens import ContadorPalabras, tokens_de
+from whatsapp_utiles import Mensaje, mejores_palabras, puntua_palabras
+
+class IndicePalabras:
+    """
+    Índice invertido de palabras de un chat, construido una sola vez por carga.
+
+    Cada palabra distinta se guarda una vez en `vocabulario` y se identifica
+    por su posición (en orden de primera aparición). Para cada usuario se
+    guardan las frecuencias de sus palabras agrupadas por día y por mes, de
+    modo que las frecuencias de un rango de fechas se obtienen sumando unos
+    pocos grupos (los meses completos y los días sueltos de los extremos) en
+    lugar de volver a trocear todos los textos. Las palabras son los tokens
+    de whatsapp_tokens.tokeniza, como en analiza_todo.
+    """
+
+    def __init__(self):
+        self.vocabulario = []
+        self.ids = {}
+        self._ids_crudos = {}
+        self.dias = defaultdict(lambda: defaultdict(Counter))
+        self.meses = defaultdict(lambda: defaultdict(Counter))
+        self.total = defaultdict(Counter)
+        self.dia_inicial = None
+        self.dia_final = None
+        self._ultimo_rango = None
+        self._ultimas_frecuencias = None
+        self._puntuaciones = {}
+        # Solo en los índices creados con actualizado: grupos ya copiados
+        self._propios = None
+
+    @classmethod
+    def desde_mensajes(cls, mensajes: Iterable[Mensaje]) -> "IndicePalabras":
+        """Construye el índice recorriendo una sola vez los mensajes."""
+        return cls.desde_filas((m.fecha.toordinal(), m.usuario, m.texto) for m in mensajes)
+
+    @classmethod
+    def desde_store(cls, store) -> "IndicePalabras":
+        """Construye el índice a partir de las columnas de un MensajeStore."""
+        return cls.desde_filas(store.filas_palabras())
+
+    @classmethod
+    def desde_filas(cls, filas: Iterable[tuple[int, str, str]]) -> "IndicePalabras":
+        """
+        Construye el índice a partir de filas (ordinal de la fecha, usuario,
+        texto), una por mensaje.
+        """
+        indice = cls()
+        indice.anade_filas(filas)
+        return indice
+
+    def anade_filas(self, filas: Iterable[tuple[int, str, str]]) -> None:
+        """
+        Añade al índice las palabras de unas filas (ordinal de la fecha,
+        usuario, texto), por ejemplo los mensajes nuevos de un chat que ha
+        crecido, sin volver a procesar los que ya estaban.
+        """
+        self._actualiza(filas, Counter.update)
+
+    def retira_filas(self, filas: Iterable[tuple[int, str, str]]) -> None:
+        """Quita del índice las palabras de unas filas añadidas antes."""
+        self._actualiza(filas, Counter.subtract)
+
+    def actualizado(self, nuevas: Iterable[tuple[int, str, str]],
+                    retiradas: Iterable[tuple[int, str, str]] = ()) -> "IndicePalabras":
+        """
+        Devuelve un índice nuevo con las palabras de `nuevas` añadidas y las
+        de `retiradas` quitadas, sin modificar este, que puede seguir
+        usándose mientras tanto (como actualiza_agregados con los agregados).
+        El índice nuevo comparte con este los grupos que no cambian y copia
+        los de los días, meses y usuarios afectados antes de modificarlos.
+        """
+        indice = IndicePalabras()
+        indice.vocabulario = self.vocabulario.copy()
+        indice.ids = self.ids.copy()
+        indice._ids_crudos = self._ids_crudos.copy()
+        indice.dias.update(self.dias)
+        indice.meses.update(self.meses)
+        indice.total.update(self.total)
+        indice.dia_inicial, indice.dia_final = self.dia_inicial, self.dia_final
+        indice._propios = set()
+        indice.retira_filas(retiradas)
+        indice.anade_filas(nuevas)
+        return indice
+
+    def _propio(self, grupos, clave):
+        """
+        Devuelve grupos[clave] para modificarlo. En un índice creado con
+        actualizado, la primera vez se sustituye por una copia, porque puede
+        ser del índice de partida.
+        """
+        valor = grupos[clave]
+        if self._propios is not None and (id(grupos), clave) not in self._propios:
+            valor = grupos[clave] = copy(valor)
+            self._propios.add((id(grupos), clave))
+        return valor
+
+    def _actualiza(self, filas, operacion):
+        # Los textos de cada día se cuentan por lotes (uno por usuario) y cada
+        # trozo distinto se traduce a ids de palabra una sola vez.
+        contador = ContadorPalabras()
+        dia_actual = None
+        for dia, usuario, texto in filas:
+            if dia != dia_actual:
+                if dia_actual is not None:
+                    self._actualiza_dia(dia_actual, contador.vacia(), operacion)
+                dia_actual = dia
+            contador.anade(usuario, texto)
+        if dia_actual is not None:
+            self._actualiza_dia(dia_actual, contador.vacia(), operacion)
+        self._ultimo_rango = self._ultimas_frecuencias = None
+        self._puntuaciones = {}
+
+    def _actualiza_dia(self, dia, crudos_usuario, operacion):
+        fecha = date.fromordinal(dia)
+        grupo_dia = self._propio(self.dias, dia)
+        grupo_mes = self._propio(self.meses, (fecha.year, fecha.month))
+        if self.dia_inicial is None or dia < self.dia_inicial:
+            self.dia_inicial = dia
+        if self.dia_final is None or dia > self.dia_final:
+            self.dia_final = dia
+        ids_crudos = self._ids_crudos
+        for usuario, crudos in crudos_usuario.items():
+            conteo = Counter()
+            for crudo, n in crudos.items():
+                ids_crudo = ids_crudos.get(crudo)
+                if ids_crudo is None:
+                    ids_crudo = ids_crudos[crudo] = self._ids_de(crudo)
+                for id_palabra in ids_crudo:
+                    conteo[id_palabra] += n
+            operacion(self._propio(grupo_dia, usuario), conteo)
+            operacion(self._propio(grupo_mes, usuario), conteo)
+            operacion(self._propio(self.total, usuario), conteo)
+
+    def _ids_de(self, crudo):
+        ids = self.ids
+        resultado = []
+        for palabra in tokens_de(crudo):
+            id_palabra = ids.get(palabra)
+            if id_palabra is None:
+                id_palabra = ids[palabra] = len(self.vocabulario)
+                self.vocabulario.append(palabra)
+            resultado.append(id_palabra)
+        return tuple(resultado)
+
+    def frecuencias(self, fecha_inicio: date|None=None, fecha_fin: date|None=None) -> tuple[dict[str, Counter], list[int]]:
+        """
+        Devuelve las frecuencias de las palabras en los mensajes comprendidos
+        entre dos fechas (inclusive): un Counter por usuario (por id de
+        palabra) y la lista de apariciones totales de cada palabra del
+        vocabulario. El resultado del último rango consultado se reutiliza.
+        """
+        if self.dia_inicial is None:
+            return {}, []
+        ini = self.dia_inicial if fecha_inicio is None else max(fecha_inicio.toordinal(), self.dia_inicial)
+        fin = self.dia_final if fecha_fin is None else min(fecha_fin.toordinal(), self.dia_final)
+        if (ini, fin) == self._ultimo_rango:
+            return self._ultimas_frecuencias
+
+        if (ini, fin) == (self.dia_inicial, self.dia_final):
+            por_usuario = self.total
+        else:
+            por_usuario = defaultdict(Counter)
+            dia = ini
+            while dia <= fin:
+                fecha = date.fromordinal(dia)
+                if fecha.day == 1:
+                    siguiente = date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1).toordinal()
+                    if siguiente - 1 <= fin:
+                        # Mes completo dentro del rango: se suma su grupo
+                        grupo = self.meses.get((fecha.year, fecha.month), {})
+                        dia = siguiente
+                    else:
+                        grupo = self.dias.get(dia, {})
+                        dia += 1
+                else:
+                    grupo = self.dias.get(dia, {})
+                    dia += 1
+                for usuario, conteo in grupo.items():
+                    por_usuario[usuario].update(conteo)
+
+        totales = [0] * len(self.vocabulario)
+        for conteo in por_usuario.values():
+            for id_palabra, c in conteo.items():
+                totales[id_palabra] += c
+
+        self._ultimo_rango = (ini, fin)
+        self._ultimas_frecuencias = (por_usuario, totales)
+        self._puntuaciones = {}
+        return por_usuario, totales
+
+    def puntuaciones(self, modo: str = "log_odds", fecha_inicio: date|None=None,
+                     fecha_fin: date|None=None) -> dict[str, list[tuple[int, float]]]:
+        """
+        Devuelve, para todos los usuarios a la vez, sus palabras (por id)
+        ordenadas según puntua_palabras en un rango de fechas. Se calculan
+        una vez por rango y modo, así que cambiar de usuario no cuesta nada.
+        """
+        por_usuario, _ = self.frecuencias(fecha_inicio, fecha_fin)
+        puntuaciones = self._puntuaciones.get(modo)
+        if puntuaciones is None:
+            puntuaciones = self._puntuaciones[modo] = puntua_palabras(por_usuario, modo)
+        return puntuaciones
+
+    def palabras_caracteristicas(self, usuario: str, n: int = 100, fecha_inicio: date|None=None,
+                                 fecha_fin: date|None=None, modo: str = "diferencia") -> list[tuple[str, int]]:
+        """
+        Devuelve las n palabras más características de un usuario en un rango
+        de fechas, con el mismo criterio que analiza_palabras_caracteristicas
+        (apariciones propias menos apariciones de los demás, o la puntuación
+        de `modo` si es otro de MODOS_PALABRAS), ordenadas con mejores_palabras.
+        El coste depende del tamaño del vocabulario, no del número de
+        mensajes.
+        """
+        vocabulario = self.vocabulario
+        if modo != "diferencia":
+            puntos = self.puntuaciones(modo, fecha_inicio, fecha_fin).get(usuario, [])
+            return mejores_palabras(((vocabulario[i], p) for i, p in puntos), n)
+        por_usuario, totales = self.frecuencias(fecha_inicio, fecha_fin)
+        propias = por_usuario.get(usuario, {})
+        puntuaciones = ((vocabulario[i], 2 * propias.get(i, 0) - t) for i, t in enumerate(totales) if t)
+        return mejores_palabras(puntuaciones, n)
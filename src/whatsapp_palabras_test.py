@@ -0,0 +1,108 @@
+from whatsapp_palabras import *
+from whatsapp_store import MensajeStore
+from whatsapp_utiles import *
+from datetime import date, time
+
+MENSAJES = [
+    Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola mundo hola"),
+    Mensaje(date(2024, 1, 2), time(11, 0), "Usuario2", "Hola adios"),
+    Mensaje(date(2024, 1, 31), time(12, 0), "Usuario1", "mundo python"),
+    Mensaje(date(2024, 2, 1), time(9, 0), "Usuario3", "python es genial"),
+    Mensaje(date(2024, 2, 15), time(9, 30), "Usuario2", "genial genial adios"),
+    Mensaje(date(2024, 3, 1), time(20, 0), "Usuario1", "hola python"),
+]
+
+def test_indice_palabras():
+    print("Probando IndicePalabras.palabras_caracteristicas...")
+    indice = IndicePalabras.desde_mensajes(MENSAJES)
+    # "es" es una palabra vacía y no entra en el vocabulario
+    assert indice.vocabulario == ["hola", "mundo", "adios", "python", "genial"]
+    rangos = [(None, None), (date(2024, 1, 2), date(2024, 2, 29)), (date(2024, 2, 1), None),
+              (None, date(2024, 1, 31)), (date(2024, 2, 2), date(2024, 2, 14)), (date(2023, 1, 1), date(2025, 1, 1))]
+    for inicio, fin in rangos:
+        filtrados = filtra_mensajes_por_fechas(MENSAJES, inicio, fin)
+        for usuario in ["Usuario1", "Usuario2", "Usuario3"]:
+            esperado = dict(analiza_palabras_caracteristicas(filtrados, usuario, n=100))
+            assert dict(indice.palabras_caracteristicas(usuario, 100, inicio, fin)) == esperado
+
+def test_indice_palabras_top_k():
+    print("Probando el top-k de IndicePalabras...")
+    indice = IndicePalabras.desde_store(MensajeStore.desde_mensajes(MENSAJES))
+    assert indice.palabras_caracteristicas("Usuario1", n=2) == analiza_palabras_caracteristicas(MENSAJES, "Usuario1", n=2)
+    assert indice.palabras_caracteristicas("Usuario2", n=1) == [("adios", 2)]
+    assert IndicePalabras.desde_mensajes([]).palabras_caracteristicas("Usuario1") == []
+
+def test_indice_palabras_anade_y_retira():
+    print("Probando IndicePalabras.anade_filas y retira_filas...")
+    filas = [(m.fecha.toordinal(), m.usuario, m.texto) for m in MENSAJES]
+    indice = IndicePalabras.desde_filas(filas[:4])
+    indice.palabras_caracteristicas("Usuario1")
+    indice.retira_filas(filas[3:4])
+    indice.anade_filas(filas[3:])
+    for inicio, fin in [(None, None), (date(2024, 2, 1), date(2024, 2, 29))]:
+        filtrados = filtra_mensajes_por_fechas(MENSAJES, inicio, fin)
+        for usuario in ["Usuario1", "Usuario2", "Usuario3"]:
+            esperado = dict(analiza_palabras_caracteristicas(filtrados, usuario, n=100))
+            assert dict(indice.palabras_caracteristicas(usuario, 100, inicio, fin)) == esperado
+
+def test_indice_palabras_actualizado():
+    print("Probando IndicePalabras.actualizado...")
+    filas = [(m.fecha.toordinal(), m.usuario, m.texto) for m in MENSAJES]
+    indice = IndicePalabras.desde_filas(filas[:4])
+    antes = {(u, inicio, fin): indice.palabras_caracteristicas(u, 100, inicio, fin)
+             for u in ["Usuario1", "Usuario2", "Usuario3"]
+             for inicio, fin in [(None, None), (date(2024, 1, 2), date(2024, 2, 29))]}
+    nuevo = indice.actualizado(filas[3:], filas[3:4])
+    # El índice de partida no cambia
+    assert indice.vocabulario == ["hola", "mundo", "adios", "python", "genial"]
+    for u in ["Usuario1", "Usuario2", "Usuario3"]:
+        for inicio, fin in [(None, None), (date(2024, 1, 2), date(2024, 2, 29))]:
+            assert indice.palabras_caracteristicas(u, 100, inicio, fin) == antes[(u, inicio, fin)]
+            filtrados = filtra_mensajes_por_fechas(MENSAJES, inicio, fin)
+            esperado = analiza_palabras_caracteristicas(filtrados, u, n=100)
+            assert nuevo.palabras_caracteristicas(u, 100, inicio, fin) == esperado
+    assert nuevo.total == IndicePalabras.desde_filas(filas).total
+    # Un índice actualizado se puede volver a actualizar sin tocar los anteriores
+    otro = nuevo.actualizado([], filas[5:])
+    assert otro.total == IndicePalabras.desde_filas(filas[:5]).total
+    assert nuevo.total == IndicePalabras.desde_filas(filas).total
+
+def test_indice_palabras_modos():
+    print("Probando IndicePalabras.palabras_caracteristicas con TF-IDF y log-odds...")
+    indice = IndicePalabras.desde_mensajes(MENSAJES)
+    for modo in ["tfidf", "log_odds"]:
+        for inicio, fin in [(None, None), (date(2024, 1, 2), date(2024, 2, 29))]:
+            filtrados = filtra_mensajes_por_fechas(MENSAJES, inicio, fin)
+            puntuaciones = indice.puntuaciones(modo, inicio, fin)
+            for usuario in ["Usuario1", "Usuario2", "Usuario3"]:
+                esperado = analiza_palabras_caracteristicas(filtrados, usuario, 100, modo)
+                assert indice.palabras_caracteristicas(usuario, 100, inicio, fin, modo) == esperado
+            # Las puntuaciones del rango se calculan una vez para todos los usuarios
+            assert indice.puntuaciones(modo, inicio, fin) is puntuaciones
+
+def test_indice_palabras_empates():
+    print("Probando que IndicePalabras y analiza_todo desempatan igual...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "gato"),
+        Mensaje(date(2024, 1, 1), time(11, 0), "Usuario2", "perro"),
+        Mensaje(date(2024, 1, 1), time(12, 0), "Usuario1", "pez"),
+        Mensaje(date(2024, 1, 1), time(13, 0), "Usuario2", "ardilla"),
+    ]
+    indice = IndicePalabras.desde_mensajes(mensajes)
+    estadisticas = analiza_todo(mensajes)
+    # El vocabulario y los recuentos por usuario tienen las palabras en otro orden
+    assert indice.palabras_caracteristicas("Usuario3", n=2) == [("ardilla", -1), ("gato", -1)]
+    for modo in ["diferencia", "tfidf", "log_odds"]:
+        for usuario in ["Usuario1", "Usuario2", "Usuario3"]:
+            for n in (1, 2, 100):
+                esperado = extrae_palabras_caracteristicas(estadisticas, usuario, n, modo)
+                assert indice.palabras_caracteristicas(usuario, n, modo=modo) == esperado
+
+
+test_indice_palabras()
+test_indice_palabras_top_k()
+test_indice_palabras_anade_y_retira()
+test_indice_palabras_actualizado()
+test_indice_palabras_modos()
+test_indice_palabras_empates()
+print("Todos los tests pasaron correctamente.")
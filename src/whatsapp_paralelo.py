@@ -0,0 +1,117 @@
+import mmap
+import multiprocessing
+import os
+import re
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from whatsapp_loader import analiza_cabecera, detecta_formato_fichero, iter_log_whatsapp, mensajes_de_texto
+from whatsapp_store import MensajeStore
+
+# Por debajo de este tamaño (8 MiB) repartir el fichero entre procesos cuesta
+# más de lo que se gana y se lee de forma secuencial.
+TAM_MIN_PARALELO = 1 << 23
+
+# Tamaño mínimo de cada tramo (4 MiB) y tramos por proceso: con varios tramos
+# por proceso el reparto se equilibra aunque unos tramos cuesten más que otros.
+TAM_MIN_TRAMO = 1 << 22
+TRAMOS_POR_PROCESO = 4
+
+# Posible comienzo de una línea de mensaje (fecha y hora, como en
+# PATRON_MENSAJE). Los tramos se cortan siempre delante de una cabecera, para
+# que las líneas que continúan un mensaje se queden en el mismo tramo que él;
+# este patrón solo localiza candidatas, que se confirman con analiza_cabecera.
+PATRON_INICIO_MENSAJE = re.compile(rb'^[ \t]*\[?\d{1,4}[/-]\d{1,2}[/-]\d{1,4}[,\s]+\d{1,2}:\d{2}', re.MULTILINE)
+
+def carga_paralela(ruta_archivo: str, procesos: int|None=None, progreso: Callable[[float], None]|None=None,
+                   tam_tramo: int|None=None) -> MensajeStore:
+    """
+    Lee un fichero de WhatsApp repartiéndolo entre varios procesos. El
+    fichero se proyecta en memoria (mmap), se divide en tramos de bytes que
+    empiezan en una línea de mensaje y cada tramo se lee en un proceso de un
+    ProcessPoolExecutor. Los resultados se unen en el orden del fichero, así
+    que el MensajeStore es el mismo que con una lectura secuencial.
+
+    Parámetros:
+    ruta_archivo (str): Ruta del fichero exportado de WhatsApp.
+    procesos (int|None): Número de procesos (por defecto, uno por núcleo).
+    progreso (Callable[[float], None]|None): Igual que en iter_log_whatsapp.
+    tam_tramo (int|None): Tamaño aproximado de cada tramo en bytes (por
+        defecto se reparte el fichero en TRAMOS_POR_PROCESO tramos por proceso).
+
+    Devuelve:
+    MensajeStore: Mensajes del chat.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    try:
+        tamano = os.path.getsize(ruta_archivo)
+    except FileNotFoundError:
+        print(f"Error: No se encontró el archivo en {ruta_archivo}")
+        return MensajeStore.desde_mensajes([])
+    if tam_tramo is None:
+        if procesos == 1 or tamano < TAM_MIN_PARALELO:
+            return MensajeStore.desde_mensajes(iter_log_whatsapp(ruta_archivo, progreso=progreso))
+        tam_tramo = max(tamano // (procesos * TRAMOS_POR_PROCESO), TAM_MIN_TRAMO)
+
+    # El formato de fecha se decide con el principio del fichero, igual que en
+    # la lectura secuencial, y se pasa a todos los procesos.
+    formato_fecha = detecta_formato_fichero(ruta_archivo)
+    tramos = divide_en_tramos(ruta_archivo, tam_tramo)
+
+    # Procesos nuevos en lugar de fork: quien llama puede tener otros hilos
+    # (como la interfaz gráfica) y fork solo copiaría el actual.
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as executor:
+        futuros = [executor.submit(_lee_tramo, ruta_archivo, inicio, fin, formato_fecha) for inicio, fin in tramos]
+        try:
+            for terminados, futuro in enumerate(as_completed(futuros), 1):
+                futuro.result()
+                if progreso is not None:
+                    progreso(terminados / len(futuros))
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        return MensajeStore.concatena(futuro.result() for futuro in futuros)
+
+def divide_en_tramos(ruta_archivo: str, tam_tramo: int) -> list[tuple[int, int]]:
+    """
+    Divide un fichero en tramos consecutivos [inicio, fin) de unos tam_tramo
+    bytes que empiezan al comienzo de una línea de mensaje (salvo el primero,
+    que empieza en 0).
+    """
+    tamano = os.path.getsize(ruta_archivo)
+    if tamano == 0:
+        return []
+    with open(ruta_archivo, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        cortes = [0]
+        while cortes[-1] + tam_tramo < tamano:
+            # Se busca la primera línea de mensaje a partir del corte tentativo
+            salto = datos.find(b'\n', cortes[-1] + tam_tramo - 1)
+            if salto < 0:
+                break
+            corte = _busca_cabecera(datos, salto + 1)
+            if corte is None:
+                break
+            cortes.append(corte)
+    cortes.append(tamano)
+    return list(zip(cortes, cortes[1:]))
+
+def _busca_cabecera(datos, desde: int) -> int|None:
+    """Posición de la primera línea de cabecera a partir de `desde` (comienzo de línea)."""
+    while True:
+        coincidencia = PATRON_INICIO_MENSAJE.search(datos, desde)
+        if coincidencia is None:
+            return None
+        inicio = coincidencia.start()
+        fin = datos.find(b'\n', inicio)
+        linea = datos[inicio:fin if fin >= 0 else len(datos)]
+        if analiza_cabecera(linea.decode('utf-8', errors='replace').strip()) is not None:
+            return inicio
+        if fin < 0:
+            return None
+        desde = fin + 1
+
+def _lee_tramo(ruta_archivo: str, inicio: int, fin: int, formato_fecha: tuple[str, int, int, int]) -> MensajeStore:
+    """Lee los mensajes de un tramo del fichero (se ejecuta en otro proceso)."""
+    with open(ruta_archivo, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        texto = datos[inicio:fin].decode('utf-8')
+    return MensajeStore.desde_mensajes(mensajes_de_texto(texto, formato_fecha))
@@ -0,0 +1,58 @@
+import os
+import tempfile
+from whatsapp_paralelo import *
+from whatsapp_loader import leer_log_whatsapp
+
+LINEAS = [
+    "[15/09/2025, 09:16:05] Laura: Hola chicos! 💻",
+    "[16/09/2025, 10:05:00] Dani: gente, alguien ha ido a la clase de hoy?",
+    "esta línea continúa el mensaje anterior",
+    "17/09/2025 10:00",
+    "[18/09/2025, 18:30:15] Sofía: CHICOS AYUDA!!!",
+    "[19/09/2025, 08:00:00] Marta: ¿Qué pasa? 😊",
+]
+
+def _crea_log(contenido):
+    fd, ruta = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    return ruta
+
+def test_divide_en_tramos():
+    print("Probando divide_en_tramos...")
+    ruta = _crea_log("\n".join(LINEAS * 20) + "\n")
+    try:
+        tramos = divide_en_tramos(ruta, 100)
+        assert len(tramos) > 1
+        assert tramos[0][0] == 0 and tramos[-1][1] == os.path.getsize(ruta)
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        for (inicio, fin), (siguiente, _) in zip(tramos, tramos[1:]):
+            assert fin == siguiente
+            # Cada tramo empieza en una línea de mensaje, nunca en una continuación
+            assert datos[siguiente - 1:siguiente] == b"\n" and datos[siguiente:siguiente + 1] == b"["
+    finally:
+        os.remove(ruta)
+
+def test_carga_paralela():
+    print("Probando carga_paralela...")
+    ruta = _crea_log("\n".join(LINEAS * 50) + "\n")
+    try:
+        fracciones = []
+        store = carga_paralela(ruta, procesos=2, progreso=fracciones.append, tam_tramo=256)
+        assert list(store) == leer_log_whatsapp(ruta)
+        assert store.nombres == ["Laura", "Dani", "Sofía", "Marta"]
+        assert fracciones[-1] == 1.0
+        # Fichero pequeño: lectura secuencial
+        assert list(carga_paralela(ruta, procesos=2)) == list(store)
+    finally:
+        os.remove(ruta)
+    assert len(carga_paralela("no_existe.txt")) == 0
+
+
+# Los procesos "spawn" de carga_paralela vuelven a importar este fichero:
+# las pruebas solo se lanzan desde el proceso principal.
+if __name__ == "__main__":
+    test_divide_en_tramos()
+    test_carga_paralela()
+    print("Todos los tests pasaron correctamente.")
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from collections.abc import Sized
+from functools import wraps
+from time import perf_counter
+from types import FunctionType, GeneratorType
+
+# Variables de entorno que activan la instrumentación sin tocar el código:
+# WHATSAPP_PERFIL=1 la activa y WHATSAPP_PERFIL=ruta.json además guarda los
+# tiempos en ese fichero al terminar; WHATSAPP_PERFIL_CPROFILE=ruta.prof
+# captura también un perfil de cProfile.
+VARIABLE_ENTORNO = "WHATSAPP_PERFIL"
+VARIABLE_CPROFILE = "WHATSAPP_PERFIL_CPROFILE"
+
+# Mientras está desactivada, las medidas no se registran y ninguna función
+# está envuelta, así que la instrumentación no cuesta nada.
+ACTIVO = False
+
+_etapas = {}
+_cerrojo = threading.Lock()
+_ruta_json = None
+_ruta_cprofile = None
+_cprofile = None
+
+class Medida:
+    """
+    Mide el tiempo de una etapa en un bloque with. El número de mensajes se
+    puede indicar al crearla o asignar a `mensajes` dentro del bloque, cuando
+    todavía no se conoce.
+    """
+    __slots__ = ("etapa", "mensajes", "_inicio")
+
+    def __init__(self, etapa: str, mensajes: int = 0):
+        self.etapa = etapa
+        self.mensajes = mensajes
+
+    def __enter__(self) -> "Medida":
+        self._inicio = perf_counter()
+        return self
+
+    def __exit__(self, *excepcion) -> None:
+        if ACTIVO:
+            registra(self.etapa, perf_counter() - self._inicio, self.mensajes)
+
+def mide(etapa: str, mensajes: int = 0) -> Medida:
+    """Devuelve una Medida para usar con with: `with perfil.mide("carga") as m: ...`."""
+    return Medida(etapa, mensajes)
+
+def registra(etapa: str, segundos: float, mensajes: int = 0) -> None:
+    """Suma una llamada de `segundos` y `mensajes` a una etapa (desde cualquier hilo)."""
+    with _cerrojo:
+        datos = _etapas.get(etapa)
+        if datos is None:
+            _etapas[etapa] = [1, segundos, mensajes]
+        else:
+            datos[0] += 1
+            datos[1] += segundos
+            datos[2] += mensajes
+
+def activa(ruta_json: str|None=None, ruta_cprofile: str|None=None, modulos: tuple = ()) -> None:
+    """
+    Activa la instrumentación.
+
+    Parámetros:
+    ruta_json (str|None): Fichero donde termina() guarda el resumen en JSON.
+    ruta_cprofile (str|None): Si se indica, se captura un perfil de cProfile
+        del hilo actual y termina() lo guarda en este fichero (se puede abrir
+        con pstats o snakeviz).
+    modulos (tuple): Módulos cuyas funciones públicas se miden (ver instrumenta).
+    """
+    global ACTIVO, _ruta_json, _ruta_cprofile, _cprofile
+    ACTIVO = True
+    _ruta_json, _ruta_cprofile = ruta_json, ruta_cprofile
+    if ruta_cprofile is not None and _cprofile is None:
+        import cProfile
+        _cprofile = cProfile.Profile()
+        _cprofile.enable()
+    for modulo in modulos:
+        instrumenta(modulo)
+
+def activa_desde_entorno(modulos: tuple = ()) -> bool:
+    """Activa la instrumentación si lo piden las variables de entorno. Devuelve si quedó activa."""
+    valor = os.environ.get(VARIABLE_ENTORNO, "")
+    ruta_cprofile = os.environ.get(VARIABLE_CPROFILE) or None
+    if valor in ("", "0") and ruta_cprofile is None:
+        return ACTIVO
+    activa(None if valor in ("", "0", "1") else valor, ruta_cprofile, modulos)
+    return True
+
+def termina() -> None:
+    """Detiene cProfile y guarda los ficheros pedidos al activar la instrumentación."""
+    global _cprofile
+    if _cprofile is not None:
+        _cprofile.disable()
+        _cprofile.dump_stats(_ruta_cprofile)
+        _cprofile = None
+    if _ruta_json is not None:
+        vuelca_json(_ruta_json)
+
+def reinicia() -> None:
+    """Borra lo medido hasta ahora."""
+    with _cerrojo:
+        _etapas.clear()
+
+def instrumenta(modulo) -> None:
+    """
+    Sustituye las funciones públicas definidas en un módulo por versiones que
+    registran su tiempo, sus llamadas y cuántos mensajes reciben (o devuelven)
+    en la etapa "modulo.funcion". Solo cambia las llamadas que pasan por el
+    módulo (modulo.funcion o llamadas internas del propio módulo), no los
+    nombres ya importados con from ... import. Los generadores se miden
+    mientras se recorren: cuenta el tiempo dentro de cada next() y los
+    elementos producidos.
+    """
+    for nombre, funcion in list(vars(modulo).items()):
+        if (nombre.startswith("_") or not isinstance(funcion, FunctionType) or funcion.__module__ != modulo.__name__
+                or hasattr(funcion, "__wrapped__")):
+            continue
+        setattr(modulo, nombre, _envuelve(funcion, f"{modulo.__name__}.{nombre}"))
+
+def instrumenta_metodo(objeto, nombre: str, etapa: str) -> None:
+    """Mide un método de un objeto concreto (p. ej. el draw() de un lienzo) en la etapa indicada."""
+    setattr(objeto, nombre, _envuelve(getattr(objeto, nombre), etapa))
+
+def _envuelve(funcion, etapa):
+    @wraps(funcion)
+    def medida(*args, **kwargs):
+        inicio = perf_counter()
+        resultado = funcion(*args, **kwargs)
+        segundos = perf_counter() - inicio
+        if isinstance(resultado, GeneratorType):
+            return _mide_generador(etapa, resultado, segundos)
+        mensajes = _numero_mensajes(resultado)
+        if mensajes is None:
+            mensajes = _numero_mensajes(args[0]) if args else None
+        registra(etapa, segundos, mensajes or 0)
+        return resultado
+    return medida
+
+def _mide_generador(etapa, generador, segundos):
+    n = 0
+    siguiente = generador.__next__
+    try:
+        while True:
+            inicio = perf_counter()
+            try:
+                valor = siguiente()
+            except StopIteration:
+                break
+            finally:
+                segundos += perf_counter() - inicio
+            n += 1
+            yield valor
+    finally:
+        registra(etapa, segundos, n)
+
+def _numero_mensajes(valor):
+    """Longitud de una colección de mensajes (lista, MensajeStore...); None si no lo es."""
+    if isinstance(valor, Sized) and not isinstance(valor, (tuple, str, bytes, dict)):
+        return len(valor)
+    return None
+
+def resumen() -> dict[str, dict]:
+    """
+    Devuelve lo medido por etapa, de más a menos tiempo total: llamadas,
+    segundos, mensajes y milisegundos por llamada.
+    """
+    with _cerrojo:
+        etapas = sorted(_etapas.items(), key=lambda e: -e[1][1])
+    return {etapa: {"llamadas": llamadas, "segundos": segundos, "mensajes": mensajes,
+                    "ms_por_llamada": 1000 * segundos / llamadas}
+            for etapa, (llamadas, segundos, mensajes) in etapas}
+
+def texto_resumen(n: int = 10) -> str:
+    """Las n etapas más costosas en texto, una por línea (para mostrarlas en la interfaz)."""
+    lineas = []
+    for etapa, datos in list(resumen().items())[:n]:
+        lineas.append(f"{etapa:45s} {datos['llamadas']:6d}x {datos['segundos'] * 1000:10.1f} ms "
+                      f"{datos['mensajes']:10d} msgs")
+    return "\n".join(lineas)
+
+def vuelca_json(ruta: str) -> None:
+    """Guarda el resumen en un fichero JSON."""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resumen(), f, ensure_ascii=False, indent=2)
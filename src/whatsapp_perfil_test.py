@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import types
+import whatsapp_perfil as perfil
+
+def _modulo_de_prueba():
+    modulo = types.ModuleType("modulo_prueba")
+    exec("def duplica(mensajes):\n"
+         "    return mensajes + mensajes\n"
+         "def cuenta(mensajes):\n"
+         "    return {'total': len(duplica(mensajes))}\n"
+         "def genera(n):\n"
+         "    yield from range(n)\n"
+         "def _privada():\n"
+         "    return 1\n", vars(modulo))
+    return modulo
+
+def test_mide():
+    print("Probando mide...")
+    perfil.reinicia()
+    perfil.ACTIVO = False
+    with perfil.mide("inactiva", 5):
+        pass
+    assert perfil.resumen() == {}
+
+    perfil.ACTIVO = True
+    try:
+        with perfil.mide("etapa", 5):
+            pass
+        with perfil.mide("etapa") as medida:
+            medida.mensajes = 3
+        r = perfil.resumen()
+        assert r["etapa"]["llamadas"] == 2
+        assert r["etapa"]["mensajes"] == 8
+        assert r["etapa"]["segundos"] >= 0
+        assert "etapa" in perfil.texto_resumen()
+    finally:
+        perfil.ACTIVO = False
+        perfil.reinicia()
+
+def test_instrumenta():
+    print("Probando instrumenta...")
+    modulo = _modulo_de_prueba()
+    perfil.ACTIVO = True
+    try:
+        perfil.instrumenta(modulo)
+        perfil.instrumenta(modulo)  # No se envuelve dos veces
+        assert modulo.cuenta([1, 2, 3]) == {"total": 6}
+        assert list(modulo.genera(4)) == [0, 1, 2, 3]
+        assert modulo._privada() == 1
+        r = perfil.resumen()
+        # cuenta devuelve un dict: cuenta los mensajes que recibe; duplica, los que devuelve
+        assert r["modulo_prueba.cuenta"]["llamadas"] == 1 and r["modulo_prueba.cuenta"]["mensajes"] == 3
+        assert r["modulo_prueba.duplica"]["llamadas"] == 1 and r["modulo_prueba.duplica"]["mensajes"] == 6
+        assert r["modulo_prueba.genera"]["mensajes"] == 4
+        assert "modulo_prueba._privada" not in r
+    finally:
+        perfil.ACTIVO = False
+        perfil.reinicia()
+
+def test_vuelca_json():
+    print("Probando vuelca_json...")
+    perfil.ACTIVO = True
+    try:
+        perfil.registra("lectura", 0.5, 100)
+        fd, ruta = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        perfil.vuelca_json(ruta)
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        os.remove(ruta)
+        assert datos == {"lectura": {"llamadas": 1, "segundos": 0.5, "mensajes": 100, "ms_por_llamada": 500.0}}
+    finally:
+        perfil.ACTIVO = False
+        perfil.reinicia()
+
+
+test_mide()
+test_instrumenta()
+test_vuelca_json()
+print("Todos los tests pasaron correctamente.")
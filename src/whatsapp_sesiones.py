@@ -0,0 +1,143 @@
+from array import array
+from bisect import bisect_left
+from collections import namedtuple, Counter, defaultdict
+from collections.abc import Iterable, Sequence
+from datetime import date
+from itertools import compress, islice
+from operator import add, and_, le, ne, sub
+from statistics import median
+from whatsapp_utiles import Mensaje
+
+SEGUNDOS_DIA = 86400
+
+# Segundos de silencio a partir de los cuales el siguiente mensaje abre una
+# conversación nueva (sesión).
+HUECO_SESION = 30 * 60
+
+# Índice de conversación de un chat, en orden cronológico. `instantes` son los
+# segundos de cada mensaje desde el 1/1/1 (ordinal de la fecha * 86400 +
+# segundos del día), `usuarios` el identificador de su autor en `nombres`,
+# `inicios` las posiciones de los mensajes que abren una sesión (el primero y
+# los que llegan tras más de `hueco` segundos de silencio) y `respuestas` las
+# posiciones de los mensajes que contestan, dentro de una sesión, a otro
+# usuario (el autor del mensaje anterior), con su latencia en `latencias`.
+IndiceConversacion = namedtuple('IndiceConversacion', ['hueco', 'instantes', 'usuarios', 'nombres', 'inicios',
+                                                       'respuestas', 'latencias'])
+
+# Resumen de la conversación en un rango de fechas: número de sesiones que
+# empiezan en él, mensajes y duración media (en segundos) de esas sesiones,
+# sesiones que inicia cada usuario, número de respuestas y mediana de la
+# latencia (en segundos) de cada par (quien responde, a quien responde) y
+# mediana del tiempo de respuesta de cada usuario.
+EstadisticasConversacion = namedtuple('EstadisticasConversacion', ['sesiones', 'mensajes_por_sesion',
+                                                                   'duracion_media', 'inicia', 'respuestas',
+                                                                   'latencia_entre', 'mediana_respuesta'])
+
+def indexa_conversacion(mensajes: Iterable[Mensaje], hueco: int = HUECO_SESION) -> IndiceConversacion|None:
+    """
+    Recorre una vez los mensajes y construye el índice de conversación que
+    consulta_conversacion usa para cualquier rango de fechas.
+
+    Parámetros:
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
+    hueco (int): Segundos de silencio que separan dos sesiones.
+
+    Devuelve:
+    IndiceConversacion|None: Índice de conversación, o None si no hay mensajes.
+    """
+    fechas = array('i')
+    segundos = array('i')
+    usuarios = array('i')
+    nombres = []
+    ids = {}
+    for m in mensajes:
+        id_usuario = ids.get(m.usuario)
+        if id_usuario is None:
+            id_usuario = ids[m.usuario] = len(nombres)
+            nombres.append(m.usuario)
+        fechas.append(m.fecha.toordinal())
+        segundos.append(m.hora.hour * 3600 + m.hora.minute * 60 + m.hora.second)
+        usuarios.append(id_usuario)
+    return conversacion_de_columnas(fechas, segundos, usuarios, nombres, hueco)
+
+def conversacion_de_columnas(fechas: Sequence[int], segundos: Sequence[int], usuarios: Sequence[int],
+                             nombres: list[str], hueco: int = HUECO_SESION) -> IndiceConversacion|None:
+    """
+    Igual que indexa_conversacion, pero a partir de columnas (ordinal de la
+    fecha, segundos del día e identificador del usuario en `nombres`), como
+    las de MensajeStore. Los instantes, los huecos entre mensajes seguidos y
+    las sesiones y respuestas salen de un único barrido lineal con map y
+    compress (bucles en C); si los mensajes no están en orden cronológico,
+    antes se ordenan.
+
+    Devuelve:
+    IndiceConversacion|None: Índice de conversación, o None si no hay mensajes.
+    """
+    n = len(fechas)
+    if n == 0:
+        return None
+    instantes = array('q', map(add, map(SEGUNDOS_DIA.__mul__, fechas), segundos))
+    usuarios = array('i', usuarios)
+    if not all(map(le, instantes, islice(instantes, 1, None))):
+        orden = sorted(range(n), key=instantes.__getitem__)
+        instantes = array('q', map(instantes.__getitem__, orden))
+        usuarios = array('i', map(usuarios.__getitem__, orden))
+
+    # huecos[k] es el silencio antes del mensaje k + 1
+    huecos = array('q', map(sub, islice(instantes, 1, None), instantes))
+    inicios = array('i', [0])
+    inicios.extend(compress(range(1, n), map(hueco.__lt__, huecos)))
+    es_respuesta = list(map(and_, map(hueco.__ge__, huecos), map(ne, islice(usuarios, 1, None), usuarios)))
+    respuestas = array('i', compress(range(1, n), es_respuesta))
+    latencias = array('q', compress(huecos, es_respuesta))
+    return IndiceConversacion(hueco, instantes, usuarios, list(nombres), inicios, respuestas, latencias)
+
+def consulta_conversacion(indice: IndiceConversacion|None, fecha_inicio: date|None=None,
+                          fecha_fin: date|None=None) -> EstadisticasConversacion:
+    """
+    Calcula las estadísticas de conversación de los mensajes entre dos fechas
+    (inclusive) a partir del índice, sin volver a recorrer el chat: el rango
+    se localiza con búsquedas binarias y solo se recorren las sesiones y las
+    respuestas que caen dentro. Las sesiones que empiezan en el rango cuentan
+    completas, aunque terminen después.
+
+    Parámetros:
+    indice (IndiceConversacion|None): Resultado de indexa_conversacion.
+    fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
+    fecha_fin (date|None): Fecha de fin (inclusive) o None.
+
+    Devuelve:
+    EstadisticasConversacion: Estadísticas de conversación del rango.
+    """
+    if indice is None:
+        return EstadisticasConversacion(0, 0.0, 0.0, Counter(), Counter(), {}, {})
+    instantes, usuarios, nombres = indice.instantes, indice.usuarios, indice.nombres
+    i = 0 if fecha_inicio is None else bisect_left(instantes, fecha_inicio.toordinal() * SEGUNDOS_DIA)
+    j = len(instantes) if fecha_fin is None else bisect_left(instantes, (fecha_fin.toordinal() + 1) * SEGUNDOS_DIA)
+
+    a, b = bisect_left(indice.inicios, i), bisect_left(indice.inicios, j)
+    inicios = indice.inicios[a:b]
+    # Cada sesión termina justo antes de la siguiente (o al final del chat)
+    fines = indice.inicios[a + 1:b + 1]
+    if len(fines) < len(inicios):
+        fines.append(len(instantes))
+    sesiones = len(inicios)
+    mensajes_por_sesion = (sum(fines) - sum(inicios)) / sesiones if sesiones else 0.0
+    ultimos = map(instantes.__getitem__, map((1).__rsub__, fines))
+    duracion = sum(map(sub, ultimos, map(instantes.__getitem__, inicios)))
+    duracion_media = duracion / sesiones if sesiones else 0.0
+    inicia = Counter({nombres[u]: c for u, c in Counter(map(usuarios.__getitem__, inicios)).items()})
+
+    c, d = bisect_left(indice.respuestas, i), bisect_left(indice.respuestas, j)
+    por_pareja = defaultdict(list)
+    for posicion, latencia in zip(indice.respuestas[c:d], indice.latencias[c:d]):
+        por_pareja[(usuarios[posicion], usuarios[posicion - 1])].append(latencia)
+    por_usuario = defaultdict(list)
+    for (de, _), latencias in por_pareja.items():
+        por_usuario[de].extend(latencias)
+
+    respuestas = Counter({(nombres[de], nombres[para]): len(l) for (de, para), l in por_pareja.items()})
+    latencia_entre = {(nombres[de], nombres[para]): float(median(l)) for (de, para), l in por_pareja.items()}
+    mediana_respuesta = {nombres[de]: float(median(l)) for de, l in por_usuario.items()}
+    return EstadisticasConversacion(sesiones, mensajes_por_sesion, duracion_media, inicia, respuestas,
+                                    latencia_entre, mediana_respuesta)
@@ -0,0 +1,66 @@
+import random
+from whatsapp_sesiones import *
+from whatsapp_store import MensajeStore
+from whatsapp_utiles import Mensaje
+from datetime import date, time
+
+MENSAJES = [
+    Mensaje(date(2024, 1, 1), time(10, 0, 0), "Usuario1", "Hola"),
+    Mensaje(date(2024, 1, 1), time(10, 1, 0), "Usuario2", "Hola!"),        # responde a Usuario1 en 60 s
+    Mensaje(date(2024, 1, 1), time(10, 2, 0), "Usuario2", "Qué tal?"),     # mismo usuario: no es respuesta
+    Mensaje(date(2024, 1, 1), time(10, 5, 0), "Usuario1", "Bien"),         # responde a Usuario2 en 180 s
+    Mensaje(date(2024, 1, 1), time(11, 0, 0), "Usuario2", "Otra cosa"),    # 55 min después: sesión nueva
+    Mensaje(date(2024, 1, 1), time(11, 0, 30), "Usuario1", "Dime"),        # responde a Usuario2 en 30 s
+    Mensaje(date(2024, 1, 2), time(9, 0, 0), "Usuario3", "Buenos días"),   # sesión nueva
+    Mensaje(date(2024, 1, 2), time(9, 10, 0), "Usuario1", "Buenas"),       # responde a Usuario3 en 600 s
+]
+
+def test_consulta_conversacion():
+    print("Probando consulta_conversacion...")
+    indice = indexa_conversacion(MENSAJES)
+    assert list(indice.inicios) == [0, 4, 6]
+    assert list(indice.respuestas) == [1, 3, 5, 7]
+    estadisticas = consulta_conversacion(indice)
+    assert estadisticas.sesiones == 3
+    assert estadisticas.mensajes_por_sesion == 8 / 3
+    assert estadisticas.duracion_media == (300 + 30 + 600) / 3
+    assert estadisticas.inicia == {"Usuario1": 1, "Usuario2": 1, "Usuario3": 1}
+    assert estadisticas.respuestas == {("Usuario2", "Usuario1"): 1, ("Usuario1", "Usuario2"): 2,
+                                       ("Usuario1", "Usuario3"): 1}
+    assert estadisticas.latencia_entre == {("Usuario2", "Usuario1"): 60, ("Usuario1", "Usuario2"): 105,
+                                           ("Usuario1", "Usuario3"): 600}
+    assert estadisticas.mediana_respuesta == {"Usuario2": 60, "Usuario1": 180}
+
+    # Rango de fechas: solo el segundo día
+    dia = consulta_conversacion(indice, date(2024, 1, 2), date(2024, 1, 2))
+    assert dia.sesiones == 1 and dia.inicia == {"Usuario3": 1}
+    assert dia.respuestas == {("Usuario1", "Usuario3"): 1}
+    assert dia.mediana_respuesta == {"Usuario1": 600}
+    assert consulta_conversacion(indice, date(2024, 1, 1), date(2024, 1, 1)).sesiones == 2
+    assert consulta_conversacion(indice, date(2024, 2, 1), None).sesiones == 0
+
+def test_indexa_conversacion_hueco():
+    print("Probando indexa_conversacion con otro hueco...")
+    # Con una hora de hueco, el mensaje de las 11:00 sigue la primera sesión
+    estadisticas = consulta_conversacion(indexa_conversacion(MENSAJES, hueco=3600))
+    assert estadisticas.sesiones == 2
+    assert estadisticas.respuestas[("Usuario2", "Usuario1")] == 2
+    assert estadisticas.latencia_entre[("Usuario2", "Usuario1")] == (60 + 3300) / 2
+
+def test_indexa_conversacion_columnas():
+    print("Probando conversacion_de_columnas...")
+    indice = indexa_conversacion(MENSAJES)
+    assert MensajeStore.desde_mensajes(MENSAJES).indexa_conversacion() == indice
+    # Los mensajes desordenados se ordenan antes de barrerlos
+    desordenados = MENSAJES[:]
+    random.Random(0).shuffle(desordenados)
+    assert consulta_conversacion(indexa_conversacion(desordenados)) == consulta_conversacion(indice)
+    assert indexa_conversacion([]) is None
+    vacio = consulta_conversacion(None)
+    assert vacio.sesiones == 0 and vacio.respuestas == {} and vacio.mediana_respuesta == {}
+
+
+test_consulta_conversacion()
+test_indexa_conversacion_hueco()
+test_indexa_conversacion_columnas()
+print("Todos los tests pasaron correctamente.")
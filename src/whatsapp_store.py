@@ -0,0 +1,329 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import date, time
+from functools import lru_cache
+from itertools import accumulate, compress, islice
+from operator import le
+from whatsapp_utiles import (Mensaje, DIAS_SEMANA, AgregadosAcumulados, Estadisticas, acumula_agregados,
+                             extrae_palabras_caracteristicas)
+from whatsapp_sesiones import HUECO_SESION, IndiceConversacion, conversacion_de_columnas
+from whatsapp_tokens import ContadorPalabras, suma_conteos
+
+# Las fechas y horas se reconstruyen a partir de enteros; con la caché, todos
+# los mensajes de un mismo día comparten el mismo objeto date.
+_fecha_de_ordinal = lru_cache(maxsize=1 << 14)(date.fromordinal)
+
+@lru_cache(maxsize=1 << 17)
+def _hora_de_segundos(segundos: int) -> time:
+    return time(segundos // 3600, segundos // 60 % 60, segundos % 60)
+
+class MensajeStore:
+    """
+    Almacén columnar de mensajes. En lugar de una lista de tuplas Mensaje,
+    guarda cada campo en un array compacto de enteros, de modo que los
+    recuentos se calculan con Counter/map sobre los arrays (bucles en C) en
+    vez de recorrer objetos Python uno a uno.
+
+    Columnas:
+    fechas (array 'i'): Ordinal de la fecha (date.toordinal()).
+    segundos (array 'i'): Segundos desde medianoche.
+    usuarios (array 'i'): Identificador del usuario en la tabla `nombres`.
+    longitudes (array 'i'): Longitud del texto (en caracteres).
+    offsets (array 'q'): Posición en bytes de cada texto en `texto` (n + 1 entradas).
+    texto (bytes): Textos de todos los mensajes concatenados, en UTF-8.
+    nombres (list[str]): Tabla de usuarios; el identificador es la posición.
+
+    Cada día se representa con un entero, cada usuario con un identificador
+    y los textos se guardan en UTF-8: un str con un solo emoji ocuparía 4
+    bytes por carácter, y los chats están llenos de emojis. Los objetos date,
+    time y los nombres que devuelve el almacén son compartidos.
+
+    Las columnas de un almacén obtenido con filtra_por_fechas pueden ser vistas
+    (memoryview) sobre las del almacén original, sin copiar los datos.
+    """
+
+    def __init__(self, fechas, segundos, usuarios, longitudes, offsets, texto, nombres, ordenado=None):
+        self.fechas = fechas
+        self.segundos = segundos
+        self.usuarios = usuarios
+        self.longitudes = longitudes
+        self.offsets = offsets
+        self.texto = texto
+        self.nombres = nombres
+        self._ordenado = ordenado
+
+    @property
+    def ordenado(self) -> bool:
+        """Indica si las fechas de los mensajes están en orden cronológico."""
+        if self._ordenado is None:
+            self._ordenado = all(map(le, self.fechas, islice(self.fechas, 1, None)))
+        return self._ordenado
+
+    @classmethod
+    def desde_mensajes(cls, mensajes: Iterable[Mensaje]) -> "MensajeStore":
+        """
+        Construye el almacén recorriendo una sola vez los mensajes recibidos
+        (por ejemplo, el iterador de iter_log_whatsapp).
+        """
+        fechas = array('i')
+        segundos = array('i')
+        usuarios = array('i')
+        longitudes = array('i')
+        offsets = array('q', [0])
+        textos = []
+        nombres = []
+        ids = {}
+        posicion = 0
+        for m in mensajes:
+            id_usuario = ids.get(m.usuario)
+            if id_usuario is None:
+                id_usuario = ids[m.usuario] = len(nombres)
+                nombres.append(m.usuario)
+            fechas.append(m.fecha.toordinal())
+            segundos.append(m.hora.hour * 3600 + m.hora.minute * 60 + m.hora.second)
+            usuarios.append(id_usuario)
+            longitudes.append(len(m.texto))
+            texto = m.texto.encode('utf-8')
+            posicion += len(texto)
+            offsets.append(posicion)
+            textos.append(texto)
+        return cls(fechas, segundos, usuarios, longitudes, offsets, b''.join(textos), nombres)
+
+    @classmethod
+    def concatena(cls, almacenes: Iterable["MensajeStore"]) -> "MensajeStore":
+        """
+        Une varios almacenes en uno, en el orden recibido (por ejemplo, los
+        trozos de un fichero leídos en paralelo). Los identificadores de
+        usuario se traducen a una tabla de nombres común.
+        """
+        fechas = array('i')
+        segundos = array('i')
+        usuarios = array('i')
+        longitudes = array('i')
+        offsets = array('q', [0])
+        textos = []
+        nombres = []
+        ids = {}
+        for almacen in almacenes:
+            traduccion = []
+            for nombre in almacen.nombres:
+                if nombre not in ids:
+                    ids[nombre] = len(nombres)
+                    nombres.append(nombre)
+                traduccion.append(ids[nombre])
+            desplazamiento = offsets[-1] - almacen.offsets[0]
+            fechas.extend(almacen.fechas)
+            segundos.extend(almacen.segundos)
+            usuarios.extend(map(traduccion.__getitem__, almacen.usuarios))
+            longitudes.extend(almacen.longitudes)
+            offsets.extend(map(desplazamiento.__add__, almacen.offsets[1:]))
+            textos.append(almacen.texto[almacen.offsets[0]:almacen.offsets[-1]])
+        return cls(fechas, segundos, usuarios, longitudes, offsets, b''.join(textos), nombres)
+
+    def anade(self, mensajes: Iterable[Mensaje], desde: int|None=None) -> None:
+        """
+        Añade mensajes al final del almacén, en el sitio. Si se indica `desde`,
+        antes se descartan los mensajes a partir de esa posición (por ejemplo,
+        el último mensaje leído, que puede haber cambiado al crecer el fichero).
+
+        Los arrays crecen sin copiarse, pero el texto concatenado sí se copia
+        al unirle el nuevo. Falla con BufferError si hay vistas del almacén
+        (de filtra_por_fechas) todavía en uso.
+        """
+        if desde is not None and desde < len(self):
+            for columna in (self.fechas, self.segundos, self.usuarios, self.longitudes):
+                del columna[desde:]
+            del self.offsets[desde + 1:]
+            self.texto = self.texto[:self.offsets[desde]]
+        inicio = len(self)
+
+        ids = {nombre: i for i, nombre in enumerate(self.nombres)}
+        posicion = self.offsets[-1]
+        textos = []
+        for m in mensajes:
+            id_usuario = ids.get(m.usuario)
+            if id_usuario is None:
+                id_usuario = ids[m.usuario] = len(self.nombres)
+                self.nombres.append(m.usuario)
+            self.fechas.append(m.fecha.toordinal())
+            self.segundos.append(m.hora.hour * 3600 + m.hora.minute * 60 + m.hora.second)
+            self.usuarios.append(id_usuario)
+            self.longitudes.append(len(m.texto))
+            texto = m.texto.encode('utf-8')
+            posicion += len(texto)
+            self.offsets.append(posicion)
+            textos.append(texto)
+        self.texto += b''.join(textos)
+
+        if self._ordenado:
+            # Solo hace falta comprobar el tramo nuevo (y su unión con el anterior)
+            tramo = self.fechas[max(inicio - 1, 0):]
+            self._ordenado = all(map(le, tramo, islice(tramo, 1, None)))
+
+    def filas_agregados(self, desde: int = 0) -> Iterator[tuple[int, int, str, int]]:
+        """
+        Devuelve las filas (ordinal de la fecha, hora, usuario, longitud) que
+        espera acumula_agregados, a partir del mensaje `desde`.
+        """
+        return zip(self.fechas[desde:], map((3600).__rfloordiv__, self.segundos[desde:]),
+                   map(self.nombres.__getitem__, self.usuarios[desde:]), self.longitudes[desde:])
+
+    def filas_palabras(self, desde: int = 0) -> Iterator[tuple[int, str, str]]:
+        """
+        Devuelve las filas (ordinal de la fecha, usuario, texto) que espera
+        IndicePalabras, a partir del mensaje `desde`.
+        """
+        return zip(self.fechas[desde:], map(self.nombres.__getitem__, self.usuarios[desde:]), self.textos(desde))
+
+    def __len__(self) -> int:
+        return len(self.fechas)
+
+    def __getitem__(self, i: int|slice) -> "Mensaje|MensajeStore":
+        """
+        Devuelve el mensaje i (como en una lista, admite índices negativos) o,
+        con un corte de paso 1, los mensajes del corte como vista sobre las
+        columnas.
+        """
+        if isinstance(i, slice):
+            a, b, paso = i.indices(len(self))
+            if paso != 1:
+                raise ValueError("MensajeStore solo admite cortes de paso 1")
+            return self._vista(a, max(a, b), ordenado=self._ordenado or None)
+        return self._mensaje(range(len(self))[i])
+
+    def __iter__(self) -> Iterator[Mensaje]:
+        for i in range(len(self)):
+            yield self._mensaje(i)
+
+    def _mensaje(self, i: int) -> Mensaje:
+        """Construye el mensaje i (0 <= i < len(self)) a partir de las columnas."""
+        return Mensaje(_fecha_de_ordinal(self.fechas[i]), _hora_de_segundos(self.segundos[i]),
+                       self.nombres[self.usuarios[i]], self.texto[self.offsets[i]:self.offsets[i + 1]].decode('utf-8'))
+
+    def texto_de(self, i: int) -> str:
+        """Devuelve el texto del mensaje i a partir del buffer de textos."""
+        i = range(len(self))[i]
+        return self.texto[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def textos(self, desde: int = 0) -> Iterator[str]:
+        """Devuelve los textos de los mensajes en orden, a partir del mensaje `desde`."""
+        texto = self.texto
+        offsets = self.offsets
+        for i in range(desde, len(self)):
+            yield texto[offsets[i]:offsets[i + 1]].decode('utf-8')
+
+    def filtra_por_fechas(self, fecha_inicio: date|None=None, fecha_fin: date|None=None) -> "MensajeStore":
+        """
+        Devuelve un almacén con los mensajes comprendidos entre dos fechas
+        (inclusive). Si alguna de las fechas es None, no se aplica ese límite.
+
+        Si los mensajes están en orden cronológico, el rango se localiza con
+        búsqueda binaria sobre la columna de fechas y el resultado es una vista
+        sobre las columnas originales (O(log n), sin copias). Si no lo están,
+        se recorre la columna y se copian los mensajes seleccionados.
+        """
+        ini = fecha_inicio.toordinal() if fecha_inicio is not None else -1
+        fin = fecha_fin.toordinal() if fecha_fin is not None else 1 << 31
+        if self.ordenado:
+            a = bisect_left(self.fechas, ini)
+            b = max(a, bisect_right(self.fechas, fin))
+            return self._vista(a, b)
+        return self._filtra_secuencial(ini, fin)
+
+    def _vista(self, a: int, b: int, ordenado: bool|None = True) -> "MensajeStore":
+        """
+        Devuelve los mensajes a..b-1 como vista sobre las columnas. Con
+        ordenado=None, el orden de la vista se comprueba cuando se pide.
+        """
+        return MensajeStore(memoryview(self.fechas)[a:b],
+                            memoryview(self.segundos)[a:b],
+                            memoryview(self.usuarios)[a:b],
+                            memoryview(self.longitudes)[a:b],
+                            memoryview(self.offsets)[a:b + 1],
+                            self.texto, self.nombres, ordenado=ordenado)
+
+    def _filtra_secuencial(self, ini: int, fin: int) -> "MensajeStore":
+        """Filtra recorriendo la columna de fechas (mensajes desordenados)."""
+        mascara = [ini <= f <= fin for f in self.fechas]
+        texto = self.texto
+        trozos = [texto[a:b] for a, b in compress(zip(self.offsets, islice(self.offsets, 1, None)), mascara)]
+        offsets = array('q', accumulate(map(len, trozos), initial=0))
+        return MensajeStore(array('i', compress(self.fechas, mascara)),
+                            array('i', compress(self.segundos, mascara)),
+                            array('i', compress(self.usuarios, mascara)),
+                            array('i', compress(self.longitudes, mascara)), offsets,
+                            b''.join(trozos), self.nombres, ordenado=False)
+
+    def precalcula_agregados(self) -> AgregadosAcumulados | None:
+        """Equivale a whatsapp_utiles.precalcula_agregados, leyendo las columnas."""
+        return acumula_agregados(self.filas_agregados())
+
+    # --- Análisis (mismos resultados que las funciones de whatsapp_utiles) ---
+
+    def indexa_conversacion(self, hueco: int = HUECO_SESION) -> IndiceConversacion | None:
+        """Equivale a whatsapp_sesiones.indexa_conversacion, a partir de las columnas."""
+        return conversacion_de_columnas(self.fechas, self.segundos, self.usuarios, self.nombres, hueco)
+
+    def calcula_rango_fechas(self) -> tuple[date, date] | None:
+        """Equivale a whatsapp_utiles.calcula_rango_fechas."""
+        if not len(self):
+            return None
+        return (_fecha_de_ordinal(self.fechas[0]), _fecha_de_ordinal(self.fechas[-1]))
+
+    def cuenta_mensajes_por_usuario(self) -> dict[str, int]:
+        """Equivale a whatsapp_utiles.cuenta_mensajes_por_usuario."""
+        return Counter({self.nombres[u]: c for u, c in Counter(self.usuarios).items()})
+
+    def cuenta_mensajes_por_hora(self) -> dict[int, int]:
+        """Equivale a whatsapp_utiles.cuenta_mensajes_por_hora."""
+        return Counter(map((3600).__rfloordiv__, self.segundos))
+
+    def cuenta_mensajes_por_dia_semana(self) -> dict[str, int]:
+        """Equivale a whatsapp_utiles.cuenta_mensajes_por_dia_semana."""
+        # date.fromordinal(o).weekday() == (o - 1) % 7 == (o % 7 + 6) % 7
+        return Counter({DIAS_SEMANA[(r + 6) % 7]: c for r, c in Counter(map((7).__rmod__, self.fechas)).items()})
+
+    def cuenta_caracteres_por_usuario(self) -> dict[str, int]:
+        """Devuelve el número total de caracteres escritos por cada usuario."""
+        mensajes = Counter(self.usuarios)
+        caracteres = [0] * len(self.nombres)
+        for u, longitud in zip(self.usuarios, self.longitudes):
+            caracteres[u] += longitud
+        return {self.nombres[u]: caracteres[u] for u in mensajes}
+
+    def calcula_longitud_media_por_usuario(self) -> dict[str, float]:
+        """Equivale a whatsapp_utiles.calcula_longitud_media_por_usuario."""
+        mensajes = self.cuenta_mensajes_por_usuario()
+        return {u: c / mensajes[u] for u, c in self.cuenta_caracteres_por_usuario().items()}
+
+    def detecta_dia_mas_activo(self) -> tuple[date, int] | None:
+        """Equivale a whatsapp_utiles.detecta_dia_mas_activo."""
+        if not len(self):
+            return None
+        fecha, n = Counter(self.fechas).most_common(1)[0]
+        return (_fecha_de_ordinal(fecha), n)
+
+    def analiza_palabras_caracteristicas(self, usuario: str, n: int = 100, modo: str = "diferencia") -> list[tuple[str, int]]:
+        """Equivale a whatsapp_utiles.analiza_palabras_caracteristicas."""
+        return extrae_palabras_caracteristicas(self.analiza_todo(), usuario, n, modo)
+
+    def analiza_todo(self, palabras: bool = True) -> Estadisticas:
+        """
+        Equivale a whatsapp_utiles.analiza_todo: los recuentos salen de las
+        columnas y los textos solo se recorren (una vez) para contar palabras.
+        """
+        por_usuario = self.cuenta_mensajes_por_usuario()
+        palabras_usuario = palabras_totales = None
+        if palabras:
+            contador = ContadorPalabras()
+            anade = contador.anade
+            for u, texto in zip(self.usuarios, self.textos()):
+                anade(u, texto)
+            palabras_usuario = {self.nombres[u]: c for u, c in contador.conteos().items()}
+            palabras_totales = suma_conteos(palabras_usuario.values())
+        return Estadisticas(len(self), por_usuario, self.calcula_longitud_media_por_usuario(),
+                            self.cuenta_mensajes_por_hora(), self.cuenta_mensajes_por_dia_semana(),
+                            self.detecta_dia_mas_activo(), self.calcula_rango_fechas(),
+                            palabras_usuario, palabras_totales)
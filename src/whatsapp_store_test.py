@@ -0,0 +1,132 @@
+from whatsapp_store import *
+from whatsapp_utiles import *
+from datetime import date, time
+
+MENSAJES = [
+    Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola mundo hola"),
+    Mensaje(date(2024, 1, 2), time(11, 0, 30), "Usuario2", "Hola adios"),
+    Mensaje(date(2024, 1, 2), time(23, 59, 59), "Usuario1", "mundo python"),
+    Mensaje(date(2024, 1, 8), time(0, 0), "Usuario3", "¿qué tal? 😊"),
+]
+
+def test_store_desde_mensajes():
+    print("Probando MensajeStore.desde_mensajes...")
+    store = MensajeStore.desde_mensajes(iter(MENSAJES))
+    assert len(store) == 4
+    assert list(store) == MENSAJES
+    assert store[3] == MENSAJES[3]
+    assert store.nombres == ["Usuario1", "Usuario2", "Usuario3"]
+    assert list(store.usuarios) == [0, 1, 0, 2]
+    assert list(store.textos()) == [m.texto for m in MENSAJES]
+    # Textos en UTF-8: los offsets cuentan bytes y las longitudes, caracteres
+    assert store.texto == "".join(m.texto for m in MENSAJES).encode("utf-8")
+    assert store.longitudes[3] == len("¿qué tal? 😊") and store.offsets[4] - store.offsets[3] == len("¿qué tal? 😊".encode("utf-8"))
+    assert store[0].fecha is store[0].fecha and store[0].usuario is store[2].usuario
+
+def test_store_indices():
+    print("Probando índices negativos y cortes de MensajeStore...")
+    store = MensajeStore.desde_mensajes(MENSAJES)
+    assert store[-1] == MENSAJES[-1] and store[-4] == MENSAJES[0]
+    assert store.texto_de(-2) == MENSAJES[-2].texto
+    for i in (4, -5):
+        try:
+            store[i]
+            assert False, "Debería lanzar IndexError"
+        except IndexError:
+            pass
+    assert list(store[1:3]) == MENSAJES[1:3] and list(store[-2:]) == MENSAJES[-2:]
+    assert list(store[3:1]) == [] and list(store[1:3][1:]) == MENSAJES[2:3]
+    desordenado = MensajeStore.desde_mensajes([MENSAJES[2], MENSAJES[0], MENSAJES[1]])
+    assert not desordenado[:2].ordenado and desordenado[1:].ordenado
+    try:
+        store[::2]
+        assert False, "Debería lanzar ValueError"
+    except ValueError:
+        pass
+
+def test_store_analisis_equivalente():
+    print("Probando los análisis de MensajeStore...")
+    store = MensajeStore.desde_mensajes(MENSAJES)
+    assert store.calcula_rango_fechas() == calcula_rango_fechas(MENSAJES)
+    assert store.cuenta_mensajes_por_usuario() == cuenta_mensajes_por_usuario(MENSAJES)
+    assert store.cuenta_mensajes_por_hora() == cuenta_mensajes_por_hora(MENSAJES)
+    assert list(store.cuenta_mensajes_por_dia_semana().items()) == list(cuenta_mensajes_por_dia_semana(MENSAJES).items())
+    assert store.calcula_longitud_media_por_usuario() == calcula_longitud_media_por_usuario(MENSAJES)
+    caracteres = Counter()
+    for m in MENSAJES:
+        caracteres[m.usuario] += len(m.texto)
+    assert store.cuenta_caracteres_por_usuario() == caracteres
+    assert store.detecta_dia_mas_activo() == detecta_dia_mas_activo(MENSAJES)
+    assert store.analiza_palabras_caracteristicas("Usuario1", 3) == analiza_palabras_caracteristicas(MENSAJES, "Usuario1", 3)
+    assert store.precalcula_agregados() == precalcula_agregados(MENSAJES)
+    assert store.analiza_todo() == analiza_todo(MENSAJES)
+    assert list(store.analiza_todo().palabras) == list(analiza_todo(MENSAJES).palabras)
+    assert store.analiza_todo(palabras=False) == analiza_todo(MENSAJES, palabras=False)
+
+def test_store_vacio():
+    print("Probando MensajeStore vacío...")
+    store = MensajeStore.desde_mensajes([])
+    assert len(store) == 0
+    assert store.calcula_rango_fechas() is None
+    assert store.detecta_dia_mas_activo() is None
+    assert store.cuenta_mensajes_por_usuario() == {}
+
+def test_store_filtra_por_fechas():
+    print("Probando MensajeStore.filtra_por_fechas...")
+    store = MensajeStore.desde_mensajes(MENSAJES)
+    for inicio, fin in [(date(2024, 1, 2), date(2024, 1, 2)), (None, date(2024, 1, 2)), (date(2024, 1, 3), None), (None, None)]:
+        assert list(store.filtra_por_fechas(inicio, fin)) == filtra_mensajes_por_fechas(MENSAJES, inicio, fin)
+
+def test_store_filtra_por_fechas_desordenado():
+    print("Probando MensajeStore.filtra_por_fechas con mensajes desordenados...")
+    desordenados = [MENSAJES[2], MENSAJES[0], MENSAJES[3], MENSAJES[1]]
+    store = MensajeStore.desde_mensajes(desordenados)
+    assert not store.ordenado
+    filtrados = store.filtra_por_fechas(date(2024, 1, 2), date(2024, 1, 8))
+    assert list(filtrados) == filtra_mensajes_por_fechas(desordenados, date(2024, 1, 2), date(2024, 1, 8))
+    assert filtrados.cuenta_mensajes_por_usuario() == {"Usuario1": 1, "Usuario3": 1, "Usuario2": 1}
+
+def test_store_vista_sin_copia():
+    print("Probando que el filtrado de un almacén ordenado no copia columnas...")
+    store = MensajeStore.desde_mensajes(MENSAJES)
+    assert store.ordenado
+    vista = store.filtra_por_fechas(date(2024, 1, 2), date(2024, 1, 2))
+    assert isinstance(vista.fechas, memoryview) and vista.texto is store.texto
+    assert list(vista) == MENSAJES[1:3]
+    assert vista.calcula_longitud_media_por_usuario() == calcula_longitud_media_por_usuario(MENSAJES[1:3])
+    assert list(vista.filtra_por_fechas(date(2024, 1, 2), date(2024, 1, 1))) == []
+    assert len(store.filtra_por_fechas(date(2025, 1, 1))) == 0
+
+def test_store_anade():
+    print("Probando MensajeStore.anade...")
+    store = MensajeStore.desde_mensajes(MENSAJES[:3])
+    cambiado = MENSAJES[2]._replace(texto="mundo python\ny más")
+    store.anade([cambiado, MENSAJES[3]], desde=2)
+    assert list(store) == MENSAJES[:2] + [cambiado, MENSAJES[3]]
+    assert store.nombres == ["Usuario1", "Usuario2", "Usuario3"]
+    assert store.ordenado
+    store.anade([MENSAJES[0]])
+    assert not store.ordenado and len(store) == 5
+    assert store.precalcula_agregados() == precalcula_agregados(list(store))
+    assert list(store.filas_palabras(3)) == [(m.fecha.toordinal(), m.usuario, m.texto) for m in list(store)[3:]]
+
+def test_concatena():
+    print("Probando MensajeStore.concatena...")
+    completo = MensajeStore.desde_mensajes(MENSAJES)
+    partes = [MensajeStore.desde_mensajes(MENSAJES[3:]), completo.filtra_por_fechas(date(2024, 1, 2), date(2024, 1, 2))]
+    unido = MensajeStore.concatena(partes)
+    assert list(unido) == MENSAJES[3:] + MENSAJES[1:3]
+    assert unido.nombres == ["Usuario3", "Usuario1", "Usuario2"]
+    assert len(MensajeStore.concatena([])) == 0
+
+
+test_store_desde_mensajes()
+test_store_indices()
+test_store_analisis_equivalente()
+test_store_vacio()
+test_store_filtra_por_fechas()
+test_store_filtra_por_fechas_desordenado()
+test_store_vista_sin_copia()
+test_store_anade()
+test_concatena()
+print("Todos los tests pasaron correctamente.")
@@ -0,0 +1,150 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Iterable
+from functools import lru_cache
+
+# Palabras vacías que no dicen nada de quien escribe: artículos,
+# preposiciones, pronombres, conjunciones y formas muy frecuentes de los
+# verbos auxiliares, en español y en inglés.
+STOPWORDS_ES = frozenset("""
+    al algo algún alguna algunas alguno algunos ante antes aquel aquella aquellas aquello aquellos aquí así aun aún
+    cada como cómo con contra cual cuál cuales cuando cuándo de del desde donde dónde durante el él ella ellas ello
+    ellos en entre era eran eres es esa esas ese eso esos esta está estaba estado estamos están estar estas este
+    esto estos estoy fue fueron fui ha había han has hasta hay he la las le les lo los me mi mí mis mucho muy nada
+    ni no nos nosotras nosotros nuestra nuestro o os para pero poco por porque qué que quien quién quienes se sea
+    ser si sí sido sin sobre son su sus también tan te tengo tiene tienen tu tú tus un una uno unos unas usted
+    ustedes vosotros vuestra vuestro ya yo xq pq tb tmb
+""".split())
+STOPWORDS_EN = frozenset("""
+    about after all also am an and any are as at be been before being but by can could did do does doing don't for
+    from had has have having he her here hers him his how i'm if in into is isn't it it's its just me more most my
+    no nor not of off on once only or other our ours out over own same she should so some such than that that's
+    the their theirs them then there these they this those through to too under until up very was we were what
+    when where which while who whom why will with would you your yours
+""".split())
+
+# Restos de la exportación de WhatsApp ("<Multimedia omitido>", "<Media omitted>").
+RUIDO = frozenset({"multimedia", "omitido", "omitted"})
+
+STOPWORDS = STOPWORDS_ES | STOPWORDS_EN | RUIDO
+
+# Emojis: pictogramas, símbolos y dingbats; los modificadores de tono de piel
+# y las uniones con ZWJ (familias, profesiones...) forman parte del mismo
+# emoji, y una bandera son dos indicadores regionales seguidos.
+_EMOJI = "\U0001F000-\U0001F1E5\U0001F200-\U0001FAFF\u2300-\u23ff\u2600-\u27bf\u2b00-\u2bff"
+_TONO = "\U0001F3FB-\U0001F3FF"
+_UN_EMOJI = f"[{_EMOJI}][{_TONO}]*"
+
+# Un token es una palabra (al menos dos caracteres, empezando por letra y con
+# apóstrofos interiores como en "don't"), una bandera o un emoji. Los números
+# sueltos y la puntuación no forman tokens.
+PATRON_TOKEN = re.compile(rf"[^\W\d_][^\W_]+(?:'[^\W_]+)*|[\U0001F1E6-\U0001F1FF]{{2}}|{_UN_EMOJI}(?:\u200d{_UN_EMOJI})*")
+
+_PREFIJOS_ENLACE = ("http://", "https://", "www.")
+
+# Textos que se normalizan y trocean de una vez
+TAM_LOTE = 256
+
+def normaliza(texto: str) -> str:
+    """
+    Normaliza un texto antes de trocearlo: forma NFKC (la misma letra
+    acentuada se escribe igual venga como venga, y las letras de ancho
+    completo o las ligaduras pasan a su forma simple) y minúsculas.
+    """
+    return unicodedata.normalize("NFKC", texto).lower()
+
+@lru_cache(maxsize=1 << 16)
+def tokens_de(crudo: str) -> tuple[str, ...]:
+    """
+    Tokens limpios de un trozo ya normalizado y sin espacios (uno de los
+    elementos de normaliza(texto).split()): separa la puntuación y los emojis
+    pegados a las palabras y descarta enlaces, números y palabras vacías.
+    """
+    if crudo.startswith(_PREFIJOS_ENLACE):
+        return ()
+    crudo = crudo.replace("\u2019", "'").replace("\ufe0f", "")
+    return tuple(t for t in PATRON_TOKEN.findall(crudo) if t not in STOPWORDS)
+
+def tokeniza(texto: str) -> list[str]:
+    """
+    Devuelve los tokens de un texto en orden: palabras normalizadas y emojis
+    (cada emoji es un token aparte), sin puntuación, números, enlaces ni
+    palabras vacías (STOPWORDS).
+
+    Parámetros:
+    texto (str): Texto de un mensaje.
+
+    Devuelve:
+    list[str]: Tokens del texto.
+    """
+    return [t for crudo in normaliza(texto).split() for t in tokens_de(crudo)]
+
+def limpia_conteo(crudos: Counter) -> Counter:
+    """
+    Convierte un recuento de trozos separados por espacios (como los que
+    acumula ContadorPalabras) en un recuento de tokens. Cada trozo distinto
+    se limpia una sola vez, así que el coste depende del vocabulario y no del
+    número de mensajes.
+    """
+    limpio = Counter()
+    for crudo, n in crudos.items():
+        for token in tokens_de(crudo):
+            limpio[token] += n
+    return limpio
+
+class ContadorPalabras:
+    """
+    Cuenta los tokens de textos que llegan de uno en uno, agrupados por una
+    clave (normalmente el usuario). Los textos de cada clave se guardan hasta
+    reunir TAM_LOTE y entonces se normalizan, se trocean por espacios y se
+    cuentan todos juntos; la limpieza con PATRON_TOKEN se hace al final, una
+    vez por trozo distinto. Así se llama a Python una vez por lote y no por
+    palabra, y resulta más rápido que hacer texto.lower().split() mensaje a
+    mensaje.
+    """
+
+    def __init__(self, tam_lote: int = TAM_LOTE):
+        self.tam_lote = tam_lote
+        self._crudos = defaultdict(Counter)
+        self._pendientes = defaultdict(list)
+
+    def anade(self, clave: Hashable, texto: str) -> None:
+        """Añade el texto de un mensaje a los recuentos de una clave."""
+        pendientes = self._pendientes[clave]
+        pendientes.append(texto)
+        if len(pendientes) >= self.tam_lote:
+            self._crudos[clave].update(normaliza(" ".join(pendientes)).split())
+            pendientes.clear()
+
+    def vacia(self) -> dict[Hashable, Counter]:
+        """
+        Devuelve los recuentos de trozos sin limpiar de cada clave (ver
+        limpia_conteo) y deja el contador vacío. Las claves salen en el orden
+        en que se añadió su primer texto.
+        """
+        for clave, pendientes in self._pendientes.items():
+            if pendientes:
+                self._crudos[clave].update(normaliza(" ".join(pendientes)).split())
+        crudos = {clave: self._crudos[clave] for clave in self._pendientes}
+        self._crudos.clear()
+        self._pendientes.clear()
+        return crudos
+
+    def conteos(self) -> dict[Hashable, Counter]:
+        """Devuelve el recuento de tokens de cada clave y deja el contador vacío."""
+        return {clave: limpia_conteo(crudos) for clave, crudos in self.vacia().items()}
+
+def cuenta_tokens(textos: Iterable[str]) -> Counter:
+    """Cuenta los tokens de unos textos (ver tokeniza), procesándolos por lotes."""
+    contador = ContadorPalabras()
+    for texto in textos:
+        contador.anade(None, texto)
+    return contador.conteos().get(None, Counter())
+
+def suma_conteos(conteos: Iterable[Counter]) -> Counter:
+    """Suma varios recuentos (p. ej. los de cada usuario) en uno solo."""
+    total = Counter()
+    for conteo in conteos:
+        total.update(conteo)
+    return total
@@ -0,0 +1,53 @@
+import unicodedata
+from collections import Counter
+from whatsapp_tokens import *
+
+def test_tokeniza():
+    print("Probando tokeniza...")
+    assert tokeniza("¡¡Hola, MUNDO!! ¿Qué tal?") == ["hola", "mundo", "tal"]
+    # Los emojis son tokens aparte, aunque vayan pegados a una palabra
+    assert tokeniza("jaja😂😂 genial👍") == ["jaja", "😂", "😂", "genial", "👍"]
+    # Tono de piel, banderas y secuencias con ZWJ son un solo emoji
+    assert tokeniza("👍🏽 🇪🇸 👨\u200d👩\u200d👧") == ["👍🏽", "🇪🇸", "👨\u200d👩\u200d👧"]
+    assert tokeniza("❤\ufe0f ❤") == ["❤", "❤"]
+    # Números, enlaces, restos de la exportación y palabras vacías fuera
+    assert tokeniza("Quedamos a las 10:30 el 2025 https://example.com/x") == ["quedamos"]
+    assert tokeniza("<Multimedia omitido>") == []
+    assert tokeniza("I don’t know the answer") == ["know", "answer"]
+    assert tokeniza("fp1 C3PO") == ["fp1", "c3po"]
+    # La misma palabra se cuenta igual escrita con acento compuesto o separado
+    assert tokeniza(unicodedata.normalize("NFD", "canción")) == tokeniza("canción") == ["canción"]
+    assert tokeniza("Ｐｙｔｈｏｎ") == ["python"]
+    assert tokeniza("") == []
+
+def test_contador_palabras():
+    print("Probando ContadorPalabras...")
+    textos = [("Laura", "Hola mundo!"), ("Dani", "hola, HOLA 😊"), ("Laura", "mundo mundo de python")]
+    for tam_lote in (1, 2, 256):
+        contador = ContadorPalabras(tam_lote)
+        for usuario, texto in textos:
+            contador.anade(usuario, texto)
+        conteos = contador.conteos()
+        assert conteos == {"Laura": Counter({"mundo": 3, "hola": 1, "python": 1}),
+                           "Dani": Counter({"hola": 2, "😊": 1})}
+        assert contador.conteos() == {}
+    # Las claves salen por orden de su primer texto, aunque otra llene antes un lote
+    contador = ContadorPalabras(2)
+    for usuario, texto in [("Laura", "hola"), ("Dani", "adiós"), ("Dani", "hola")]:
+        contador.anade(usuario, texto)
+    assert list(contador.conteos()) == ["Laura", "Dani"]
+    assert suma_conteos(conteos.values()) == Counter({"hola": 3, "mundo": 3, "python": 1, "😊": 1})
+
+def test_cuenta_tokens():
+    print("Probando cuenta_tokens...")
+    textos = ["Hola mundo hola", "¡Hola! adiós 👋", "el mundo y la python"] * 100
+    esperado = Counter(t for texto in textos for t in tokeniza(texto))
+    assert cuenta_tokens(textos) == esperado
+    assert esperado == {"hola": 300, "mundo": 200, "adiós": 100, "👋": 100, "python": 100}
+    assert cuenta_tokens([]) == Counter()
+
+
+test_tokeniza()
+test_contador_palabras()
+test_cuenta_tokens()
+print("Todos los tests pasaron correctamente.")
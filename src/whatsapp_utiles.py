@@ -1,166 +1,643 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import namedtuple, Counter, defaultdict
+from collections.abc import Hashable, Iterable, Iterator, Sequence
 from datetime import *
+from heapq import nsmallest
+from itertools import accumulate, pairwise
+from math import log, sqrt
+from operator import itemgetter
+from whatsapp_tokens import ContadorPalabras, suma_conteos
 
 # Nombres de los días de la semana
 DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
 
 Mensaje = namedtuple('Mensaje', ['fecha', 'hora', 'usuario', 'texto'])
 
-def calcula_rango_fechas(mensajes: list[Mensaje])-> tuple[date, date] | None:
+# Índice de fechas de una lista de mensajes ordenada: `dias` son los ordinales
+# de los días distintos (ordenados) e `inicios[k]` es la posición del primer
+# mensaje del día dias[k] (con una entrada final igual a len(mensajes)).
+IndiceFechas = namedtuple('IndiceFechas', ['dias', 'inicios'])
+
+# Resumen de los mensajes de un rango de fechas: número total de mensajes y el
+# resultado de cada una de las funciones de análisis del módulo. Los recuentos
+# de palabras (por usuario y totales) solo se calculan en analiza_todo.
+Estadisticas = namedtuple('Estadisticas', ['total', 'por_usuario', 'longitud_media', 'por_hora',
+                                           'por_dia_semana', 'dia_mas_activo', 'rango_fechas',
+                                           'palabras_usuario', 'palabras'],
+                          defaults=(None, None, None))
+
+# Sumas acumuladas por día calendario, desde `dia_inicial` (ordinal) en
+# adelante. Cada array tiene n_dias + 1 entradas y la posición k guarda el
+# total de los k primeros días, de modo que el total de los días [i, j) es
+# acumulado[j] - acumulado[i]. `maximos` es una tabla dispersa con el día de
+# más mensajes de cada intervalo [i, i + 2**nivel).
+AgregadosAcumulados = namedtuple('AgregadosAcumulados', ['dia_inicial', 'n_dias', 'usuarios', 'mensajes',
+                                                         'mensajes_usuario', 'caracteres_usuario', 'horas',
+                                                         'dias_semana', 'conteos_dia', 'maximos'])
+
+# Formas de puntuar las palabras características: "diferencia" (apariciones
+# propias menos las de los demás), "tfidf" (frecuencia relativa en los
+# mensajes del usuario por la rareza de la palabra entre usuarios) y
+# "log_odds" (log-odds con prior de Dirichlet informativo, en puntuación z).
+MODOS_PALABRAS = ["diferencia", "tfidf", "log_odds"]
+
+# Peso del prior de log_odds: cada palabra parte de PESO_PRIOR veces sus
+# apariciones en todo el chat, lo que evita que las palabras raras (dichas
+# una o dos veces) encabecen la lista.
+PESO_PRIOR = 1.0
+
+# Escalas de series_temporales
+ESCALAS = ["dia", "semana", "mes"]
+
+# Número de mensajes por periodo (día, semana o mes, según `escala`): inicios[k]
+# es el primer día del periodo k dentro del rango pedido, `total` el número de
+# mensajes de cada periodo y `por_usuario` lo mismo para cada usuario.
+SerieTemporal = namedtuple('SerieTemporal', ['escala', 'inicios', 'total', 'por_usuario'])
+
+def calcula_rango_fechas(mensajes: Iterable[Mensaje])-> tuple[date, date] | None:
     """
     Devuelve el rango de fechas de los mensajes recibidos.
 
     Parametros:
-    mensajes (list[Mensaje]): Lista de mensajes (ordenados cronológicamente).
+    mensajes (Iterable[Mensaje]): Mensajes (ordenados cronológicamente). Se recorren una sola vez.
 
     Devuelve:
-    tuple[date, date] | None: Tupla con la fecha del primer y último mensaje, o None si la lista está vacía.
+    tuple[date, date] | None: Tupla con la fecha del primer y último mensaje, o None si no hay mensajes.
     """
-    res = []
-    if len(mensajes) == 0 :
+    primero = ultimo = None
+    for m in mensajes:
+        if primero is None:
+            primero = m
+        ultimo = m
+    if primero is None:
         return None
-    res.append(mensajes[0][0])
-    mensajes.reverse()
-    res.append(mensajes[0][0])
-    return (res[0],res[1])
+    return (primero.fecha, ultimo.fecha)
 
-def filtra_mensajes_por_fechas(mensajes: list[Mensaje], fecha_inicio: date|None=None, fecha_fin: date|None=None) -> list[Mensaje]:
+def filtra_mensajes_por_fechas(mensajes: Iterable[Mensaje], fecha_inicio: date|None=None, fecha_fin: date|None=None,
+                               indice: IndiceFechas|None=None) -> list[Mensaje]:
     """
     Filtra los mensajes comprendidos entre dos fechas (inclusive). Si
     alguna de las fechas es None, no se aplica ese límite.
 
+    Si se pasa el índice de fechas de la lista (ver indexa_fechas), el rango
+    se localiza con búsqueda binaria y se devuelve un trozo de la lista, sin
+    recorrer los mensajes.
+
     Parámetros:
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes a filtrar (una lista si se usa índice).
     fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
     fecha_fin (date|None): Fecha de fin (inclusive) o None.
+    indice (IndiceFechas|None): Índice de fechas de `mensajes` o None.
 
     Devuelve:
     list[Mensaje]: Lista de mensajes filtrados.
     """
-    res =  []
-    for i in mensajes:
-        if ((fecha_inicio!= None) and (fecha_fin != None)):
-            if (fecha_inicio <= i[0] <= fecha_fin):
-                res.append(i)
-        elif (fecha_fin == None) and (fecha_inicio != None):
-            if (fecha_inicio <= i[0]):
-                res.append(i)
-        elif (fecha_inicio == None) and (fecha_fin != None): 
-            if(i[0] <= fecha_fin):
-                res.append(i)
-        else:
-            res.append(i)
-    return res
-
-def cuenta_mensajes_por_usuario(mensajes: list[Mensaje]) -> dict[str, int]:
+    if indice is not None:
+        inicio, fin = busca_rango_fechas(indice, fecha_inicio, fecha_fin)
+        return mensajes[inicio:fin]
+    return list(itera_mensajes_por_fechas(mensajes, fecha_inicio, fecha_fin))
+
+def itera_mensajes_por_fechas(mensajes: Iterable[Mensaje], fecha_inicio: date|None=None, fecha_fin: date|None=None) -> Iterator[Mensaje]:
+    """
+    Versión perezosa de filtra_mensajes_por_fechas: va devolviendo los mensajes
+    del intervalo sin construir una lista, para encadenarla con el resto de
+    funciones en una sola pasada.
+
+    Parámetros:
+    mensajes (Iterable[Mensaje]): Mensajes a filtrar.
+    fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
+    fecha_fin (date|None): Fecha de fin (inclusive) o None.
+
+    Devuelve:
+    Iterator[Mensaje]: Mensajes comprendidos en el intervalo.
+    """
+    # Los límites se resuelven una vez, fuera del bucle
+    if fecha_inicio is None:
+        fecha_inicio = date.min
+    if fecha_fin is None:
+        fecha_fin = date.max
+    for m in mensajes:
+        if fecha_inicio <= m.fecha <= fecha_fin:
+            yield m
+
+def indexa_fechas(mensajes: Sequence[Mensaje]) -> IndiceFechas|None:
+    """
+    Construye el índice de fechas de una lista de mensajes, que permite filtrar
+    por rango de fechas con búsqueda binaria.
+
+    Parámetros:
+    mensajes (Sequence[Mensaje]): Lista de mensajes.
+
+    Devuelve:
+    IndiceFechas|None: Índice de fechas, o None si los mensajes no están en
+    orden cronológico (en ese caso hay que filtrar recorriendo la lista).
+    """
+    dias = []
+    inicios = []
+    for i, m in enumerate(mensajes):
+        dia = m.fecha.toordinal()
+        if not dias or dia != dias[-1]:
+            if dias and dia < dias[-1]:
+                return None
+            dias.append(dia)
+            inicios.append(i)
+    inicios.append(len(mensajes))
+    return IndiceFechas(dias, inicios)
+
+def busca_rango_fechas(indice: IndiceFechas, fecha_inicio: date|None=None, fecha_fin: date|None=None) -> tuple[int, int]:
+    """
+    Devuelve las posiciones (inicio, fin) de los mensajes comprendidos entre dos
+    fechas (inclusive) usando búsqueda binaria sobre el índice de fechas.
+
+    Parámetros:
+    indice (IndiceFechas): Índice de fechas de la lista de mensajes.
+    fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
+    fecha_fin (date|None): Fecha de fin (inclusive) o None.
+
+    Devuelve:
+    tuple[int, int]: Posición del primer mensaje del rango y posición siguiente al último.
+    """
+    a = 0 if fecha_inicio is None else bisect_left(indice.dias, fecha_inicio.toordinal())
+    b = len(indice.dias) if fecha_fin is None else bisect_right(indice.dias, fecha_fin.toordinal())
+    if a >= b:
+        return (indice.inicios[a], indice.inicios[a])
+    return (indice.inicios[a], indice.inicios[b])
+
+def cuenta_mensajes_por_usuario(mensajes: Iterable[Mensaje]) -> dict[str, int]:
     """
     Devuelve un diccionario con el número de mensajes por usuario.
 
     Parámetros:
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
 
     Devuelve:
     dict[str, int]: Diccionario con el conteo de mensajes por usuario.
     """
-    return Counter(m.usuario for m in mensajes)
+    return analiza_todo(mensajes, palabras=False).por_usuario
 
-def cuenta_mensajes_por_hora(mensajes: list[Mensaje]) -> dict[int, int]:
+def cuenta_mensajes_por_hora(mensajes: Iterable[Mensaje]) -> dict[int, int]:
     """
     Devuelve un diccionario con el número de mensajes por hora del día (0-23).
 
     Parámetros:
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
 
     Devuelve:
     dict[int, int]: Diccionario con el conteo de mensajes por hora.
-    """    
-    mensajes_por_hora = Counter([i.hora.hour for i in mensajes])
-    return mensajes_por_hora
-
-
+    """
+    return analiza_todo(mensajes, palabras=False).por_hora
 
-    
-def cuenta_mensajes_por_dia_semana(mensajes: list[Mensaje]) -> dict[str, int]:
+def cuenta_mensajes_por_dia_semana(mensajes: Iterable[Mensaje]) -> dict[str, int]:
     """
     Devuelve un diccionario con el número de mensajes por día de la semana.
     Las claves deben ser los nombres de los días: Lunes, Martes...
 
     Parámetros:
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
 
     Devuelve:
     dict[str, int]: Diccionario con el conteo de mensajes por día de la semana.
     """
-    return Counter([DIAS_SEMANA[i.fecha.weekday()] for i in mensajes])
+    return analiza_todo(mensajes, palabras=False).por_dia_semana
 
-def calcula_longitud_media_por_usuario(mensajes: list[Mensaje]) -> dict[str, float]:
+def calcula_longitud_media_por_usuario(mensajes: Iterable[Mensaje]) -> dict[str, float]:
     """
     Devuelve un diccionario con la longitud media de los mensajes por usuario.
 
     Parámetros: 
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
 
     Devuelve:
     dict[str, float]: Diccionario con la longitud media de los mensajes por usuario.
     """
-    mensajes_por_usuario = cuenta_mensajes_por_usuario(mensajes)
-    mensajes_recuento = defaultdict(int)
-    for i in mensajes:
-        mensajes_recuento[i.usuario] += len(i.texto)
-    for i in mensajes_recuento:
-        mensajes_recuento[i] = mensajes_recuento[i]/mensajes_por_usuario[i]
-    return mensajes_recuento
+    return analiza_todo(mensajes, palabras=False).longitud_media
 
 
-def detecta_dia_mas_activo(mensajes: list[Mensaje]) -> tuple[date, int]|None:
+def detecta_dia_mas_activo(mensajes: Iterable[Mensaje]) -> tuple[date, int]|None:
     """Devuelve una tupla (fecha, numero_mensajes) del día con más actividad.
 
     Parámetros:
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
 
     Devuelve:
     tuple[date, int]|None: Tupla con la fecha y el número de mensajes, o None si no hay mensajes.
     """
-    if len(mensajes) == 0:
-        return None
-    m = Counter(m.fecha for m in mensajes)
-    m = m.most_common(1)
-    return (m[0][0],m[0][1])
+    return analiza_todo(mensajes, palabras=False).dia_mas_activo
 
 
 
-def analiza_palabras_caracteristicas(mensajes: list[Mensaje], usuario: str, n: int = 100) -> list[tuple[str, int]]:
+def analiza_palabras_caracteristicas(mensajes: Iterable[Mensaje], usuario: str, n: int = 100,
+                                     modo: str = "diferencia") -> list[tuple[str, int]]:
     """
     Devuelve un diccionario con las n palabras más características de un usuario y sus recuentos. 
     Los recuentos se calculan sumando las apariciones de las palabras en mensajes del usuario y restando las 
     apariciones de esas palabras en mensajes de otros usuarios.
 
     Parámetros:
-    mensajes (list[Mensaje]): Lista de mensajes.
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
     usuario (str): Nombre del usuario a analizar.
     n (int): Número de palabras más frecuentes a devolver.
+    modo (str): Uno de MODOS_PALABRAS; con "tfidf" o "log_odds" se
+        devuelve la puntuación de puntua_palabras en lugar del recuento.
 
     Devuelve:
     list[tuple[str, int]]: Lista con las n palabras más frecuentes y su conteo.
     """
-    frecuencia_distintiva = Counter()
-    for i in mensajes:
-        palabras = i.texto
-        palabras = palabras.lower()
-        palabras_normalizadas = palabras.split()
-        if i.usuario == usuario:
-
-            frecuencia_distintiva.update(palabras_normalizadas)
-        else:
-            frecuencia_distintiva.subtract(palabras_normalizadas)
-    return frecuencia_distintiva.most_common(n)
-
-
-mensajes = [
-        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola mundo hola"),
-        Mensaje(date(2024, 1, 2), time(11, 0), "Usuario2", "Hola adios"),
-        Mensaje(date(2024, 1, 3), time(12, 0), "Usuario1", "mundo python"),
-    ]
-palabras = analiza_palabras_caracteristicas(mensajes, "Usuario1", n=3)    
-palabras_dict = dict(palabras)
-print(palabras_dict)
\ No newline at end of file
+    return extrae_palabras_caracteristicas(analiza_todo(mensajes), usuario, n, modo)
+
+def analiza_todo(mensajes: Iterable[Mensaje], palabras: bool = True) -> Estadisticas:
+    """
+    Calcula en una sola pasada todas las estadísticas del módulo: mensajes por
+    usuario, longitud media, mensajes por hora y por día de la semana, día más
+    activo, rango de fechas y, opcionalmente, los recuentos de palabras que usa
+    extrae_palabras_caracteristicas. Las palabras son los tokens de
+    whatsapp_tokens.tokeniza (normalizadas, con los emojis aparte y sin
+    puntuación ni palabras vacías) y se cuentan por lotes de textos.
+
+    Parámetros:
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
+    palabras (bool): Si es False, no se cuentan las palabras (más rápido).
+
+    Devuelve:
+    Estadisticas: Todas las estadísticas de los mensajes.
+    """
+    por_usuario = Counter()
+    caracteres = Counter()
+    por_hora = Counter()
+    por_fecha = Counter()
+    contador_palabras = ContadorPalabras()
+    primera = ultima = None
+    for m in mensajes:
+        por_usuario[m.usuario] += 1
+        caracteres[m.usuario] += len(m.texto)
+        por_hora[m.hora.hour] += 1
+        por_fecha[m.fecha] += 1
+        if primera is None:
+            primera = m.fecha
+        ultima = m.fecha
+        if palabras:
+            contador_palabras.anade(m.usuario, m.texto)
+
+    por_dia_semana = Counter()
+    for fecha, n in por_fecha.items():
+        por_dia_semana[DIAS_SEMANA[fecha.weekday()]] += n
+    longitud_media = {u: caracteres[u] / n for u, n in por_usuario.items()}
+    dia_mas_activo = por_fecha.most_common(1)[0] if por_fecha else None
+    rango_fechas = (primera, ultima) if primera is not None else None
+    palabras_usuario = palabras_totales = None
+    if palabras:
+        palabras_usuario = contador_palabras.conteos()
+        palabras_totales = suma_conteos(palabras_usuario.values())
+
+    return Estadisticas(por_usuario.total(), por_usuario, longitud_media, por_hora, por_dia_semana,
+                        dia_mas_activo, rango_fechas, palabras_usuario, palabras_totales)
+
+def extrae_palabras_caracteristicas(estadisticas: Estadisticas, usuario: str, n: int = 100,
+                                    modo: str = "diferencia") -> list[tuple[str, int]]:
+    """
+    Devuelve las n palabras más características de un usuario a partir de los
+    recuentos de palabras de analiza_todo, sin volver a recorrer los mensajes.
+    El recuento de cada palabra es el número de apariciones del usuario menos
+    el de los demás, es decir, 2 * propias - totales. Se ordenan con
+    mejores_palabras.
+
+    Parámetros:
+    estadisticas (Estadisticas): Resultado de analiza_todo (con palabras).
+    usuario (str): Nombre del usuario a analizar.
+    n (int): Número de palabras más frecuentes a devolver.
+    modo (str): Uno de MODOS_PALABRAS (ver puntua_palabras).
+
+    Devuelve:
+    list[tuple[str, int]]: Lista con las n palabras más características y su recuento.
+    """
+    if modo != "diferencia":
+        return puntua_palabras(estadisticas.palabras_usuario, modo).get(usuario, [])[:n]
+    propias = estadisticas.palabras_usuario.get(usuario, Counter())
+    return mejores_palabras(((p, 2 * propias[p] - c) for p, c in estadisticas.palabras.items()), n)
+
+def mejores_palabras(puntuaciones: Iterable[tuple[Hashable, float]], n: int|None = None) -> list[tuple[Hashable, float]]:
+    """
+    Ordena pares (palabra, puntuación) de mayor a menor puntuación y devuelve
+    los n primeros (todos si n es None). Las palabras empatadas van en orden
+    alfabético, así que el resultado no depende del orden en que se contaron:
+    analiza_todo, MensajeStore e IndicePalabras dan las mismas palabras para
+    el mismo chat. Con n, solo se ordenan las n mejores con un montículo.
+    """
+    clave = lambda par: (-par[1], par[0])
+    if n is None:
+        return sorted(puntuaciones, key=clave)
+    return nsmallest(n, puntuaciones, key=clave)
+
+def puntua_palabras(conteos: dict[str, Counter], modo: str = "log_odds") -> dict[str, list[tuple[Hashable, float]]]:
+    """
+    Puntúa a la vez las palabras de todos los usuarios a partir de la matriz
+    dispersa usuario x palabra (un Counter por usuario, con solo las palabras
+    que ha usado) y devuelve, para cada usuario, sus palabras características
+    (puntuación positiva) ordenadas con mejores_palabras. Los totales por palabra
+    se calculan una sola vez y después se recorre una vez cada fila, así que
+    el coste es proporcional al número de celdas no nulas.
+
+    - "tfidf": frecuencia relativa de la palabra en los mensajes del usuario
+      por log((1 + usuarios) / (1 + usuarios que la usan)) + 1.
+    - "log_odds": log-odds del usuario frente al resto con un prior de
+      Dirichlet informativo (PESO_PRIOR veces las apariciones de la palabra
+      en todo el chat), dividido por su desviación típica (puntuación z).
+      Así, que alguien escriba mucho no basta para que sus palabras comunes
+      encabecen la lista.
+
+    Parámetros:
+    conteos (dict[str, Counter]): Apariciones de cada palabra por usuario.
+    modo (str): "tfidf" o "log_odds".
+
+    Devuelve:
+    dict[str, list[tuple[Hashable, float]]]: Palabras y puntuaciones de cada usuario.
+    """
+    if modo not in ("tfidf", "log_odds"):
+        raise ValueError(f"Modo desconocido: {modo}")
+    filas = {u: [(p, c) for p, c in conteo.items() if c > 0] for u, conteo in conteos.items()}
+    totales = Counter()
+    usuarios_palabra = Counter()
+    for fila in filas.values():
+        for p, c in fila:
+            totales[p] += c
+        usuarios_palabra.update(map(itemgetter(0), fila))
+    n_total = totales.total()
+
+    puntuaciones = {}
+    if modo == "tfidf":
+        idf = {p: log((1 + len(filas)) / (1 + k)) + 1 for p, k in usuarios_palabra.items()}
+        for u, fila in filas.items():
+            n_usuario = sum(map(itemgetter(1), fila))
+            puntuaciones[u] = [(p, c / n_usuario * idf[p]) for p, c in fila]
+    elif len(totales) > 1:
+        prior_total = PESO_PRIOR * n_total
+        for u, fila in filas.items():
+            n_usuario = sum(map(itemgetter(1), fila))
+            n_resto = n_total - n_usuario
+            puntos = []
+            for p, c in fila:
+                prior = PESO_PRIOR * totales[p]
+                resto = totales[p] - c
+                delta = (log((c + prior) / (n_usuario + prior_total - c - prior))
+                         - log((resto + prior) / (n_resto + prior_total - resto - prior)))
+                puntos.append((p, delta / sqrt(1 / (c + prior) + 1 / (resto + prior))))
+            puntuaciones[u] = puntos
+    return {u: mejores_palabras(pp for pp in puntos if pp[1] > 0) for u, puntos in puntuaciones.items()}
+
+def precalcula_agregados(mensajes: Iterable[Mensaje]) -> AgregadosAcumulados|None:
+    """
+    Recorre una vez los mensajes y precalcula las sumas acumuladas por día que
+    permiten obtener las estadísticas de cualquier rango de fechas con
+    consulta_agregados sin volver a recorrer los mensajes.
+
+    Parámetros:
+    mensajes (Iterable[Mensaje]): Mensajes (se recorren una sola vez).
+
+    Devuelve:
+    AgregadosAcumulados|None: Agregados precalculados, o None si no hay mensajes.
+    """
+    return acumula_agregados((m.fecha.toordinal(), m.hora.hour, m.usuario, len(m.texto)) for m in mensajes)
+
+def acumula_agregados(filas: Iterable[tuple[int, int, str, int]]) -> AgregadosAcumulados|None:
+    """
+    Igual que precalcula_agregados, pero a partir de filas (ordinal de la fecha,
+    hora, usuario, longitud del texto), para quien ya tiene los mensajes en
+    columnas.
+
+    Parámetros:
+    filas (Iterable[tuple[int, int, str, int]]): Una fila por mensaje.
+
+    Devuelve:
+    AgregadosAcumulados|None: Agregados precalculados, o None si no hay filas.
+    """
+    conteos = (Counter(), defaultdict(Counter), defaultdict(Counter), [Counter() for _ in range(24)])
+    _cuenta_filas(conteos, filas, 1)
+    return _construye_agregados(*conteos)
+
+def actualiza_agregados(agregados: AgregadosAcumulados|None, nuevas: Iterable[tuple[int, int, str, int]],
+                        retiradas: Iterable[tuple[int, int, str, int]] = ()) -> AgregadosAcumulados|None:
+    """
+    Devuelve los agregados que resultan de añadir unas filas (con el formato
+    de acumula_agregados) a unos agregados ya calculados y, opcionalmente,
+    quitar otras que estaban incluidas. Sirve para incorporar los mensajes
+    nuevos de un chat sin volver a recorrer los antiguos: el coste depende del
+    número de filas nuevas y del número de días, no del de mensajes.
+
+    Parámetros:
+    agregados (AgregadosAcumulados|None): Agregados previos (None si no había mensajes).
+    nuevas (Iterable[tuple[int, int, str, int]]): Filas que se añaden.
+    retiradas (Iterable[tuple[int, int, str, int]]): Filas que se quitan.
+
+    Devuelve:
+    AgregadosAcumulados|None: Agregados actualizados, o None si no quedan mensajes.
+    """
+    conteos = _conteos_diarios(agregados)
+    _cuenta_filas(conteos, retiradas, -1)
+    _cuenta_filas(conteos, nuevas, 1)
+    return _construye_agregados(*conteos)
+
+def _cuenta_filas(conteos, filas, signo):
+    """Suma (o resta, con signo -1) las filas a los conteos por día."""
+    mensajes_dia, mensajes_usuario_dia, caracteres_usuario_dia, horas_dia = conteos
+    for dia, hora, usuario, longitud in filas:
+        mensajes_dia[dia] += signo
+        mensajes_usuario_dia[usuario][dia] += signo
+        caracteres_usuario_dia[usuario][dia] += signo * longitud
+        horas_dia[hora][dia] += signo
+
+def _conteos_diarios(agregados):
+    """Recupera los conteos por día a partir de las sumas acumuladas."""
+    conteos = (Counter(), defaultdict(Counter), defaultdict(Counter), [Counter() for _ in range(24)])
+    if agregados is None:
+        return conteos
+    dias = range(agregados.dia_inicial, agregados.dia_inicial + agregados.n_dias)
+
+    def diarios(acumulado, conteo):
+        for k, d in enumerate(dias):
+            if acumulado[k + 1] != acumulado[k]:
+                conteo[d] = acumulado[k + 1] - acumulado[k]
+
+    mensajes_dia, mensajes_usuario_dia, caracteres_usuario_dia, horas_dia = conteos
+    diarios(agregados.mensajes, mensajes_dia)
+    for usuario, mensajes, caracteres in zip(agregados.usuarios, agregados.mensajes_usuario, agregados.caracteres_usuario):
+        diarios(mensajes, mensajes_usuario_dia[usuario])
+        diarios(caracteres, caracteres_usuario_dia[usuario])
+    for acumulado, conteo in zip(agregados.horas, horas_dia):
+        diarios(acumulado, conteo)
+    return conteos
+
+def _construye_agregados(mensajes_dia, mensajes_usuario_dia, caracteres_usuario_dia, horas_dia):
+    """Calcula las sumas acumuladas y la tabla de máximos a partir de los conteos por día."""
+    dias_con_mensajes = [d for d, c in mensajes_dia.items() if c > 0]
+    if not dias_con_mensajes:
+        return None
+
+    dia_inicial = min(dias_con_mensajes)
+    n_dias = max(dias_con_mensajes) - dia_inicial + 1
+    dias = range(dia_inicial, dia_inicial + n_dias)
+
+    def acumulado(conteo):
+        return array('q', accumulate((conteo[d] for d in dias), initial=0))
+
+    conteos_dia = array('q', (mensajes_dia[d] for d in dias))
+    semana = [Counter() for _ in range(7)]
+    for d in dias:
+        semana[(d - 1) % 7][d] = mensajes_dia[d]
+
+    # Tabla dispersa para el día más activo: en caso de empate gana el más antiguo
+    maximos = [array('i', range(n_dias))]
+    ancho = 1
+    while 2 * ancho <= n_dias:
+        anterior = maximos[-1]
+        nivel = array('i')
+        for i in range(n_dias - 2 * ancho + 1):
+            a = anterior[i]
+            b = anterior[i + ancho]
+            nivel.append(b if conteos_dia[b] > conteos_dia[a] else a)
+        maximos.append(nivel)
+        ancho *= 2
+
+    usuarios = [u for u, conteo in mensajes_usuario_dia.items() if any(conteo.values())]
+    return AgregadosAcumulados(dia_inicial, n_dias, usuarios,
+                               acumulado(mensajes_dia),
+                               [acumulado(mensajes_usuario_dia[u]) for u in usuarios],
+                               [acumulado(caracteres_usuario_dia[u]) for u in usuarios],
+                               [acumulado(c) for c in horas_dia],
+                               [acumulado(c) for c in semana],
+                               conteos_dia, maximos)
+
+def consulta_agregados(agregados: AgregadosAcumulados|None, fecha_inicio: date|None=None, fecha_fin: date|None=None) -> Estadisticas:
+    """
+    Devuelve las estadísticas de los mensajes comprendidos entre dos fechas
+    (inclusive) restando sumas acumuladas, sin recorrer los mensajes. Si alguna
+    de las fechas es None, no se aplica ese límite.
+
+    Parámetros:
+    agregados (AgregadosAcumulados|None): Resultado de precalcula_agregados.
+    fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
+    fecha_fin (date|None): Fecha de fin (inclusive) o None.
+
+    Devuelve:
+    Estadisticas: Estadísticas de los mensajes del rango.
+    """
+    if agregados is None:
+        return Estadisticas(0, Counter(), {}, Counter(), Counter(), None)
+    i, j = _indices_dias(agregados, fecha_inicio, fecha_fin)
+    if j <= i or agregados.mensajes[j] == agregados.mensajes[i]:
+        return Estadisticas(0, Counter(), {}, Counter(), Counter(), None)
+
+    por_usuario = Counter()
+    longitud_media = {}
+    for usuario, mensajes, caracteres in zip(agregados.usuarios, agregados.mensajes_usuario, agregados.caracteres_usuario):
+        n = mensajes[j] - mensajes[i]
+        if n:
+            por_usuario[usuario] = n
+            longitud_media[usuario] = (caracteres[j] - caracteres[i]) / n
+    por_hora = Counter({h: c[j] - c[i] for h, c in enumerate(agregados.horas) if c[j] != c[i]})
+    por_dia_semana = Counter({DIAS_SEMANA[d]: c[j] - c[i] for d, c in enumerate(agregados.dias_semana) if c[j] != c[i]})
+
+    nivel = (j - i).bit_length() - 1
+    a = agregados.maximos[nivel][i]
+    b = agregados.maximos[nivel][j - (1 << nivel)]
+    dia = b if agregados.conteos_dia[b] > agregados.conteos_dia[a] else a
+    dia_mas_activo = (date.fromordinal(agregados.dia_inicial + dia), agregados.conteos_dia[dia])
+
+    # Primer y último día con mensajes: las sumas acumuladas no decrecen
+    acumulado = agregados.mensajes
+    primero = bisect_right(acumulado, acumulado[i]) - 1
+    ultimo = bisect_left(acumulado, acumulado[j]) - 1
+    rango_fechas = (date.fromordinal(agregados.dia_inicial + primero), date.fromordinal(agregados.dia_inicial + ultimo))
+
+    return Estadisticas(acumulado[j] - acumulado[i], por_usuario, longitud_media,
+                        por_hora, por_dia_semana, dia_mas_activo, rango_fechas)
+
+def _indices_dias(agregados, fecha_inicio, fecha_fin):
+    """Posiciones [i, j) de los días del rango en las sumas acumuladas."""
+    n_dias = agregados.n_dias
+    i = 0 if fecha_inicio is None else min(max(fecha_inicio.toordinal() - agregados.dia_inicial, 0), n_dias)
+    j = n_dias if fecha_fin is None else min(max(fecha_fin.toordinal() - agregados.dia_inicial + 1, 0), n_dias)
+    return i, j
+
+def series_temporales(agregados: AgregadosAcumulados|None, escala: str = "dia", fecha_inicio: date|None=None,
+                      fecha_fin: date|None=None) -> SerieTemporal|None:
+    """
+    Devuelve el número de mensajes por día, por semana (de lunes a domingo) o
+    por mes entre dos fechas (inclusive), en total y por usuario. Las semanas
+    y los meses se obtienen de las sumas acumuladas por día de los agregados,
+    sin volver a recorrer los mensajes: el coste depende del número de
+    periodos y de usuarios.
+
+    Parámetros:
+    agregados (AgregadosAcumulados|None): Resultado de precalcula_agregados.
+    escala (str): "dia", "semana" o "mes" (ver ESCALAS).
+    fecha_inicio (date|None): Fecha de inicio (inclusive) o None.
+    fecha_fin (date|None): Fecha de fin (inclusive) o None.
+
+    Devuelve:
+    SerieTemporal|None: Series del rango, o None si no hay días en el rango.
+    """
+    if escala not in ESCALAS:
+        raise ValueError(f"Escala desconocida: {escala}")
+    if agregados is None:
+        return None
+    i, j = _indices_dias(agregados, fecha_inicio, fecha_fin)
+    if j <= i:
+        return None
+    limites = _limites_periodos(agregados.dia_inicial, i, j, escala)
+
+    def serie(acumulado):
+        return array('q', (acumulado[b] - acumulado[a] for a, b in pairwise(limites)))
+
+    inicios = [date.fromordinal(agregados.dia_inicial + k) for k in limites[:-1]]
+    por_usuario = {u: serie(mensajes) for u, mensajes in zip(agregados.usuarios, agregados.mensajes_usuario)}
+    return SerieTemporal(escala, inicios, serie(agregados.mensajes), por_usuario)
+
+def _limites_periodos(dia_inicial, i, j, escala):
+    """Posiciones (en días desde dia_inicial) donde empieza cada periodo de [i, j), más j al final."""
+    if escala == "dia":
+        return list(range(i, j + 1))
+    limites = [i]
+    if escala == "semana":
+        # Siguiente lunes (el ordinal 1 es un lunes)
+        dia = dia_inicial + i
+        k = i + 7 - (dia - 1) % 7
+        limites.extend(range(k, j, 7))
+    else:
+        fecha = date.fromordinal(dia_inicial + i)
+        while True:
+            fecha = date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1)
+            k = fecha.toordinal() - dia_inicial
+            if k >= j:
+                break
+            limites.append(k)
+    limites.append(j)
+    return limites
+
+def reduce_serie(valores: Sequence[int], max_puntos: int) -> list[int]:
+    """
+    Elige qué puntos de una serie dibujar para no pasar de max_puntos (p. ej.
+    el ancho en píxeles de la gráfica) sin perder los picos: la serie se
+    divide en max_puntos // 2 tramos y de cada uno se conservan el mínimo y
+    el máximo, en orden. Si la serie ya cabe se conservan todos.
+
+    Parámetros:
+    valores (Sequence[int]): Valores de la serie.
+    max_puntos (int): Número máximo de puntos (al menos 2).
+
+    Devuelve:
+    list[int]: Posiciones de los puntos que se conservan, en orden.
+    """
+    if max_puntos < 2:
+        raise ValueError(f"max_puntos debe ser al menos 2: {max_puntos}")
+    n = len(valores)
+    if n <= max_puntos:
+        return list(range(n))
+    tramos = max_puntos // 2
+    posiciones = []
+    for t in range(tramos):
+        tramo = range(t * n // tramos, (t + 1) * n // tramos)
+        menor = min(tramo, key=valores.__getitem__)
+        mayor = max(tramo, key=valores.__getitem__)
+        posiciones.extend(sorted({menor, mayor}))
+    return posiciones
@@ -115,6 +115,212 @@ def test_analiza_palabras_caracteristicas():
     assert palabras_dict["python"] == 1
     assert "adios" not in palabras_dict
 
+def test_funciones_con_iterables():
+    print("Probando funciones con iterables de una sola pasada...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola"),
+        Mensaje(date(2024, 1, 2), time(11, 0), "Usuario2", "Hola mundo"),
+        Mensaje(date(2024, 1, 2), time(12, 0), "Usuario1", "Adiós"),
+    ]
+    assert calcula_rango_fechas(iter(mensajes)) == (date(2024, 1, 1), date(2024, 1, 2))
+    assert calcula_rango_fechas(iter([])) is None
+    assert len(mensajes) == 3 and mensajes[0].fecha == date(2024, 1, 1)
+    assert len(filtra_mensajes_por_fechas(iter(mensajes), date(2024, 1, 2))) == 2
+    assert cuenta_mensajes_por_usuario(iter(mensajes))["Usuario1"] == 2
+    assert calcula_longitud_media_por_usuario(iter(mensajes))["Usuario1"] == 4.5
+    assert detecta_dia_mas_activo(iter(mensajes)) == (date(2024, 1, 2), 2)
+    assert detecta_dia_mas_activo(iter([])) is None
+
+def test_filtra_mensajes_por_fechas_con_indice():
+    print("Probando filtra_mensajes_por_fechas con índice de fechas...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Mensaje 1"),
+        Mensaje(date(2024, 1, 3), time(11, 0), "Usuario2", "Mensaje 2"),
+        Mensaje(date(2024, 1, 3), time(12, 0), "Usuario1", "Mensaje 3"),
+        Mensaje(date(2024, 1, 6), time(13, 0), "Usuario2", "Mensaje 4"),
+    ]
+    indice = indexa_fechas(mensajes)
+    assert indice.dias == [date(2024, 1, d).toordinal() for d in (1, 3, 6)]
+    assert indice.inicios == [0, 1, 3, 4]
+    rangos = [(date(2024, 1, 2), date(2024, 1, 3)), (date(2024, 1, 3), None), (None, date(2024, 1, 5)),
+              (None, None), (date(2024, 1, 7), None), (date(2024, 1, 4), date(2024, 1, 5)), (date(2024, 1, 3), date(2024, 1, 1))]
+    for inicio, fin in rangos:
+        assert filtra_mensajes_por_fechas(mensajes, inicio, fin, indice) == filtra_mensajes_por_fechas(mensajes, inicio, fin)
+    # Mensajes desordenados: no hay índice
+    assert indexa_fechas([mensajes[1], mensajes[0]]) is None
+
+def test_consulta_agregados():
+    print("Probando precalcula_agregados y consulta_agregados...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola"),
+        Mensaje(date(2024, 1, 1), time(22, 15), "Usuario2", "Hola mundo"),
+        Mensaje(date(2024, 1, 3), time(10, 30), "Usuario1", "Adiós"),
+        Mensaje(date(2024, 1, 3), time(11, 0), "Usuario3", "¿Qué tal?"),
+        Mensaje(date(2024, 1, 8), time(0, 5), "Usuario2", "Buenas"),
+        Mensaje(date(2024, 1, 8), time(9, 0), "Usuario2", "..."),
+        Mensaje(date(2024, 1, 9), time(9, 30), "Usuario1", "ok"),
+    ]
+    agregados = precalcula_agregados(iter(mensajes))
+    rangos = [(None, None), (date(2024, 1, 2), date(2024, 1, 8)), (date(2024, 1, 3), date(2024, 1, 3)),
+              (date(2023, 12, 1), date(2024, 1, 1)), (date(2024, 1, 9), None), (None, date(2024, 1, 2))]
+    for inicio, fin in rangos:
+        filtrados = filtra_mensajes_por_fechas(mensajes, inicio, fin)
+        estadisticas = consulta_agregados(agregados, inicio, fin)
+        assert estadisticas.total == len(filtrados)
+        assert estadisticas.por_usuario == cuenta_mensajes_por_usuario(filtrados)
+        assert estadisticas.longitud_media == calcula_longitud_media_por_usuario(filtrados)
+        assert estadisticas.por_hora == cuenta_mensajes_por_hora(filtrados)
+        assert estadisticas.por_dia_semana == cuenta_mensajes_por_dia_semana(filtrados)
+        assert estadisticas.dia_mas_activo == detecta_dia_mas_activo(filtrados)
+        assert estadisticas.rango_fechas == calcula_rango_fechas(filtrados)
+    # Rangos sin mensajes
+    for inicio, fin in [(date(2024, 1, 4), date(2024, 1, 7)), (date(2025, 1, 1), None), (date(2024, 1, 8), date(2024, 1, 1))]:
+        estadisticas = consulta_agregados(agregados, inicio, fin)
+        assert estadisticas.total == 0 and estadisticas.dia_mas_activo is None
+    assert precalcula_agregados([]) is None
+    assert consulta_agregados(None).total == 0
+
+def test_analiza_todo():
+    print("Probando analiza_todo...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola mundo hola"),
+        Mensaje(date(2024, 1, 2), time(11, 0), "Usuario2", "Hola adios"),
+        Mensaje(date(2024, 1, 2), time(12, 0), "Usuario1", "mundo python"),
+        Mensaje(date(2024, 1, 8), time(10, 0), "Usuario3", "python python"),
+    ]
+    informe = analiza_todo(iter(mensajes))
+    assert informe.total == 4
+    assert informe.rango_fechas == (date(2024, 1, 1), date(2024, 1, 8))
+    assert informe.por_usuario == {"Usuario1": 2, "Usuario2": 1, "Usuario3": 1}
+    assert informe.longitud_media == {"Usuario1": 13.5, "Usuario2": 10.0, "Usuario3": 13.0}
+    assert informe.por_hora == {10: 2, 11: 1, 12: 1}
+    assert informe.por_dia_semana == {"Lunes": 2, "Martes": 2}
+    assert informe.dia_mas_activo == (date(2024, 1, 2), 2)
+    assert informe.palabras == {"hola": 3, "mundo": 2, "adios": 1, "python": 3}
+    assert dict(extrae_palabras_caracteristicas(informe, "Usuario3", 2)) == {"python": 1, "adios": -1}
+    assert analiza_todo(mensajes, palabras=False).palabras is None
+    vacio = analiza_todo([])
+    assert vacio.total == 0 and vacio.dia_mas_activo is None and vacio.rango_fechas is None
+
+def test_palabras_caracteristicas_empates():
+    print("Probando el orden de las palabras empatadas...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "gato"),
+        Mensaje(date(2024, 1, 1), time(11, 0), "Usuario2", "perro"),
+        Mensaje(date(2024, 1, 1), time(12, 0), "Usuario1", "pez"),
+    ]
+    # Empatadas, las palabras van en orden alfabético
+    esperado = [("gato", -1), ("perro", -1), ("pez", -1)]
+    assert extrae_palabras_caracteristicas(analiza_todo(mensajes), "Usuario3") == esperado
+    assert analiza_palabras_caracteristicas(mensajes, "Usuario3") == esperado
+
+def test_actualiza_agregados():
+    print("Probando actualiza_agregados...")
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola"),
+        Mensaje(date(2024, 1, 3), time(22, 15), "Usuario2", "Hola mundo"),
+        Mensaje(date(2024, 1, 3), time(23, 0), "Usuario1", "Adiós"),
+    ]
+    nuevos = [
+        Mensaje(date(2024, 1, 3), time(23, 0), "Usuario1", "Adiós a todos"),
+        Mensaje(date(2024, 1, 5), time(8, 0), "Usuario3", "Buenas"),
+        Mensaje(date(2024, 1, 5), time(9, 0), "Usuario3", "¿Hay alguien?"),
+    ]
+    def filas(lista):
+        return [(m.fecha.toordinal(), m.hora.hour, m.usuario, len(m.texto)) for m in lista]
+    # Se sustituye el último mensaje (que ha crecido) y se añaden dos
+    actualizados = actualiza_agregados(precalcula_agregados(mensajes), filas(nuevos), filas(mensajes[2:]))
+    assert actualizados == precalcula_agregados(mensajes[:2] + nuevos)
+    assert actualiza_agregados(None, filas(mensajes)) == precalcula_agregados(mensajes)
+    assert actualiza_agregados(precalcula_agregados(mensajes), [], filas(mensajes)) is None
+
+def test_series_temporales():
+    print("Probando series_temporales...")
+    mensajes = [
+        Mensaje(date(2024, 1, 29), time(10, 0), "Usuario1", "a"),  # lunes
+        Mensaje(date(2024, 1, 31), time(10, 0), "Usuario2", "b"),
+        Mensaje(date(2024, 2, 4), time(10, 0), "Usuario1", "c"),   # domingo
+        Mensaje(date(2024, 2, 5), time(10, 0), "Usuario1", "d"),   # lunes
+        Mensaje(date(2024, 2, 5), time(11, 0), "Usuario2", "e"),
+        Mensaje(date(2024, 3, 2), time(10, 0), "Usuario2", "f"),
+    ]
+    agregados = precalcula_agregados(mensajes)
+    dias = series_temporales(agregados, "dia")
+    assert len(dias.inicios) == len(dias.total) == (date(2024, 3, 2) - date(2024, 1, 29)).days + 1
+    assert dias.total[0] == 1 and dias.total[7] == 2 and sum(dias.total) == 6
+    assert dias.por_usuario["Usuario2"][2] == 1
+
+    semanas = series_temporales(agregados, "semana")
+    assert semanas.inicios[:2] == [date(2024, 1, 29), date(2024, 2, 5)]
+    assert list(semanas.total[:2]) == [3, 2] and sum(semanas.total) == 6
+    assert list(semanas.por_usuario["Usuario1"][:2]) == [2, 1]
+
+    meses = series_temporales(agregados, "mes")
+    assert meses.inicios == [date(2024, 1, 29), date(2024, 2, 1), date(2024, 3, 1)]
+    assert list(meses.total) == [2, 3, 1]
+    assert list(meses.por_usuario["Usuario2"]) == [1, 1, 1]
+
+    # Con rango: el primer periodo empieza en la fecha de inicio
+    meses = series_temporales(agregados, "mes", date(2024, 1, 31), date(2024, 2, 4))
+    assert meses.inicios == [date(2024, 1, 31), date(2024, 2, 1)] and list(meses.total) == [1, 1]
+    # Cada escala suma lo mismo que filtrar los mensajes
+    for escala in ESCALAS:
+        serie = series_temporales(agregados, escala, date(2024, 2, 1), date(2024, 12, 31))
+        assert sum(serie.total) == len(filtra_mensajes_por_fechas(mensajes, date(2024, 2, 1), date(2024, 12, 31)))
+    assert series_temporales(agregados, "semana", date(2025, 1, 1)) is None
+    assert series_temporales(None, "mes") is None
+    try:
+        series_temporales(agregados, "año")
+        assert False
+    except ValueError:
+        pass
+
+def test_reduce_serie():
+    print("Probando reduce_serie...")
+    assert reduce_serie([3, 1, 2], 10) == [0, 1, 2]
+    valores = [0] * 1000
+    valores[123] = 50
+    valores[700] = -5
+    posiciones = reduce_serie(valores, 100)
+    assert len(posiciones) <= 100
+    assert posiciones == sorted(posiciones)
+    assert 123 in posiciones and 700 in posiciones
+    assert len(reduce_serie(valores, 3)) <= 3
+    for max_puntos in (1, 0):
+        try:
+            reduce_serie(valores, max_puntos)
+            assert False, "Debería lanzar ValueError"
+        except ValueError:
+            pass
+
+def test_puntua_palabras():
+    print("Probando puntua_palabras...")
+    # Ana escribe mucho más que Luis: con la diferencia de recuentos, a Luis
+    # no le queda ninguna palabra común con Ana
+    conteos = {"Ana": Counter(hola=40, clase=20, python=4), "Luis": Counter(hola=4, clase=2, adios=3)}
+    assert [p for p, _ in puntua_palabras(conteos, "log_odds")["Luis"]] == ["adios"]
+    assert [p for p, _ in puntua_palabras(conteos, "log_odds")["Ana"]] == ["hola", "python", "clase"]
+    tfidf = puntua_palabras(conteos, "tfidf")
+    assert tfidf["Ana"][0] == ("hola", 40 / 64)
+    # "adios" solo la usa Luis: con la misma frecuencia pesaría más que "hola"
+    assert dict(tfidf["Luis"])["adios"] / 3 > dict(tfidf["Luis"])["hola"] / 4
+    # Las celdas a cero (p. ej. tras retirar mensajes) no cuentan
+    assert puntua_palabras({"Ana": Counter(hola=0)}, "tfidf") == {"Ana": []}
+    assert puntua_palabras({}, "log_odds") == {}
+    try:
+        puntua_palabras(conteos, "diferencia")
+        assert False, "Debería lanzar ValueError"
+    except ValueError:
+        pass
+    mensajes = [
+        Mensaje(date(2024, 1, 1), time(10, 0), "Usuario1", "Hola mundo hola"),
+        Mensaje(date(2024, 1, 2), time(11, 0), "Usuario2", "Hola adios"),
+        Mensaje(date(2024, 1, 3), time(12, 0), "Usuario1", "mundo python"),
+    ]
+    for modo in ["tfidf", "log_odds"]:
+        esperado = puntua_palabras(analiza_todo(mensajes).palabras_usuario, modo)["Usuario1"][:2]
+        assert analiza_palabras_caracteristicas(mensajes, "Usuario1", 2, modo) == esperado
+
 
 test_calcula_rango_fechas()
 test_filtra_mensajes_por_fechas()
@@ -124,4 +330,13 @@ test_cuenta_mensajes_por_dia_semana()
 test_calcula_longitud_media_por_usuario()
 test_detecta_dia_mas_activo()
 test_analiza_palabras_caracteristicas()
+test_funciones_con_iterables()
+test_filtra_mensajes_por_fechas_con_indice()
+test_consulta_agregados()
+test_analiza_todo()
+test_palabras_caracteristicas_empates()
+test_actualiza_agregados()
+test_series_temporales()
+test_reduce_serie()
+test_puntua_palabras()
 print("Todos los tests pasaron correctamente.")